@@ -11,11 +11,11 @@ that Growtopia uses for game server communication.
 import json
 import socket
 import struct
+import sys
 import time
 from typing import Optional, Tuple, Dict, Any
 
-import requests
-import socks
+from gt_bytes import describe as describe_traffic
 from gt_proxy_tester import GrowtopiaProxyTester
 
 
@@ -25,8 +25,8 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
     Based on Mori's rusty_enet usage patterns
     """
     
-    def __init__(self, app_name: str = "ipburger-demo-joy"):
-        super().__init__(app_name)
+    def __init__(self, app_name: str = "ipburger-demo-joy", show_banner: bool = False):
+        super().__init__(app_name, show_banner)
         
         # ENet protocol constants from Mori analysis
         self.ENET_PROTOCOL_COMMAND_ACKNOWLEDGE = 1
@@ -81,14 +81,17 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
         This is the real test that matters for game compatibility
         """
         try:
+            import socks
+            
             # Create SOCKS5 UDP socket (ENet uses UDP)
             sock = socks.socksocket(socket.AF_INET, socket.SOCK_DGRAM)
             sock.set_proxy(
                 socks.SOCKS5,
-                proxy_config['host'],
+                self._proxy_address(proxy_config),
                 proxy_config['port'],
                 username=proxy_config['username'],
-                password=proxy_config['password']
+                password=proxy_config['password'],
+                rdns=self._remote_dns("enet_handshake", proxy_config)
             )
             sock.settimeout(timeout)
             
@@ -97,8 +100,9 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
             
             self._log("DEBUG", f"Sending ENet CONNECT packet to {server}:{port}")
             
-            # Send ENet connect packet
-            sock.sendto(connect_packet, (server, port))
+            # Send ENet connect packet (sets up the UDP association through the proxy first)
+            with self._timed_op():
+                sock.sendto(connect_packet, (server, port))
             
             # Wait for response (ENet VERIFY_CONNECT or similar)
             try:
@@ -126,11 +130,17 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
             self._log("DEBUG", f"ENet handshake failed: {e}")
             return False, f"ENET_ERROR: {e}"
 
-    def test_growtopia_login_sequence(self, proxy_config: dict, timeout: int = 15) -> Tuple[bool, Dict[str, Any]]:
+    def test_growtopia_login_sequence(self, proxy_config: dict, timeout: int = 15,
+                                      server_info: Optional[dict] = None) -> Tuple[bool, Dict[str, Any]]:
         """
         Test the complete Growtopia login sequence like Mori does
         This is the most accurate test for actual game compatibility
+        
+        server_info: server_data.php fields already fetched through this
+        proxy (fetch_server_data); skips the fetch in step 1 when complete
         """
+        from gt_ratelimit import RateLimited
+        
         results = {
             "server_data_fetch": False,
             "login_token_valid": False,
@@ -140,12 +150,9 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
         }
         
         try:
-            proxy_url = f"socks5://{proxy_config['username']}:{proxy_config['password']}@{proxy_config['host']}:{proxy_config['port']}"
-            
             # Step 1: Get server data (like Mori does)
             self._log("INFO", "Step 1: Fetching server data...")
-            session = requests.Session()
-            session.proxies = {'http': proxy_url, 'https': proxy_url}
+            session = self._proxy_session(proxy_config, self._remote_dns("login_sequence", proxy_config))
             
             headers = {
                 'User-Agent': self.USER_AGENT,
@@ -153,30 +160,39 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
             }
             
             server_data = None
-            for url in self.SERVER_DATA_URLS:
-                try:
-                    data = f"platform=0&protocol={self.PROTOCOL}&version={self.GAME_VERSION}"
-                    response = session.post(url, headers=headers, data=data, timeout=timeout)
-                    
-                    if response.status_code == 200 and response.text:
-                        # Parse server data like Mori does
-                        lines = response.text.strip().split('\n')
-                        server_info = {}
-                        
-                        for line in lines:
-                            if '|' in line:
-                                key, value = line.split('|', 1)
-                                server_info[key] = value
+            if server_info and 'server' in server_info and 'port' in server_info:
+                server_data = server_info
+                results["server_data_fetch"] = True
+                self._log("SUCCESS", f"Server data reused: {server_info['server']}:{server_info['port']}")
+            
+            if server_data is None:
+                for url in self.SERVER_DATA_URLS:
+                    try:
+                        data = f"platform=0&protocol={self.PROTOCOL}&version={self.GAME_VERSION}"
+                        response = session.post(url, headers=headers, data=data, timeout=timeout)
                         
-                        if 'server' in server_info and 'port' in server_info:
-                            server_data = server_info
-                            results["server_data_fetch"] = True
-                            self._log("SUCCESS", f"Server data obtained: {server_info['server']}:{server_info['port']}")
-                            break
+                        if response.status_code == 200 and response.text:
+                            # Parse server data like Mori does
+                            lines = response.text.strip().split('\n')
+                            server_info = {}
+                            
+                            for line in lines:
+                                if '|' in line:
+                                    key, value = line.split('|', 1)
+                                    server_info[key] = value
                             
-                except Exception as e:
-                    self._log("DEBUG", f"Failed to get server data from {url}: {e}")
-                    continue
+                            if 'server' in server_info and 'port' in server_info:
+                                server_data = server_info
+                                results["server_data_fetch"] = True
+                                self._log("SUCCESS", f"Server data obtained: {server_info['server']}:{server_info['port']}")
+                                break
+                                
+                    except RateLimited as e:
+                        self._refused(f"Server data from {url}", e)
+                        continue
+                    except Exception as e:
+                        self._log("DEBUG", f"Failed to get server data from {url}: {e}")
+                        continue
             
             if not server_data:
                 self._log("ERROR", "Could not fetch server data - proxy incompatible")
@@ -187,8 +203,8 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
             game_server = server_data['server']
             game_port = int(server_data['port'])
             
-            enet_success, enet_result = self.test_enet_handshake(
-                proxy_config, game_server, game_port, timeout
+            enet_success, enet_result = self._run_stage(
+                "enet_handshake", self.test_enet_handshake, proxy_config, game_server, game_port, timeout=timeout
             )
             
             results["enet_handshake"] = enet_success
@@ -208,13 +224,17 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
                 login_response = session.get(
                     "https://login.growtopiagame.com/player/growid/checktoken?valKey=40db4045f2d8c572efe8c4a060605726",
                     headers={'User-Agent': self.USER_AGENT},
-                    timeout=timeout
+                    timeout=timeout,
+                    stream=self.low_bytes
                 )
+                login_response.close()
                 
                 if login_response.status_code in [200, 400, 422]:  # 400/422 = missing token, but endpoint reachable
                     results["login_token_valid"] = True
                     self._log("SUCCESS", "Login endpoint reachable")
                     
+            except RateLimited as e:
+                self._refused("Login endpoint check", e)
             except Exception as e:
                 self._log("DEBUG", f"Login endpoint test failed: {e}")
             
@@ -232,7 +252,7 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
             self._log("ERROR", f"Login sequence test failed: {e}")
             return False, results
 
-    def test_advanced_growtopia_compatibility(self, proxy_url: str) -> Tuple[bool, dict]:
+    def test_advanced_growtopia_compatibility(self, proxy_url: str, location: Optional[str] = None) -> Tuple[bool, dict]:
         """
         Advanced compatibility test based on Mori's actual implementation
         This is more accurate than the basic TCP test
@@ -241,44 +261,57 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
         if not proxy_config:
             return False, {"error": "Invalid proxy format"}
         
+        self._begin_test(proxy_url, location)
         self._log("INFO", f"Testing advanced Growtopia compatibility: {proxy_config['host']}:{proxy_config['port']}")
         
-        results = {
-            "socks5_basic": False,
-            "http_website": False,
-            "http_status": "UNKNOWN",
-            "server_data": False,
-            "login_sequence": False,
-            "enet_handshake": False,
-            "game_server_reachable": False,
-            "advanced_score": 0,
-            "is_growtopia_compatible": False,
-            "compatibility_level": "NONE"
-        }
+        results = self._advanced_results()
         
         # Test 1: Basic SOCKS5 (same as before)
         self._log("INFO", "Testing basic SOCKS5 connectivity...")
-        results["socks5_basic"] = self.test_socks5_basic(proxy_config)
+        results["socks5_basic"] = self._run_stage("socks5_basic", self.test_socks5_basic, proxy_config)
         
         if not results["socks5_basic"]:
             self._log("ERROR", "Basic SOCKS5 failed - proxy unusable")
-            return False, results
+            return self._finish_test("advanced", False, results)
         
         # Test 2: HTTP website (same as before)
         self._log("INFO", "Testing HTTP to Growtopia website...")
-        http_success, status_code = self.test_http_to_growtopia(proxy_config)
+        http_success, status_code = self._run_stage("http_website", self.test_http_to_growtopia, proxy_config)
         results["http_website"] = http_success
         results["http_status"] = status_code
         
         # Test 3: Advanced login sequence test (NEW - based on Mori)
         self._log("INFO", "Testing complete Growtopia login sequence...")
-        login_compatible, login_results = self.test_growtopia_login_sequence(proxy_config)
+        login_compatible, login_results = self._run_stage("login_sequence", self.test_growtopia_login_sequence, proxy_config)
         
         results["login_sequence"] = login_compatible
         results["server_data"] = login_results["server_data_fetch"]
         results["enet_handshake"] = login_results["enet_handshake"]
         results["game_server_reachable"] = login_results["game_server_reachable"]
         
+        # Test 4: Sustained bandwidth (optional)
+        self._run_bandwidth_stage(proxy_config, results)
+        
+        compatible = self.score_advanced(results)
+        return self._finish_test("advanced", compatible, results)
+
+    def _advanced_results(self) -> dict:
+        """Results dict of test_advanced_growtopia_compatibility before any stage runs"""
+        return {
+            "socks5_basic": False,
+            "http_website": False,
+            "http_status": "UNKNOWN",
+            "server_data": False,
+            "login_sequence": False,
+            "enet_handshake": False,
+            "game_server_reachable": False,
+            "advanced_score": 0,
+            "is_growtopia_compatible": False,
+            "compatibility_level": "NONE"
+        }
+
+    def score_advanced(self, results: dict) -> bool:
+        """Fill in advanced_score, compatibility_level and the verdict from the stage outcomes"""
         # Calculate advanced score
         score = 0
         if results["socks5_basic"]: score += 15
@@ -286,6 +319,7 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
         if results["server_data"]: score += 25
         if results["enet_handshake"]: score += 25
         if results["login_sequence"]: score += 15
+        score = max(0, score - self._bandwidth_penalty(results))
         
         results["advanced_score"] = score
         
@@ -307,8 +341,7 @@ class GrowtopiaENetTester(GrowtopiaProxyTester):
             results["http_status"] != "403"
         )
         
-        return results["is_growtopia_compatible"], results
-
+        return results["is_growtopia_compatible"]
 
 def main():
     import argparse
@@ -317,11 +350,44 @@ def main():
     parser.add_argument("--app", default="ipburger-demo-joy", help="Heroku app name")
     parser.add_argument("--test-proxy", help="Test specific proxy URL")
     parser.add_argument("--advanced-test", action="store_true", help="Use advanced ENet testing")
+    parser.add_argument("--bandwidth-url", help="Payload URL for the optional bandwidth test")
+    parser.add_argument("--low-bytes", action="store_true",
+                        help="Read only the status of pages whose body is unused (metered bandwidth)")
+    
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage time breakdown at exit")
+    parser.add_argument("--profile-out", help="Also write a cProfile dump (.prof) or collapsed stacks (.folded)")
+    parser.add_argument("--no-dns-cache", action="store_true", help="Resolve every hostname afresh")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text",
+                        help="jsonl: one JSON record per tested proxy on stdout (text goes to stderr)")
     
     args = parser.parse_args()
     
-    tester = GrowtopiaENetTester(args.app)
+    tester = GrowtopiaENetTester(args.app, show_banner=args.format == "text")
+    if args.format == "jsonl":
+        tester.enable_jsonl_output()
+        # Records own stdout; the usual text still shows on the terminal
+        sys.stdout = sys.stderr
+    tester.enable_console_output()
+    tester.bandwidth_url = args.bandwidth_url
+    tester.enable_byte_counters()
+    tester.low_bytes = args.low_bytes
+    if not args.no_dns_cache:
+        tester.enable_dns_cache()
+    if args.metrics_port:
+        tester.enable_metrics(args.metrics_port)
+    if args.profile or args.profile_out:
+        tester.enable_profiling(args.profile_out)
     
+    try:
+        run_cli(tester, args)
+    finally:
+        tester.finish_profiling()
+        if tester.jsonl_output is not None:
+            tester.jsonl_output.close()
+
+
+def run_cli(tester: GrowtopiaENetTester, args):
     if args.test_proxy:
         if args.advanced_test:
             # Use advanced ENet-based testing
@@ -342,6 +408,10 @@ def main():
             print(f"  ENet Handshake: {'✅' if results['enet_handshake'] else '❌'}")
             print(f"  Login Sequence: {'✅' if results['login_sequence'] else '❌'}")
             print(f"  Game Server Reachable: {'✅' if results['game_server_reachable'] else '❌'}")
+            if "bandwidth" in results:
+                print(f"  Bandwidth: {'✅' if results['bandwidth'] else '❌'} ({results['bandwidth_kb_per_s']} KB/s, {results['bandwidth_stalls']} stalls)")
+            if "bytes_sent" in results:
+                print(f"  Traffic: {describe_traffic(results)}")
             print(f"{'='*60}")
             
             if is_compatible:
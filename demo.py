@@ -15,7 +15,8 @@ def demo_all_features():
     print("🚀 Growtopia Proxy Tester - Feature Demo")
     print("=" * 60)
     
-    tester = GrowtopiaProxyTester("ipburger-demo-joy")
+    tester = GrowtopiaProxyTester("ipburger-demo-joy", show_banner=True)
+    tester.enable_console_output()
     
     # Demo 1: Test Prerequisites
     print("\n1. 🔍 Prerequisites Check")
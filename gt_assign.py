@@ -0,0 +1,248 @@
+"""
+Sticky bot-to-proxy assignment
+
+Bots that share a few proxies must be spread by what each egress can
+carry, or one IP takes the whole fleet and gets blocked. BotAssigner
+keeps every bot on the proxy it was given (so it reconnects from the
+same IP) and places new bots on the least loaded proxy relative to its
+capacity, which proxy_capacity() derives from the proxy's measured
+throughput and connect latency. When a proxy fails its re-test, or its
+capacity drops, only the bots that have to leave it are moved. Leases
+handed out by the proxy API take room from the same capacity
+(set_leases), and on_bots reports each proxy's bot count back to it.
+
+Placement uses one heap per location of (load / capacity, ...) with
+stale items skipped on pop, so an assignment or a move is O(log n) in
+the number of proxies.
+"""
+
+import heapq
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set
+
+ANY_LOCATION = "*"
+
+# A bot in a world streams a few KB/s; leave headroom for world downloads
+BOT_KB_PER_S = 16.0
+DEFAULT_CAPACITY = 4
+MAX_CAPACITY = 32
+SLOW_CONNECT_MS = 1500.0
+
+
+def proxy_capacity(results: dict, default: int = DEFAULT_CAPACITY, ceiling: int = MAX_CAPACITY,
+                   slow_connect_ms: float = SLOW_CONNECT_MS) -> int:
+    """
+    Bots a proxy can carry, from the bandwidth and connect_ms of its test
+    results. slow_connect_ms is best taken from the tail of the pool's
+    connect times (gt_latency) rather than a fixed figure.
+    """
+    rate = results.get("bandwidth_kb_per_s")
+    capacity = int(rate // BOT_KB_PER_S) if rate else default
+    latency = results.get("connect_ms")
+    if latency and latency > slow_connect_ms:
+        # Slow handshakes mean a congested egress: load it lightly
+        capacity //= 2
+    return max(1, min(ceiling, capacity))
+
+
+class ProxySlot:
+    __slots__ = ("url", "location", "capacity", "bots", "leases")
+
+    def __init__(self, url: str, location: str, capacity: int, leases: int = 0):
+        self.url = url
+        self.location = location
+        self.capacity = capacity
+        self.bots: Set[str] = set()
+        self.leases = leases
+
+    def used(self) -> int:
+        return len(self.bots) + self.leases
+
+    def key(self) -> tuple:
+        # Least loaded first; among equals, the proxy with more room
+        return (self.used() / self.capacity, -self.capacity, self.url)
+
+
+class BotAssigner:
+    """Bot id -> proxy URL with sticky affinity and per-proxy capacity"""
+
+    def __init__(self, lock=None, on_bots: Optional[Callable[[str, int], None]] = None):
+        """
+        lock: shared with a gt_proxy_api.ProxyIndex (an RLock) when the two
+        keep one count per proxy; on_bots(url, bots) is called under it
+        whenever a proxy's bot count changes.
+        """
+        self.slots: Dict[str, ProxySlot] = {}
+        self.bots: Dict[str, str] = {}
+        self.moved = 0
+        self.unplaced = 0
+        self.on_bots = on_bots
+        self._heaps: Dict[str, List[tuple]] = {ANY_LOCATION: []}
+        self._saved: Dict[str, List[str]] = {}
+        self._leases: Dict[str, int] = {}
+        self._lock = lock or threading.Lock()
+
+    def _changed(self, slot: ProxySlot, bots: Optional[int] = None):
+        if self.on_bots is not None:
+            self.on_bots(slot.url, len(slot.bots) if bots is None else bots)
+
+    def _push(self, slot: ProxySlot):
+        if slot.used() < slot.capacity:
+            item = slot.key()
+            for location in (ANY_LOCATION, slot.location):
+                heapq.heappush(self._heaps.setdefault(location, []), item)
+
+    def _pick(self, location: Optional[str]) -> Optional[ProxySlot]:
+        heap = self._heaps.get(location or ANY_LOCATION)
+        while heap:
+            item = heap[0]
+            slot = self.slots.get(item[2])
+            # Load and location changes push a fresh item, so anything else is stale
+            if (slot is None or slot.key() != item or slot.used() >= slot.capacity
+                    or location not in (None, ANY_LOCATION, slot.location)):
+                heapq.heappop(heap)
+                continue
+            return slot
+        return None
+
+    def _place(self, bot: str, location: Optional[str]) -> Optional[str]:
+        slot = self._pick(location)
+        if slot is None and location:
+            slot = self._pick(None)
+        if slot is None:
+            self.unplaced += 1
+            return None
+        slot.bots.add(bot)
+        self.bots[bot] = slot.url
+        self._push(slot)
+        self._changed(slot)
+        return slot.url
+
+    def _compact(self):
+        """Drop stale heap items once they outnumber live ones"""
+        for location, heap in self._heaps.items():
+            if len(heap) > 4 * len(self.slots) + 64:
+                live = {slot.key() for slot in self.slots.values()
+                        if slot.used() < slot.capacity and location in (ANY_LOCATION, slot.location)}
+                self._heaps[location] = [item for item in heap if item in live]
+                heapq.heapify(self._heaps[location])
+
+    def assign(self, bot: str, location: Optional[str] = None) -> Optional[str]:
+        """The bot's proxy: its current one if it still has it, else the least loaded"""
+        with self._lock:
+            url = self.bots.get(bot)
+            if url is not None:
+                return url
+            url = self._place(bot, location)
+            self._compact()
+            return url
+
+    def release(self, bot: str) -> Optional[str]:
+        with self._lock:
+            url = self.bots.pop(bot, None)
+            slot = self.slots.get(url)
+            if slot is not None:
+                slot.bots.discard(bot)
+                self._push(slot)
+                self._changed(slot)
+            return url
+
+    def set_leases(self, url: str, leases: int):
+        """Leases the proxy API holds on url, which take room from its capacity"""
+        with self._lock:
+            if leases:
+                self._leases[url] = leases
+            else:
+                self._leases.pop(url, None)
+            slot = self.slots.get(url)
+            if slot is not None:
+                slot.leases = leases
+                self._push(slot)
+
+    def update(self, url: str, location: str, capacity: int) -> Dict[str, Optional[str]]:
+        """
+        Add a proxy or refresh its capacity after a re-test. Bots above a
+        lowered capacity are moved; returns {bot: new proxy or None}.
+        """
+        with self._lock:
+            slot = self.slots.get(url)
+            if slot is None:
+                slot = self.slots[url] = ProxySlot(url, location, capacity, self._leases.get(url, 0))
+                for bot in self._saved.pop(url, ()):
+                    if bot not in self.bots and slot.used() < capacity:
+                        slot.bots.add(bot)
+                        self.bots[bot] = url
+                self._push(slot)
+                self._changed(slot)
+                return {}
+            slot.location, slot.capacity = location, capacity
+            # Leases end on their own; only bots are moved to make room
+            excess = sorted(slot.bots)[max(0, capacity - slot.leases):]
+            slot.bots.difference_update(excess)
+            self._push(slot)
+            self._changed(slot)
+            return self._move(excess, location)
+
+    def remove(self, url: str) -> Dict[str, Optional[str]]:
+        """A proxy failed: move just its bots; returns {bot: new proxy or None}"""
+        with self._lock:
+            slot = self.slots.pop(url, None)
+            if slot is None:
+                return {}
+            self._changed(slot, 0)
+            return self._move(sorted(slot.bots), slot.location)
+
+    def _move(self, bots: List[str], location: str) -> Dict[str, Optional[str]]:
+        moves = {}
+        for bot in bots:
+            del self.bots[bot]
+            # Stay in the same region where possible
+            # Left unplaced when nothing has room; assign() places it later
+            moves[bot] = self._place(bot, location)
+            self.moved += 1
+        self._compact()
+        return moves
+
+    def load(self) -> Dict[str, tuple]:
+        """url -> (bots, capacity)"""
+        with self._lock:
+            return {url: (len(slot.bots), slot.capacity) for url, slot in self.slots.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            capacity = sum(slot.capacity for slot in self.slots.values())
+            return {
+                "bots": len(self.bots),
+                "proxies": len(self.slots),
+                "capacity": capacity,
+                "full": sum(slot.used() >= slot.capacity for slot in self.slots.values()),
+                "moved": self.moved,
+                "unplaced": self.unplaced,
+            }
+
+    def save(self, path: str):
+        """Write the bot -> proxy map so assignments survive a restart"""
+        with self._lock:
+            data = dict(self.bots)
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(temporary, path)
+
+    def restore(self, path: str) -> int:
+        """
+        Read a map written by save(). Each bot goes back to its proxy when
+        that proxy is added (passes its test) with room for it, unless the
+        bot was given another proxy meanwhile. Returns how many were read.
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        with self._lock:
+            for bot, url in saved.items():
+                self._saved.setdefault(url, []).append(bot)
+        return len(saved)
@@ -0,0 +1,163 @@
+"""
+Byte accounting for proxied traffic
+
+IPBurger meters bandwidth, so each stage reports what it cost on the wire
+to the proxy. install() hooks socks.socksocket (used by the stages and by
+urllib3's SOCKS connections) so that, inside a measure() block,
+every TCP socket opened on the thread is followed through a duplicate
+descriptor and, on Linux, its TCP_INFO byte counters are read when the
+block ends: SOCKS negotiation, TLS and HTTP included, however the socket
+was wrapped or closed. Elsewhere, and for UDP, the bytes going through
+the socket's own send/recv methods are counted instead, which misses
+traffic that ssl encrypts.
+"""
+
+import os
+import socket
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+TCP_INFO = getattr(socket, "TCP_INFO", None)
+# struct tcp_info: tcpi_bytes_acked and tcpi_bytes_received (Linux 4.1+)
+_TCP_INFO_BYTES = struct.Struct("=QQ")
+_TCP_INFO_BYTES_OFFSET = 120
+_TCP_INFO_LENGTH = _TCP_INFO_BYTES_OFFSET + _TCP_INFO_BYTES.size
+# RSV, FRAG, ATYP, IPv4 address and port in front of every SOCKS5 UDP datagram
+_UDP_HEADER = 10
+
+_local = threading.local()
+_installed = False
+
+
+class ByteMeter:
+    """Bytes sent to and received from the proxy during one measure() block"""
+
+    def __init__(self, parent: Optional["ByteMeter"] = None):
+        self.parent = parent
+        self.sent = 0
+        self.received = 0
+        # The part of sent/received that nested blocks measured
+        self.nested_sent = 0
+        self.nested_received = 0
+        self._followed = []
+
+    def follow(self, sock) -> bool:
+        """Count a TCP socket from its kernel counters; False where those don't exist"""
+        if TCP_INFO is None or sock.type != socket.SOCK_STREAM:
+            return False
+        try:
+            # A plain socket: sock.dup() would build another socksocket
+            self._followed.append(socket.socket(fileno=os.dup(sock.fileno())))
+        except OSError:
+            return False
+        return True
+
+    def close(self):
+        for sock in self._followed:
+            try:
+                info = sock.getsockopt(socket.IPPROTO_TCP, TCP_INFO, _TCP_INFO_LENGTH)
+                if len(info) >= _TCP_INFO_LENGTH:
+                    acked, received = _TCP_INFO_BYTES.unpack_from(info, _TCP_INFO_BYTES_OFFSET)
+                    self.sent += acked
+                    self.received += received
+            except OSError:
+                pass  # Never connected
+            finally:
+                sock.close()
+        self._followed = []
+        if self.parent is not None:
+            self.parent.sent += self.sent
+            self.parent.received += self.received
+            self.parent.nested_sent += self.sent
+            self.parent.nested_received += self.received
+
+
+def current() -> Optional[ByteMeter]:
+    meters = getattr(_local, "meters", None)
+    return meters[-1] if meters else None
+
+
+@contextmanager
+def measure() -> Iterator[ByteMeter]:
+    """Count the proxy traffic of sockets opened on this thread; nested blocks add to the outer one"""
+    meters = getattr(_local, "meters", None)
+    if meters is None:
+        meters = _local.meters = []
+    meter = ByteMeter(meters[-1] if meters else None)
+    meters.append(meter)
+    try:
+        yield meter
+    finally:
+        meters.pop()
+        meter.close()
+
+
+def format_bytes(count: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if count < 1024 or unit == "MB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+
+
+def describe(results: dict) -> str:
+    """'14.2 KB (9.6 KB sent, 4.6 KB received): http_website 8.1 KB, ...' from a results dict"""
+    sent, received = results.get("bytes_sent", 0), results.get("bytes_received", 0)
+    stages = ", ".join(f"{stage} {format_bytes(count)}" for stage, count in results.get("stage_bytes", {}).items())
+    return f"{format_bytes(sent + received)} ({format_bytes(sent)} sent, {format_bytes(received)} received)" + (
+        f": {stages}" if stages else "")
+
+
+def install():
+    """Make every PySocks socket report to the thread's current ByteMeter (idempotent)"""
+    global _installed
+    if _installed:
+        return
+    import socks
+
+    # Patched in place: PySocks calls super(socksocket, self), so a subclass
+    # swapped in under the same name would recurse
+    cls = socks.socksocket
+    original = {name: getattr(cls, name) for name in ("__init__", "sendall", "send", "sendto", "recv_into", "recvfrom")}
+
+    def __init__(self, *args, **kwargs):
+        original["__init__"](self, *args, **kwargs)
+        meter = current()
+        # Sockets the kernel counts for us need no per-call tallying
+        self._meter = None if meter is None or meter.follow(self) else meter
+
+    def sendall(self, data, *args):
+        result = original["sendall"](self, data, *args)
+        if getattr(self, "_meter", None) is not None:
+            self._meter.sent += len(data)
+        return result
+
+    def send(self, data, *args, **kwargs):
+        sent = original["send"](self, data, *args, **kwargs)
+        # Datagrams are counted in sendto
+        if getattr(self, "_meter", None) is not None and self.type == socket.SOCK_STREAM:
+            self._meter.sent += sent
+        return sent
+
+    def sendto(self, data, *args, **kwargs):
+        sent = original["sendto"](self, data, *args, **kwargs)
+        if getattr(self, "_meter", None) is not None:
+            self._meter.sent += sent + (_UDP_HEADER if self.type == socket.SOCK_DGRAM else 0)
+        return sent
+
+    def recv_into(self, buffer, *args):
+        received = original["recv_into"](self, buffer, *args)
+        if getattr(self, "_meter", None) is not None:
+            self._meter.received += received
+        return received
+
+    def recvfrom(self, *args, **kwargs):
+        data, address = original["recvfrom"](self, *args, **kwargs)
+        if getattr(self, "_meter", None) is not None:
+            self._meter.received += len(data) + (_UDP_HEADER if self.type == socket.SOCK_DGRAM else 0)
+        return data, address
+
+    for function in (__init__, sendall, send, sendto, recv_into, recvfrom):
+        setattr(cls, function.__name__, function)
+    _installed = True
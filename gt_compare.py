@@ -0,0 +1,218 @@
+#!/home/joy/cproxy/venv/bin/python3
+
+"""
+Side-by-side verdicts of all three tester variants from one probe pass
+
+Running gt_proxy_tester.py, advanced_gt_tester.py --advanced-test and
+realistic_gt_tester.py against the same proxy repeats the same network
+probes three times. GrowtopiaVariantTester runs the union of their
+stages once (the login sequence reuses the server_data reply) and then
+applies the standard, advanced and realistic scoring to the shared
+outcomes, honouring each variant's own early exits so every verdict
+matches what the separate run would have returned.
+"""
+
+from typing import Dict, Optional, Tuple
+
+from advanced_gt_tester import GrowtopiaENetTester
+from gt_bytes import describe as describe_traffic
+from gt_records import SCORE_KEYS
+from realistic_gt_tester import RealisticGrowtopiaProxyTester
+
+VARIANTS = ("standard", "advanced", "realistic")
+
+
+class GrowtopiaVariantTester(RealisticGrowtopiaProxyTester, GrowtopiaENetTester):
+    """Tester with every variant's stages and scoring"""
+
+    def test_all_variants(self, proxy_url: str, location: Optional[str] = None) -> Dict[str, Tuple[bool, dict]]:
+        """
+        One pass over the union of stages
+        Returns {"standard"|"advanced"|"realistic": (is_compatible, test_results)}
+        """
+        proxy_config = self.parse_proxy_url(proxy_url)
+        if not proxy_config:
+            return {kind: (False, {"error": "Invalid proxy format"}) for kind in VARIANTS}
+
+        self._begin_test(proxy_url, location)
+        self._log("INFO", f"Testing all variants in one pass: {proxy_config['host']}:{proxy_config['port']}")
+
+        standard = self._standard_results()
+        advanced = self._advanced_results()
+        realistic = self._realistic_results()
+        everyone = (standard, advanced, realistic)
+
+        # SOCKS5 failure ends every variant early
+        socks_ok = self._run_stage("socks5_basic", self.test_socks5_basic, proxy_config)
+        for results in everyone:
+            results["socks5_basic"] = socks_ok
+        if not socks_ok:
+            self._log("ERROR", "Basic SOCKS5 test failed - proxy unusable")
+            realistic["compatibility_reason"] = "SOCKS5 proxy not working"
+            return self._finish_variants(standard, advanced, realistic)
+
+        http_success, status_code = self._run_stage("http_website", self.test_http_to_growtopia, proxy_config)
+        for results in everyone:
+            results["http_website"] = http_success
+            results["http_status"] = status_code
+
+        # The realistic variant stops at a 403 or missing server data; the others keep probing
+        realistic_open = status_code != "403"
+        if not realistic_open:
+            realistic["compatibility_reason"] = "IP blocked by Growtopia (403 Forbidden)"
+
+        server_info = self._run_stage("server_data", self.fetch_server_data, proxy_config)
+        standard["server_data"] = server_info is not None
+        if realistic_open:
+            realistic["server_data"] = server_info is not None
+            if server_info is None:
+                realistic_open = False
+                realistic["compatibility_reason"] = "Cannot access game server discovery endpoints"
+
+        tcp_ok = self._run_stage("tcp_game_server", self.test_tcp_connection_to_game_server, proxy_config)
+        enet_ok = self._run_stage("enet_compat", self.test_enet_compatibility, proxy_config)
+        for results in (standard, realistic) if realistic_open else (standard,):
+            results["tcp_game_server"] = tcp_ok
+            results["enet_compat"] = enet_ok
+
+        login_compatible, login_results = self._run_stage(
+            "login_sequence", self.test_growtopia_login_sequence, proxy_config, server_info=server_info
+        )
+        advanced["login_sequence"] = login_compatible
+        advanced["server_data"] = login_results["server_data_fetch"]
+        advanced["enet_handshake"] = login_results["enet_handshake"]
+        advanced["game_server_reachable"] = login_results["game_server_reachable"]
+
+        bandwidth = {}
+        self._run_bandwidth_stage(proxy_config, bandwidth)
+        for results in everyone if realistic_open else (standard, advanced):
+            results.update(bandwidth)
+
+        udp_stats = None
+        if realistic_open and self.udp_probe_target:
+            self._log("INFO", "Probing UDP relay quality (loss, RTT, jitter)...")
+            realistic["udp_probe"], udp_stats = self._run_stage(
+                "udp_probe", self.test_udp_probe, proxy_config, self.udp_probe_target
+            )
+            realistic["udp_loss_pct"] = udp_stats["loss_pct"]
+            realistic["udp_rtt_p50_ms"] = udp_stats["rtt_p50_ms"]
+            realistic["udp_rtt_p90_ms"] = udp_stats["rtt_p90_ms"]
+            realistic["udp_rtt_p99_ms"] = udp_stats["rtt_p99_ms"]
+            realistic["udp_jitter_ms"] = udp_stats["jitter_ms"]
+            realistic["udp_reordered"] = udp_stats["reordered"]
+
+        self.score_standard(standard)
+        self.score_advanced(advanced)
+        if realistic_open:
+            self.score_realistic(realistic, udp_stats)
+        return self._finish_variants(standard, advanced, realistic)
+
+    def _finish_variants(self, standard: dict, advanced: dict, realistic: dict) -> Dict[str, Tuple[bool, dict]]:
+        """_finish_test for each variant (DNS figures are shared by all three); one proxy validated"""
+        return {
+            kind: self._finish_test(kind, results["is_growtopia_compatible"], results, new_proxy=index == 0)
+            for index, (kind, results) in enumerate(zip(VARIANTS, (standard, advanced, realistic)))
+        }
+
+
+def print_comparison(proxy_url: str, verdicts: Dict[str, Tuple[bool, dict]]):
+    """Stage outcomes once, then the three verdicts side by side"""
+    standard = verdicts["standard"][1]
+    advanced = verdicts["advanced"][1]
+    realistic = verdicts["realistic"][1]
+
+    def mark(value) -> str:
+        return "✅" if value else "❌"
+
+    print(f"\n{'='*70}")
+    print("GROWTOPIA VARIANT COMPARISON (one probe pass)")
+    print(f"{'='*70}")
+    print(f"Proxy: {proxy_url}")
+    if "error" in standard:
+        print(f"Error: {standard['error']}")
+        print(f"{'='*70}")
+        return
+
+    print("Stages:")
+    print(f"  SOCKS5 Basic:      {mark(standard['socks5_basic'])}")
+    print(f"  HTTP Website:      {mark(standard['http_website'])} ({standard['http_status']})")
+    print(f"  Server Data:       {mark(standard['server_data'])}")
+    print(f"  TCP Game Server:   {mark(standard['tcp_game_server'])}")
+    print(f"  ENet Compatible:   {mark(standard['enet_compat'])}")
+    print(f"  ENet Handshake:    {mark(advanced['enet_handshake'])}")
+    print(f"  Login Sequence:    {mark(advanced['login_sequence'])}")
+    if "bandwidth" in standard:
+        print(f"  Bandwidth:         {mark(standard['bandwidth'])} ({standard['bandwidth_kb_per_s']} KB/s, {standard['bandwidth_stalls']} stalls)")
+    if "udp_probe" in realistic:
+        print(f"  UDP Probe:         {mark(realistic['udp_probe'])} ({realistic['udp_loss_pct']}% loss, jitter {realistic['udp_jitter_ms']}ms)")
+    if "bytes_sent" in standard:
+        print(f"  Traffic:           {describe_traffic(standard)}")
+
+    print(f"{'─'*70}")
+    print(f"  {'Variant':<11} {'Compatible':<11} {'Score':<8} Detail")
+    details = {
+        "standard": "",
+        "advanced": advanced["compatibility_level"],
+        "realistic": realistic["compatibility_reason"],
+    }
+    for kind in VARIANTS:
+        is_compatible, results = verdicts[kind]
+        verdict = f"{mark(is_compatible)} {'YES' if is_compatible else 'NO'}"
+        print(f"  {kind.capitalize():<11} {verdict:<11} {str(results[SCORE_KEYS[kind]]) + '/100':<8} {details[kind]}")
+
+    if "score_breakdown" in realistic:
+        print(f"{'─'*70}")
+        print("Realistic breakdown:")
+        for test_name, result in realistic["score_breakdown"].items():
+            print(f"  {test_name:<20}: {result}")
+
+    agreeing = {is_compatible for is_compatible, _ in verdicts.values()}
+    if len(agreeing) > 1:
+        passing = [kind for kind in VARIANTS if verdicts[kind][0]]
+        print(f"{'─'*70}")
+        print(f"⚠️  Variants disagree: only {', '.join(passing)} accept this proxy")
+    print(f"{'='*70}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Growtopia Tester Variant Comparison v1.0")
+    parser.add_argument("--app", default="ipburger-demo-joy", help="Heroku app name")
+    parser.add_argument("--test-proxy", required=True, help="Test specific proxy URL")
+    parser.add_argument("--bandwidth-url", help="Payload URL for the optional bandwidth test")
+    parser.add_argument("--low-bytes", action="store_true",
+                        help="Read only the status of pages whose body is unused (metered bandwidth)")
+    parser.add_argument("--udp-probe", metavar="HOST:PORT", help="UDP echo target for the loss/jitter probe")
+
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage time breakdown at exit")
+    parser.add_argument("--profile-out", help="Also write a cProfile dump (.prof) or collapsed stacks (.folded)")
+    parser.add_argument("--no-dns-cache", action="store_true", help="Resolve every hostname afresh")
+
+    args = parser.parse_args()
+
+    tester = GrowtopiaVariantTester(args.app, show_banner=True)
+    tester.enable_console_output()
+    tester.bandwidth_url = args.bandwidth_url
+    tester.enable_byte_counters()
+    tester.low_bytes = args.low_bytes
+    tester.udp_probe_target = args.udp_probe
+    if not args.no_dns_cache:
+        tester.enable_dns_cache()
+    if args.metrics_port:
+        tester.enable_metrics(args.metrics_port)
+    if args.profile or args.profile_out:
+        tester.enable_profiling(args.profile_out)
+
+    verdicts = tester.test_all_variants(args.test_proxy)
+    print_comparison(args.test_proxy, verdicts)
+
+    tester.finish_profiling()
+
+    # Success only when every variant accepts the proxy
+    return 0 if all(is_compatible for is_compatible, _ in verdicts.values()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,204 @@
+"""
+Adaptive concurrency for bulk validation (AIMD)
+
+A fixed worker count is a guess: too low wastes wall time, too high runs
+the machine out of descriptors or ephemeral ports (or trips provider
+throttling) and healthy proxies start to look dead. AIMDController
+adjusts how many tests may be in flight from what completions report,
+one window (about `limit` completions) at a time:
+
+- slow start   the limit doubles after each clean window until the first cutback
+- increase     afterwards it grows by one per clean window
+- decrease     it is halved when, over a window, the success share falls well
+               below the best recent share, the median latency of successes
+               climbs past twice the best recent median, the process nears its
+               open-file limit, or a test reports EMFILE/ENFILE/EADDRNOTAVAIL
+
+Windows stretch until about MIN_SUCCESSES successes are expected, so
+lists that are mostly dead don't trip on noise. The "best recent"
+baselines decay a little every window, and a cut that doesn't bring the
+success share or latency back is undone and the baseline re-learned:
+a list whose dead share changes part-way through isn't load.
+"""
+
+import errno
+import math
+import os
+import threading
+from collections import Counter
+from typing import Optional
+
+# Local resource exhaustion: the proxy never got a fair test
+RESOURCE_ERRNOS = frozenset({errno.EMFILE, errno.ENFILE, errno.EADDRNOTAVAIL, errno.ENOBUFS})
+
+
+def is_resource_error(exc: BaseException) -> bool:
+    return isinstance(exc, OSError) and exc.errno in RESOURCE_ERRNOS
+
+
+def fd_usage() -> Optional[float]:
+    """Open descriptors as a share of the soft RLIMIT_NOFILE, or None where unknown"""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft == resource.RLIM_INFINITY or soft <= 0:
+            return None
+        return len(os.listdir("/proc/self/fd")) / soft
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+class AIMDController:
+    """Additive-increase / multiplicative-decrease limit on tests in flight"""
+
+    MIN_WINDOW = 16
+    MIN_SUCCESSES = 10      # windows stretch until this many successes are expected
+    SUCCESS_DROP = 0.5      # cut when the success share falls below half the best recent share
+    LATENCY_FACTOR = 2.0    # cut when median latency exceeds twice the best recent median
+    DECREASE = 0.5
+    BASELINE_DECAY = 0.1    # per window
+    FD_HIGH = 0.85
+
+    def __init__(self, maximum: int, initial: Optional[int] = None, minimum: int = 1,
+                 adaptive: bool = True, name: str = "tests", metrics=None):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.adaptive = adaptive
+        self.name = name
+        self.metrics = metrics
+        start = self.maximum if not adaptive or initial is None else initial
+        self.limit = max(self.minimum, min(start, self.maximum))
+        self.peak = self.limit
+        self.in_flight = 0
+        self.completed = 0
+        self.cutbacks = Counter()
+
+        self._cond = threading.Condition()
+        self._slow_start = True
+        self._best_success: Optional[float] = None
+        self._best_latency: Optional[float] = None
+        self._last_cut = None   # (reason, limit before the cut) while a cut awaits its verdict
+        self._resource_cut = None   # (completed, limit) at the last resource_error cut
+        self._reset_window()
+        self._publish(None)
+
+    def _reset_window(self):
+        self._window = 0
+        self._window_ok = 0
+        self._latencies = []
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take an in-flight slot; without blocking, False when all are taken"""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                if not blocking:
+                    return False
+                self._cond.wait()
+            self.in_flight += 1
+            return True
+
+    def release(self, success: bool, seconds: float, exhausted: bool = False):
+        """Return a slot with the test's outcome and duration"""
+        with self._cond:
+            self.in_flight -= 1
+            self.completed += 1
+            if self.adaptive:
+                self._record(success, seconds, exhausted)
+            self._cond.notify_all()
+
+    def _record(self, success: bool, seconds: float, exhausted: bool):
+        if exhausted:
+            # One burst of EMFILE comes from tests already in flight: cut once,
+            # then ignore errors until the tests started before the cut are done
+            last = self._resource_cut
+            if last is None or self.completed - last[0] > last[1]:
+                self._resource_cut = (self.completed, self.limit)
+                self._decrease("resource_error")
+            return
+
+        self._window += 1
+        if success:
+            self._window_ok += 1
+            self._latencies.append(seconds)
+        needed = max(self.MIN_WINDOW, self.limit)
+        if self._best_success:
+            needed = max(needed, int(self.MIN_SUCCESSES / self._best_success))
+        if self._window < needed:
+            return
+
+        usage = fd_usage()
+        if usage is not None and usage >= self.FD_HIGH:
+            self._decrease("fd_pressure")
+            return
+
+        share = self._window_ok / self._window
+        latencies = sorted(self._latencies)
+        latency = latencies[len(latencies) // 2] if len(latencies) >= 3 else None
+
+        reason = None
+        if self._best_success is not None:
+            # Well below the baseline and beyond 3 sigma of binomial noise
+            expected = self._best_success * self._window
+            noise = 3 * math.sqrt(expected * (1 - self._best_success))
+            if self._window_ok < min(expected * (1 - self.SUCCESS_DROP), expected - noise):
+                reason = "success_drop"
+        if reason is None and latency is not None and self._best_latency is not None and latency > self._best_latency * self.LATENCY_FACTOR:
+            reason = "latency"
+
+        last_cut, self._last_cut = self._last_cut, None
+        if reason and last_cut and last_cut[0] == reason:
+            # Backing off didn't help, so the proxies changed rather than the load:
+            # take the new level as the baseline, give the cut back and probe upwards again
+            if reason == "success_drop":
+                self._best_success = share
+            else:
+                self._best_latency = latency
+            self._slow_start = True
+            self._set_limit(min(self.maximum, last_cut[1]), None)
+            return
+
+        decay = 1 - self.BASELINE_DECAY
+        self._best_success = share if self._best_success is None else max(share, self._best_success * decay)
+        if latency is not None:
+            self._best_latency = latency if self._best_latency is None else min(latency, self._best_latency / decay)
+
+        if reason:
+            self._decrease(reason)
+        else:
+            self._increase()
+
+    def _increase(self):
+        grown = self.limit * 2 if self._slow_start else self.limit + 1
+        self._set_limit(min(self.maximum, grown), None)
+
+    def _decrease(self, reason: str):
+        self._slow_start = False
+        self.cutbacks[reason] += 1
+        self._last_cut = (reason, self.limit)
+        self._set_limit(max(self.minimum, int(self.limit * self.DECREASE)), reason)
+
+    def _set_limit(self, limit: int, reason: Optional[str]):
+        self.limit = limit
+        self.peak = max(self.peak, limit)
+        self._reset_window()
+        self._publish(reason)
+
+    def _publish(self, reason: Optional[str]):
+        if self.metrics is not None:
+            self.metrics.record_concurrency(self.name, self.limit, reason)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "peak": self.peak,
+            "completed": self.completed,
+            "cutbacks": dict(self.cutbacks),
+        }
+
+    def describe(self) -> str:
+        """One-line summary for reports"""
+        if not self.adaptive:
+            return f"fixed at {self.limit}"
+        cuts = sum(self.cutbacks.values())
+        reasons = ", ".join(f"{count} {reason}" for reason, count in self.cutbacks.most_common())
+        return f"limit {self.limit} (peak {self.peak}, {cuts} cutbacks{': ' + reasons if cuts else ''})"
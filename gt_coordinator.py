@@ -0,0 +1,320 @@
+#!/home/joy/cproxy/venv/bin/python3
+
+"""
+Growtopia Distributed Scan Coordinator
+Spreads proxy tests over several worker processes or machines
+
+The coordinator is a SQLite database holding the proxy queue and the
+result store. Workers (running the existing tester classes) lease a
+batch of proxies, renew the lease while they test, and post results.
+Leases that expire because a worker died or stalled go back to the
+queue and are handed to the next worker that asks.
+
+SQLite in WAL mode handles many worker processes on one box. For
+several machines put the database on storage all nodes can lock
+reliably (or run the workers on the box that holds it).
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from gt_records import SCORE_KEYS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proxies (
+    url           TEXT PRIMARY KEY,
+    state         TEXT NOT NULL DEFAULT 'pending',  -- pending | leased | done | failed
+    lease_owner   TEXT,
+    lease_expires REAL,
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    added         REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS proxies_queue ON proxies (state, lease_expires);
+CREATE TABLE IF NOT EXISTS results (
+    url        TEXT PRIMARY KEY,
+    worker     TEXT NOT NULL,
+    tester     TEXT NOT NULL,
+    compatible INTEGER NOT NULL,
+    score      INTEGER NOT NULL,
+    results    TEXT NOT NULL,
+    finished   REAL NOT NULL
+);
+"""
+
+class ScanCoordinator:
+    """Proxy queue with leases plus result store, backed by one SQLite file"""
+
+    def __init__(self, path: str = "gt_coordinator.db", max_attempts: int = 3):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._db.close()
+
+    def _transaction(self, statements):
+        """Run statements(cursor) inside BEGIN IMMEDIATE so leases never overlap"""
+        with self._lock:
+            cursor = self._db.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                value = statements(cursor)
+                cursor.execute("COMMIT")
+                return value
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+
+    def add(self, urls: Iterable[str], batch_size: int = 5000) -> int:
+        """Queue proxies; already-known URLs are ignored. Returns how many were new"""
+        added = 0
+        batch = []
+        now = time.time()
+
+        def flush(cursor):
+            cursor.executemany("INSERT OR IGNORE INTO proxies (url, added) VALUES (?, ?)", batch)
+            return cursor.rowcount
+
+        for url in urls:
+            batch.append((url, now))
+            if len(batch) >= batch_size:
+                added += self._transaction(flush)
+                batch = []
+        if batch:
+            added += self._transaction(flush)
+        return added
+
+    def lease(self, worker: str, batch: int = 10, lease_seconds: float = 120.0) -> List[str]:
+        """Hand out pending proxies and proxies whose lease has expired"""
+        def take(cursor):
+            now = time.time()
+            # Proxies that keep killing their workers are given up on
+            cursor.execute(
+                "UPDATE proxies SET state = 'failed', lease_owner = NULL "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            rows = cursor.execute(
+                "SELECT url FROM proxies WHERE state = 'pending' "
+                "OR (state = 'leased' AND lease_expires < ?) LIMIT ?",
+                (now, batch)
+            ).fetchall()
+            urls = [row[0] for row in rows]
+            cursor.executemany(
+                "UPDATE proxies SET state = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE url = ?",
+                [(worker, now + lease_seconds, url) for url in urls]
+            )
+            return urls
+
+        return self._transaction(take)
+
+    def renew(self, worker: str, urls: List[str], lease_seconds: float = 120.0) -> int:
+        """Extend this worker's leases; returns how many it still holds"""
+        def extend(cursor):
+            expires = time.time() + lease_seconds
+            cursor.executemany(
+                "UPDATE proxies SET lease_expires = ? WHERE url = ? AND lease_owner = ? AND state = 'leased'",
+                [(expires, url, worker) for url in urls]
+            )
+            return cursor.rowcount
+
+        return self._transaction(extend) if urls else 0
+
+    def complete(self, worker: str, url: str, tester: str, compatible: bool, results: dict) -> bool:
+        """
+        Store a result and take the proxy off the queue. Returns False (and
+        stores nothing) when the worker's lease expired and another worker
+        has taken the proxy over.
+        """
+        score = results.get(SCORE_KEYS.get(tester, "overall_score"), 0)
+
+        def store(cursor):
+            cursor.execute(
+                "UPDATE proxies SET state = 'done', lease_owner = NULL, lease_expires = NULL "
+                "WHERE url = ? AND lease_owner = ? AND state = 'leased'",
+                (url, worker)
+            )
+            if not cursor.rowcount:
+                return False
+            cursor.execute(
+                "INSERT OR REPLACE INTO results (url, worker, tester, compatible, score, results, finished) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, worker, tester, int(compatible), score, json.dumps(results), time.time())
+            )
+            return True
+
+        return self._transaction(store)
+
+    def remaining(self) -> int:
+        """Proxies still pending or leased"""
+        row = self._db.execute("SELECT COUNT(*) FROM proxies WHERE state IN ('pending', 'leased')").fetchone()
+        return row[0]
+
+    def stats(self) -> dict:
+        counts = dict(self._db.execute("SELECT state, COUNT(*) FROM proxies GROUP BY state").fetchall())
+        compatible = self._db.execute("SELECT COUNT(*) FROM results WHERE compatible = 1").fetchone()[0]
+        workers = self._db.execute("SELECT worker, COUNT(*) FROM results GROUP BY worker").fetchall()
+        return {
+            "pending": counts.get("pending", 0),
+            "leased": counts.get("leased", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "compatible": compatible,
+            "per_worker": dict(workers),
+        }
+
+    def compatible_results(self) -> List[Tuple[str, str, dict]]:
+        """(url, tester, results) of every compatible proxy, best score first"""
+        rows = self._db.execute("SELECT url, tester, results FROM results WHERE compatible = 1 ORDER BY score DESC")
+        return [(url, tester, json.loads(results)) for url, tester, results in rows]
+
+
+def make_tester(kind: str):
+    """Build the tester class for a kind and return (tester, test function)"""
+    if kind == "advanced":
+        from advanced_gt_tester import GrowtopiaENetTester
+        tester = GrowtopiaENetTester(show_banner=False)
+        return tester, tester.test_advanced_growtopia_compatibility
+    if kind == "realistic":
+        from realistic_gt_tester import RealisticGrowtopiaProxyTester
+        tester = RealisticGrowtopiaProxyTester(show_banner=False)
+        return tester, tester.test_realistic_growtopia_compatibility
+    from gt_proxy_tester import GrowtopiaProxyTester
+    tester = GrowtopiaProxyTester(show_banner=False)
+    return tester, tester.test_full_growtopia_compatibility
+
+
+class ScanWorker:
+    """Leases batches from a coordinator, tests them and posts results"""
+
+    def __init__(self, coordinator: ScanCoordinator, tester_kind: str = "standard",
+                 worker_id: Optional[str] = None, batch: int = 10, lease_seconds: float = 120.0):
+        self.coordinator = coordinator
+        self.tester_kind = tester_kind
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch = batch
+        self.lease_seconds = lease_seconds
+        self.tester, self.test = make_tester(tester_kind)
+        self.tested = 0
+
+    def _renew_loop(self, held: List[str], stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            self.coordinator.renew(self.worker_id, list(held), self.lease_seconds)
+
+    def run(self, poll_seconds: float = 0.0) -> int:
+        """Work until the queue is empty (or forever when poll_seconds > 0)"""
+        while True:
+            urls = self.coordinator.lease(self.worker_id, self.batch, self.lease_seconds)
+            if not urls:
+                if poll_seconds <= 0 and self.coordinator.remaining() == 0:
+                    return self.tested
+                # Leases held by other workers may still expire and come back
+                time.sleep(poll_seconds or min(5.0, self.lease_seconds / 4))
+                continue
+
+            held = list(urls)
+            stop = threading.Event()
+            renewer = threading.Thread(target=self._renew_loop, args=(held, stop), daemon=True)
+            renewer.start()
+            try:
+                for url in urls:
+                    is_compatible, results = self.test(url)
+                    held.remove(url)
+                    if not self.coordinator.complete(self.worker_id, url, self.tester_kind, is_compatible, results):
+                        self.tester._log("WARNING", f"Lease on {url} expired and was taken over; result dropped")
+                        continue
+                    self.tested += 1
+            finally:
+                stop.set()
+                renewer.join()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Growtopia Distributed Scan Coordinator")
+    parser.add_argument("--db", default="gt_coordinator.db", help="Coordinator database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Queue proxies from a file")
+    add.add_argument("proxy_file")
+
+    work = commands.add_parser("worker", help="Lease and test proxies until the queue is empty")
+    work.add_argument("--tester", choices=sorted(SCORE_KEYS), default="standard")
+    work.add_argument("--batch", type=int, default=10, help="Proxies per lease")
+    work.add_argument("--lease", type=float, default=120.0, help="Lease length in seconds")
+    work.add_argument("--forever", action="store_true", help="Keep polling for new proxies")
+    work.add_argument("--id", help="Worker id (default host:pid)")
+    work.add_argument("--no-rate-limit", action="store_true", help="Send requests to Growtopia unthrottled")
+    work.add_argument("--fixed-timeouts", action="store_true", help="Keep the default stage timeouts")
+    work.add_argument("--low-bytes", action="store_true",
+                      help="Read only the status of pages whose body is unused (metered bandwidth)")
+    work.add_argument("--history", metavar="DIR", help="Also record every outcome for gt_history.py reports")
+
+    commands.add_parser("status", help="Show queue and result counts")
+
+    export = commands.add_parser("export", help="Append compatible proxies to working_proxies.txt")
+    export.add_argument("--file", default="working_proxies.txt")
+
+    args = parser.parse_args()
+    coordinator = ScanCoordinator(args.db)
+
+    if args.command == "add":
+        from gt_ingest import iter_proxy_file
+        if not os.path.isfile(args.proxy_file):
+            print(f"Error: File {args.proxy_file} not found")
+            sys.exit(1)
+        added = coordinator.add(iter_proxy_file(args.proxy_file))
+        print(f"Queued {added} new proxies ({coordinator.remaining()} waiting)")
+
+    elif args.command == "worker":
+        worker = ScanWorker(coordinator, args.tester, args.id, args.batch, args.lease)
+        worker.tester.enable_console_output()
+        if not args.no_rate_limit:
+            # Each worker paces its own requests; lower the rates when running many
+            worker.tester.enable_rate_limits()
+        if not args.fixed_timeouts:
+            worker.tester.enable_stage_timeouts()
+        worker.tester.enable_byte_counters()
+        worker.tester.low_bytes = args.low_bytes
+        if args.history:
+            worker.tester.enable_history(args.history)
+        print(f"Worker {worker.worker_id} started ({args.tester} tester)")
+        try:
+            tested = worker.run(poll_seconds=5.0 if args.forever else 0.0)
+        finally:
+            if worker.tester.stage_timeouts is not None:
+                worker.tester.stage_timeouts.save()
+        print(f"Worker {worker.worker_id} finished: {tested} proxies tested")
+
+    elif args.command == "status":
+        stats = coordinator.stats()
+        print(f"Pending: {stats['pending']}  Leased: {stats['leased']}  Done: {stats['done']}  "
+              f"Failed: {stats['failed']}  Compatible: {stats['compatible']}")
+        for worker, count in sorted(stats["per_worker"].items()):
+            print(f"  {worker}: {count} results")
+
+    elif args.command == "export":
+        from gt_proxy_tester import GrowtopiaProxyTester
+        tester = GrowtopiaProxyTester()
+        tester.enable_console_output()
+        tester.working_proxies_file = args.file
+        for url, kind, results in coordinator.compatible_results():
+            tester.save_working_proxy(url, results, results.get(SCORE_KEYS.get(kind, "overall_score"), 0))
+
+    coordinator.close()
+
+
+if __name__ == "__main__":
+    main()
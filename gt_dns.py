@@ -0,0 +1,184 @@
+"""
+Shared DNS cache for Growtopia proxy testers
+
+Every stage used to resolve the same names again (www.google.com, the
+Growtopia servers, the proxy's *.ip.heroku.ipb.cloud host). DNSCache
+wraps socket.getaddrinfo so requests/urllib3, PySocks and plain sockets
+all share one TTL-respecting cache, prefetches known hosts in parallel,
+and keeps per-thread counters so each proxy test can report how much
+DNS it cost and how much the cache saved.
+
+Record TTLs come from dnspython when it is installed; otherwise entries
+live for a fixed default TTL because getaddrinfo doesn't expose one.
+"""
+
+import ipaddress
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import dns.resolver as dns_resolver
+except ImportError:
+    dns_resolver = None
+
+
+class DNSCache:
+    """TTL-bounded host -> IPv4 address cache installed over socket.getaddrinfo"""
+
+    def __init__(self, default_ttl: float = 300.0, negative_ttl: float = 30.0,
+                 min_ttl: float = 5.0, max_ttl: float = 3600.0):
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self._entries: Dict[str, Tuple[List[str], float]] = {}
+        self._miss_cost: Dict[str, float] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._getaddrinfo = socket.getaddrinfo
+        self._installed = False
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    # -- resolution ------------------------------------------------------
+
+    def _query(self, host: str) -> Tuple[List[str], float]:
+        """Resolve host outside the cache; returns (addresses, ttl)"""
+        if dns_resolver is not None:
+            try:
+                answer = dns_resolver.resolve(host, "A")
+                return [record.address for record in answer], float(answer.rrset.ttl)
+            except Exception:
+                pass  # Fall back to the system resolver (hosts file, search domains)
+        infos = self._getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        return addresses, self.default_ttl
+
+    def resolve_all(self, host: str) -> List[str]:
+        """All cached IPv4 addresses for host (raises socket.gaierror on failure)"""
+        host = host.rstrip(".").lower()
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(host)
+                if entry is not None and entry[1] > now:
+                    self.hits += 1
+                    self.saved_seconds += self._miss_cost.get(host, 0.0)
+                    self._count(hit=True, seconds=0.0, saved=self._miss_cost.get(host, 0.0))
+                    if not entry[0]:
+                        raise socket.gaierror(socket.EAI_NONAME, f"{host} (cached failure)")
+                    return entry[0]
+                waiter = self._inflight.get(host)
+                if waiter is None:
+                    waiter = self._inflight[host] = threading.Event()
+                    break
+            # Another thread is already resolving this host; reuse its answer
+            waiter.wait(timeout=30)
+
+        start = time.perf_counter()
+        addresses, ttl = [], self.negative_ttl
+        try:
+            addresses, ttl = self._query(host)
+            ttl = min(self.max_ttl, max(self.min_ttl, ttl))
+        except (socket.gaierror, OSError, ValueError):
+            # ValueError covers UnicodeError from IDNA encoding (e.g. a label over 63 chars)
+            addresses, ttl = [], self.negative_ttl
+        finally:
+            # Whatever happened, waiters must be released and find an entry
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._entries[host] = (addresses, time.monotonic() + ttl)
+                self._miss_cost[host] = elapsed
+                self.lookups += 1
+                self.lookup_seconds += elapsed
+                self._count(hit=False, seconds=elapsed, saved=0.0)
+                self._inflight.pop(host).set()
+
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NONAME, f"Name or service not known: {host}")
+        return addresses
+
+    def resolve(self, host: str) -> str:
+        return self.resolve_all(host)[0]
+
+    def prefetch(self, hosts: Iterable[str], workers: int = 8) -> ThreadPoolExecutor:
+        """Resolve hosts in parallel in the background"""
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gt-dns")
+        for host in dict.fromkeys(h for h in hosts if h and not _is_ip(h)):
+            pool.submit(self._prefetch_one, host)
+        pool.shutdown(wait=False)
+        return pool
+
+    def _prefetch_one(self, host: str):
+        try:
+            self.resolve_all(host)
+        except socket.gaierror:
+            pass
+
+    # -- socket.getaddrinfo hook ----------------------------------------
+
+    def install(self):
+        """Route socket.getaddrinfo through the cache for IPv4-capable lookups"""
+        if self._installed:
+            return
+        # Never stack on another cache's hook: a forked shard inherits the parent's,
+        # along with in-flight lookups whose resolving threads didn't survive the fork
+        self._getaddrinfo = getattr(socket.getaddrinfo, "__wrapped__", socket.getaddrinfo)
+        cache = self
+
+        def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+            if (isinstance(host, str) and family in (0, socket.AF_INET)
+                    and not flags & socket.AI_NUMERICHOST and not _is_ip(host)):
+                # A failure (fresh or negatively cached) already went through the
+                # system resolver in _query, so it is raised rather than retried
+                addresses = cache.resolve_all(host)
+                results = []
+                for address in addresses:
+                    results.extend(cache._getaddrinfo(address, port, socket.AF_INET, type, proto,
+                                                      flags | socket.AI_NUMERICHOST))
+                return results
+            return cache._getaddrinfo(host, port, family, type, proto, flags)
+
+        getaddrinfo.__wrapped__ = self._getaddrinfo
+        socket.getaddrinfo = getaddrinfo
+        self._installed = True
+
+    def uninstall(self):
+        if self._installed:
+            socket.getaddrinfo = self._getaddrinfo
+            self._installed = False
+
+    # -- accounting ------------------------------------------------------
+
+    def _count(self, hit: bool, seconds: float, saved: float):
+        local = self._local
+        local.lookups = getattr(local, "lookups", 0) + (0 if hit else 1)
+        local.hits = getattr(local, "hits", 0) + (1 if hit else 0)
+        local.seconds = getattr(local, "seconds", 0.0) + seconds
+        local.saved = getattr(local, "saved", 0.0) + saved
+
+    def thread_counters(self) -> Tuple[int, int, float, float]:
+        """(lookups, hits, lookup_seconds, saved_seconds) for the calling thread"""
+        local = self._local
+        return (getattr(local, "lookups", 0), getattr(local, "hits", 0),
+                getattr(local, "seconds", 0.0), getattr(local, "saved", 0.0))
+
+    def summary(self) -> str:
+        total = self.lookups + self.hits
+        hit_rate = 100.0 * self.hits / total if total else 0.0
+        return (f"DNS cache: {self.lookups} lookups ({self.lookup_seconds * 1000:.0f} ms), "
+                f"{self.hits} hits ({hit_rate:.0f}%), ~{self.saved_seconds * 1000:.0f} ms saved")
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
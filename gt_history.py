@@ -0,0 +1,649 @@
+#!/home/joy/cproxy/venv/bin/python3
+"""
+Columnar history of every test outcome, and reports over it
+
+working_proxies.txt keeps only the passes, as text. HistoryWriter records
+every verdict, pass or fail, as one row of fixed-width columns. Each
+column is its own append-only file in a part directory per writing
+process, so shards and workers never share a file:
+
+    time                  float64   epoch seconds of the verdict
+    tester                uint8     \\
+    location              uint16     > codes into the part's dictionary.json
+    host                  uint32    /  (host = the proxy's exit host)
+    compatible            uint8
+    score                 int8
+    http_status           uint16    0 when there is no numeric status
+    stages_run            uint16    bit per STAGES entry
+    stages_passed         uint16
+    <stage>_ms            float32   stage duration, NaN when it didn't run
+
+About 60 bytes a row. History maps the column files into memory
+(numpy.memmap when NumPy is installed), so a query reads only the
+columns it uses, and aggregates whole arrays at once: group keys are
+packed into one integer per row, counts and rates come from bincount,
+and per-group percentiles from a single sort. Without NumPy the same
+reports run as plain Python loops, only slower. A report over several
+parts concatenates their columns in memory, so `compact` merges the parts
+no process is writing any more into one.
+
+    ./gt_history.py compact
+    ./gt_history.py report --metric status --status 403 --by location,hour
+    ./gt_history.py report --metric latency --stage server_data --percentile 95 --by host --since 30d
+"""
+
+import json
+import math
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from gt_records import SCORE_KEYS, InternTable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_PATH = "gt_history"
+STAGES = (
+    "socks5_basic", "http_website", "server_data", "tcp_game_server", "enet_compat",
+    "enet_handshake", "login_sequence", "bandwidth", "udp_probe",
+)
+DICTIONARY_COLUMNS = ("tester", "location", "host")
+COLUMNS = {
+    "time": "d",
+    "tester": "B",
+    "location": "H",
+    "host": "I",
+    "compatible": "B",
+    "score": "b",
+    "http_status": "H",
+    "stages_run": "H",
+    "stages_passed": "H",
+    **{f"{stage}_ms": "f" for stage in STAGES},
+}
+METRICS = ("tests", "pass", "status", "score", "latency")
+# Readers skip dot-directories: compact's output until it is complete, and the parts it is merging
+COMPACT_TEMP = ".compact"
+MERGING = ".merging-"
+GROUP_KEYS = ("location", "host", "tester", "hour", "day")
+
+
+def _exit_host(proxy: str) -> str:
+    try:
+        return urlsplit(proxy if "://" in proxy else f"//{proxy}").hostname or proxy
+    except ValueError:
+        return proxy
+
+
+class HistoryWriter:
+    """
+    Appends one row per verdict. Rows are buffered and written every
+    FLUSH_ROWS rows or FLUSH_SECONDS, and on close(); the dictionary is
+    rewritten before the columns that refer to new codes.
+    """
+
+    FLUSH_ROWS = 4096
+    FLUSH_SECONDS = 5.0
+
+    def __init__(self, path: str = DEFAULT_PATH, location: Optional[Callable[[], str]] = None):
+        self.path = path
+        self.part = os.path.join(path, f"{socket.gethostname()}-{os.getpid()}-{int(time.time() * 1000)}")
+        self.location = location
+        self.rows = 0
+        self._columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        self._dictionaries = {name: InternTable() for name in DICTIONARY_COLUMNS}
+        self._saved_sizes = None
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def attach(self, events):
+        events.on("test_started", self._test_started)
+        events.on("stage_finished", self._stage_finished)
+        events.on("verdict", self._verdict)
+
+    def _test_started(self, proxy: str):
+        self._local.stages = {}
+
+    def _stage_finished(self, stage: str, outcome: str, seconds: float, result):
+        stages = getattr(self._local, "stages", None)
+        if stages is not None:
+            stages[stage] = {"outcome": outcome, "seconds": seconds}
+
+    def _verdict(self, proxy: str, tester: str, compatible: bool, results: dict):
+        location = self.location() if self.location is not None else None
+        self.record(proxy, tester, compatible, results, getattr(self._local, "stages", None), location)
+
+    def record(self, proxy: str, tester: str, compatible: bool, results: dict, stages: Optional[dict] = None,
+               location: Optional[str] = None, finished: Optional[float] = None):
+        """
+        Append one outcome. stages is {stage: {"outcome", "seconds"}} as in
+        the JSON Lines records; when it is None, stage pass/fail comes from
+        the boolean stage keys in results (and durations are unknown).
+        """
+        run = passed = 0
+        durations = []
+        for bit, stage in enumerate(STAGES):
+            info = stages.get(stage) if stages else None
+            if info is not None:
+                run |= 1 << bit
+                passed |= (info["outcome"] == "pass") << bit
+                durations.append(info["seconds"] * 1000)
+            else:
+                value = results.get(stage) if stages is None else None
+                if isinstance(value, bool):
+                    run |= 1 << bit
+                    passed |= value << bit
+                durations.append(math.nan)
+        status = str(results.get("http_status") or "")
+        score = results.get(SCORE_KEYS.get(tester, "overall_score"), 0) or 0
+
+        with self._lock:
+            columns = self._columns
+            columns["time"].append(finished if finished is not None else time.time())
+            columns["tester"].append(self._dictionaries["tester"].intern(tester))
+            columns["location"].append(self._dictionaries["location"].intern(location or "unknown"))
+            columns["host"].append(self._dictionaries["host"].intern(_exit_host(proxy)))
+            columns["compatible"].append(bool(compatible))
+            columns["score"].append(max(-128, min(127, int(score))))
+            columns["http_status"].append(int(status) if status.isdigit() and int(status) < 65536 else 0)
+            columns["stages_run"].append(run)
+            columns["stages_passed"].append(passed)
+            for stage, milliseconds in zip(STAGES, durations):
+                columns[f"{stage}_ms"].append(milliseconds)
+            self.rows += 1
+            if (len(columns["time"]) >= self.FLUSH_ROWS
+                    or time.monotonic() - self._last_flush >= self.FLUSH_SECONDS):
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._columns["time"]:
+            return
+        # A part compact() merged away starts over, with its dictionary
+        fresh = not os.path.isdir(self.part)
+        os.makedirs(self.part, exist_ok=True)
+        sizes = tuple(len(table.values) for table in self._dictionaries.values())
+        if fresh or sizes != self._saved_sizes:
+            temporary = os.path.join(self.part, "dictionary.json.tmp")
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump({name: table.values for name, table in self._dictionaries.items()}, f)
+            os.replace(temporary, os.path.join(self.part, "dictionary.json"))
+            self._saved_sizes = sizes
+        for name, column in self._columns.items():
+            with open(os.path.join(self.part, f"{name}.bin"), "ab") as f:
+                column.tofile(f)
+            del column[:]
+
+    def close(self):
+        self.flush()
+
+
+class History:
+    """Read-only view over every part under a history directory"""
+
+    def __init__(self, path: str = DEFAULT_PATH, parts: Optional[List[str]] = None):
+        """parts: these part directories instead of every one under path"""
+        self.path = path
+        self.parts: List[str] = []
+        self.dictionaries = {name: InternTable() for name in DICTIONARY_COLUMNS}
+        self._remaps: List[Dict[str, list]] = []
+        self._rows: List[int] = []
+        self._cache: Dict[str, object] = {}
+        if parts is None:
+            names = sorted(os.listdir(path)) if os.path.isdir(path) else []
+            parts = [os.path.join(path, name) for name in names if not name.startswith(".")]
+        for part in parts:
+            try:
+                with open(os.path.join(part, "dictionary.json"), encoding="utf-8") as f:
+                    dictionary = json.load(f)
+            except (OSError, ValueError):
+                continue
+            # A row counts once every column has it (a crash can cut a flush short)
+            rows = min(self._file_rows(part, column) for column in ("time", "tester", "location", "host"))
+            remap = {}
+            for column, table in self.dictionaries.items():
+                remap[column] = [0] + [table.intern(value) for value in dictionary.get(column, [None])[1:]]
+            self.parts.append(part)
+            self._remaps.append(remap)
+            self._rows.append(rows)
+
+    @staticmethod
+    def _file_rows(part: str, column: str) -> int:
+        try:
+            return os.path.getsize(os.path.join(part, f"{column}.bin")) // array(COLUMNS[column]).itemsize
+        except OSError:
+            return 0
+
+    def __len__(self) -> int:
+        return sum(self._rows)
+
+    def labels(self, column: str) -> List[str]:
+        return [value or "unknown" for value in self.dictionaries[column].values]
+
+    def column(self, name: str):
+        """One column over all parts: a NumPy array (memory-mapped for a single part) or an array.array"""
+        cached = self._cache.get(name)
+        if cached is not None:
+            return cached
+        typecode = COLUMNS[name]
+        pieces = list(self._pieces(name))
+        if np is not None:
+            if not pieces:
+                column = np.zeros(0, dtype=typecode)
+            else:
+                column = pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
+        else:
+            column = array("I" if name in DICTIONARY_COLUMNS else typecode)
+            for piece in pieces:
+                column.extend(piece)
+        self._cache[name] = column
+        return column
+
+    def _pieces(self, name: str):
+        """The column part by part, dictionary codes mapped to self.dictionaries"""
+        typecode = COLUMNS[name]
+        for part, rows, remap in zip(self.parts, self._rows, self._remaps):
+            if not rows:
+                continue
+            path = os.path.join(part, f"{name}.bin")
+            # Columns added after a part was written read as missing
+            missing = self._file_rows(part, name) < rows
+            if np is not None:
+                if missing:
+                    piece = np.full(rows, np.nan if typecode in "fd" else 0, dtype=typecode)
+                else:
+                    piece = np.memmap(path, dtype=typecode, mode="r", shape=(rows,))
+                if name in DICTIONARY_COLUMNS:
+                    piece = np.asarray(remap[name], dtype=np.uint32)[piece]
+            else:
+                if missing:
+                    piece = array(typecode, [math.nan if typecode in "fd" else 0]) * rows
+                else:
+                    piece = array(typecode)
+                    with open(path, "rb") as f:
+                        piece.fromfile(f, rows)
+                if name in DICTIONARY_COLUMNS:
+                    codes = remap[name]
+                    piece = array("I", [codes[code] for code in piece])
+            yield piece
+
+    def _filters(self, since: Optional[float], tester: Optional[str], location: Optional[str]) -> List[Tuple[str, object]]:
+        """(column, test) pairs; a test is a minimum time or a dictionary code"""
+        filters = []
+        if since is not None:
+            filters.append(("time", since))
+        for column, value in (("tester", tester), ("location", location)):
+            if value is not None:
+                # Code 0 is never stored, so an unseen value matches nothing
+                filters.append((column, self.dictionaries[column].index.get(value, 0)))
+        return filters
+
+    def report(self, metric: str, by: List[str], stage: Optional[str] = None, percentile: float = 95.0,
+               status: int = 403, since: Optional[float] = None, tester: Optional[str] = None,
+               location: Optional[str] = None, min_count: int = 1) -> List[Tuple[tuple, int, Optional[float]]]:
+        """
+        [(group labels, rows, value)] for one metric, sorted by group:
+
+            tests    value is None (just the row count)
+            pass     % of tests that were compatible
+            status   % of tests with an HTTP status that got `status`
+            score    mean score
+            latency  percentile of `stage` duration in ms, over tests where it ran
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r} (expected one of {', '.join(METRICS)})")
+        if metric == "latency" and stage not in STAGES:
+            raise ValueError(f"latency needs --stage, one of {', '.join(STAGES)}")
+        for key in by:
+            if key not in GROUP_KEYS:
+                raise ValueError(f"Unknown group {key!r} (expected one of {', '.join(GROUP_KEYS)})")
+        filters = self._filters(since, tester, location)
+        aggregate = self._aggregate_numpy if np is not None else self._aggregate_python
+        groups = aggregate(metric, by, stage, percentile, status, filters)
+
+        day_base = groups.pop("day_base", 0)
+        rows = []
+        for codes, (count, value) in groups.items():
+            if count >= min_count:
+                rows.append((tuple(self._label(key, code, day_base) for key, code in zip(by, codes)), count, value))
+        return sorted(rows)
+
+    def _label(self, key: str, code: int, day_base: int) -> str:
+        if key == "hour":
+            return f"{code:02d}:00"
+        if key == "day":
+            return datetime.fromtimestamp((day_base + code) * 86400, timezone.utc).strftime("%Y-%m-%d")
+        return self.dictionaries[key].values[code] or "unknown"
+
+    def _aggregate_numpy(self, metric, by, stage, percentile, status, filters) -> dict:
+        times = self.column("time")
+        keep = np.ones(len(times), dtype=bool)
+        for column, test in filters:
+            keep &= times >= test if column == "time" else self.column(column) == test
+        values = None
+        if metric == "pass":
+            values = self.column("compatible").astype(np.float64)
+        elif metric == "status":
+            statuses = self.column("http_status")
+            keep &= statuses != 0
+            values = (statuses == status).astype(np.float64)
+        elif metric == "score":
+            values = self.column("score").astype(np.float64)
+        elif metric == "latency":
+            values = self.column(f"{stage}_ms")
+            keep &= ~np.isnan(values)
+
+        # Pack every group key into one integer per row
+        group = np.zeros(int(keep.sum()), dtype=np.int64)
+        sizes = []
+        day_base = 0
+        for key in by:
+            if key == "hour":
+                codes, size = (times[keep] // 3600 % 24).astype(np.int64), 24
+            elif key == "day":
+                days = (times[keep] // 86400).astype(np.int64)
+                day_base = int(days.min()) if len(days) else 0
+                codes = days - day_base
+                size = int(codes.max()) + 1 if len(codes) else 1
+            else:
+                codes, size = self.column(key)[keep].astype(np.int64), len(self.dictionaries[key].values)
+            group = group * size + codes
+            sizes.append(size)
+
+        unique, inverse, counts = np.unique(group, return_inverse=True, return_counts=True)
+        if values is None:
+            results = [None] * len(unique)
+        elif metric == "latency":
+            selected = values[keep]
+            order = np.lexsort((selected, inverse))
+            starts = np.cumsum(counts) - counts
+            ranks = np.maximum(1, np.ceil(counts * percentile / 100.0).astype(np.int64))
+            results = selected[order][starts + np.minimum(ranks, counts) - 1].tolist()
+        else:
+            results = (np.bincount(inverse, weights=values[keep], minlength=len(unique)) / counts).tolist()
+            if metric != "score":
+                results = [value * 100 for value in results]
+
+        groups = {"day_base": day_base}
+        for packed, count, value in zip(unique.tolist(), counts.tolist(), results):
+            codes = []
+            for size in reversed(sizes):
+                packed, code = divmod(packed, size)
+                codes.append(code)
+            groups[tuple(reversed(codes))] = (count, value)
+        return groups
+
+    def _aggregate_python(self, metric, by, stage, percentile, status, filters) -> dict:
+        times = self.column("time")
+        filter_columns = [(self.column(column), test, column == "time") for column, test in filters]
+        key_columns = [None if key in ("hour", "day") else self.column(key) for key in by]
+        compatible = self.column("compatible") if metric == "pass" else None
+        statuses = self.column("http_status") if metric == "status" else None
+        scores = self.column("score") if metric == "score" else None
+        durations = self.column(f"{stage}_ms") if metric == "latency" else None
+
+        day_base = min((int(t // 86400) for t in times), default=0) if "day" in by else 0
+        collected: Dict[tuple, list] = {}
+        for row, when in enumerate(times):
+            if any(column[row] < test if is_time else column[row] != test for column, test, is_time in filter_columns):
+                continue
+            if statuses is not None:
+                if not statuses[row]:
+                    continue
+                value = 100.0 if statuses[row] == status else 0.0
+            elif durations is not None:
+                value = durations[row]
+                if value != value:  # NaN: the stage didn't run
+                    continue
+            elif compatible is not None:
+                value = 100.0 if compatible[row] else 0.0
+            elif scores is not None:
+                value = scores[row]
+            else:
+                value = None
+            codes = []
+            for key, column in zip(by, key_columns):
+                if key == "hour":
+                    codes.append(int(when // 3600 % 24))
+                elif key == "day":
+                    codes.append(int(when // 86400) - day_base)
+                else:
+                    codes.append(column[row])
+            collected.setdefault(tuple(codes), []).append(value)
+
+        groups = {"day_base": day_base}
+        for codes, values in collected.items():
+            if metric == "tests":
+                groups[codes] = (len(values), None)
+            elif metric == "latency":
+                values.sort()
+                rank = max(1, math.ceil(len(values) * percentile / 100.0))
+                groups[codes] = (len(values), values[min(rank, len(values)) - 1])
+            else:
+                groups[codes] = (len(values), sum(values) / len(values))
+        return groups
+
+    def summary(self) -> dict:
+        times = self.column("time")
+        compatible = self.column("compatible")
+        rows = len(times)
+        if np is not None and rows:
+            first, last, passed = float(times.min()), float(times.max()), int(compatible.sum())
+        else:
+            first, last, passed = min(times, default=None), max(times, default=None), sum(compatible)
+        return {
+            "rows": rows,
+            "parts": len(self.parts),
+            "first": first,
+            "last": last,
+            "compatible": passed,
+            "testers": len(self.dictionaries["tester"].values) - 1,
+            "locations": len(self.dictionaries["location"].values) - 1,
+            "hosts": len(self.dictionaries["host"].values) - 1,
+            "bytes": sum(os.path.getsize(os.path.join(part, name)) for part in self.parts for name in os.listdir(part)),
+        }
+
+
+def compact(path: str = DEFAULT_PATH, idle_seconds: float = 3600.0) -> Tuple[int, int]:
+    """
+    Merge every part nobody has written to for idle_seconds into one, so
+    reports memory-map a single file per column instead of concatenating
+    copies. Returns (parts merged, rows).
+    """
+    names = sorted(os.listdir(path)) if os.path.isdir(path) else []
+    now = time.time()
+    # Parts a crashed compact had started merging go in again
+    sources = [os.path.join(path, name) for name in names if name.startswith(MERGING)]
+    idle = []
+    for name in names:
+        part = os.path.join(path, name)
+        if name.startswith(".") or not os.path.isdir(part):
+            continue
+        files = [os.path.join(part, file) for file in os.listdir(part)]
+        if files and now - max(os.path.getmtime(file) for file in files) >= idle_seconds:
+            idle.append(name)
+    if len(sources) + len(idle) < 2:
+        return 0, 0
+    for name in idle:
+        # Out of the readers' view first, so no report counts a row twice
+        hidden = os.path.join(path, MERGING + name)
+        os.rename(os.path.join(path, name), hidden)
+        sources.append(hidden)
+
+    view = History(path, sources)
+    temporary = os.path.join(path, COMPACT_TEMP)
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    for name, typecode in COLUMNS.items():
+        with open(os.path.join(temporary, f"{name}.bin"), "wb") as f:
+            for piece in view._pieces(name):
+                if name in DICTIONARY_COLUMNS:
+                    piece = piece.astype(typecode) if np is not None else array(typecode, piece)
+                piece.tofile(f)
+    with open(os.path.join(temporary, "dictionary.json"), "w", encoding="utf-8") as f:
+        json.dump({name: table.values for name, table in view.dictionaries.items()}, f)
+    os.rename(temporary, os.path.join(path, f"compact-{int(now * 1000)}-{os.getpid()}"))
+    for part in sources:
+        shutil.rmtree(part, ignore_errors=True)
+    return len(view.parts), len(view)
+
+
+def import_results(path: str, writer: HistoryWriter) -> int:
+    """Append stored results: --format jsonl output, or a gt_coordinator database"""
+    imported = 0
+    if path.endswith(".db"):
+        with sqlite3.connect(path) as db:
+            rows = db.execute("SELECT url, tester, compatible, results, finished FROM results")
+            for url, tester, compatible, results, finished in rows:
+                writer.record(url, tester, bool(compatible), json.loads(results), finished=finished)
+                imported += 1
+        return imported
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("type") != "result":
+                continue
+            writer.record(record["proxy"], record["tester"], record["compatible"], record.get("results", {}),
+                          record.get("stages"), finished=record.get("finished"))
+            imported += 1
+    return imported
+
+
+def parse_since(text: str) -> float:
+    """Cutoff timestamp from an age (30d, 12h, 90m, 45s) or a YYYY-MM-DD date (UTC)"""
+    units = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+    if text[-1:] in units:
+        try:
+            return time.time() - float(text[:-1]) * units[text[-1]]
+        except ValueError:
+            pass
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid --since {text!r} (an age like 30d / 12h / 90m, or YYYY-MM-DD)")
+
+
+def format_report(by: List[str], metric: str, rows: List[Tuple[tuple, int, Optional[float]]], heading: str) -> str:
+    widths = [max([len(key)] + [len(labels[index]) for labels, _, _ in rows]) for index, key in enumerate(by)]
+    lines = [f"  {'  '.join(key.ljust(width) for key, width in zip(by, widths))}  {'tests':>8}  {heading:>10}".rstrip()]
+    for labels, count, value in rows:
+        if value is None:
+            shown = "" if metric == "tests" else "-"
+        elif metric in ("pass", "status"):
+            shown = f"{value:.1f}%"
+        elif metric == "latency":
+            shown = f"{value:.0f} ms"
+        else:
+            shown = f"{value:.1f}"
+        lines.append(f"  {'  '.join(label.ljust(width) for label, width in zip(labels, widths))}  {count:>8}  {shown:>10}".rstrip())
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Growtopia proxy test history")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="History directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    report = commands.add_parser("report", help="Aggregate one metric by location, host, tester, hour or day")
+    report.add_argument("--metric", choices=METRICS, default="pass")
+    report.add_argument("--by", default="location", help=f"Comma-separated groups: {', '.join(GROUP_KEYS)} (hours and days in UTC)")
+    report.add_argument("--stage", choices=STAGES, help="Stage for --metric latency")
+    report.add_argument("--percentile", type=float, default=95.0, help="Percentile for --metric latency")
+    report.add_argument("--status", type=int, default=403, help="HTTP status for --metric status")
+    report.add_argument("--since", help="Only tests newer than an age (30d, 12h) or a date (YYYY-MM-DD)")
+    report.add_argument("--tester", help="Only this tester (standard, advanced, realistic)")
+    report.add_argument("--location", help="Only this proxy location")
+    report.add_argument("--min-count", type=int, default=1, help="Hide groups with fewer tests")
+    report.add_argument("--top", type=int, metavar="N", help="Only the N groups with the highest value")
+
+    commands.add_parser("summary", help="Rows, time range and size of the history")
+
+    merge = commands.add_parser("compact", help="Merge the parts no process is writing into one")
+    merge.add_argument("--idle", type=float, default=60.0, metavar="MINUTES",
+                       help="Only parts unchanged for this long (a live writer flushes every few seconds)")
+
+    load = commands.add_parser("import", help="Append --format jsonl output or a gt_coordinator .db")
+    load.add_argument("files", nargs="+")
+
+    args = parser.parse_args()
+
+    if args.command == "import":
+        writer = HistoryWriter(args.path)
+        for path in args.files:
+            if not os.path.isfile(path):
+                print(f"Error: File {path} not found")
+                sys.exit(1)
+            print(f"{path}: {import_results(path, writer)} results")
+        writer.close()
+        return
+
+    if args.command == "compact":
+        start = time.perf_counter()
+        parts, rows = compact(args.path, args.idle * 60)
+        if parts:
+            print(f"Merged {parts} parts ({rows} tests) in {time.perf_counter() - start:.1f}s")
+        else:
+            print(f"Nothing to merge in {args.path}")
+        return
+
+    history = History(args.path)
+    if not len(history):
+        print(f"No history in {args.path}")
+        sys.exit(1)
+
+    if args.command == "summary":
+        stats = history.summary()
+        first = datetime.fromtimestamp(stats["first"]).strftime("%Y-%m-%d %H:%M")
+        last = datetime.fromtimestamp(stats["last"]).strftime("%Y-%m-%d %H:%M")
+        print(f"{stats['rows']} tests ({stats['compatible']} compatible) in {stats['parts']} parts, "
+              f"{stats['bytes'] / 1e6:.1f} MB")
+        print(f"From {first} to {last}; {stats['testers']} testers, {stats['locations']} locations, "
+              f"{stats['hosts']} exit hosts")
+        return
+
+    by = [key.strip() for key in args.by.split(",") if key.strip()]
+    try:
+        since = parse_since(args.since) if args.since else None
+        start = time.perf_counter()
+        rows = history.report(args.metric, by, args.stage, args.percentile, args.status, since,
+                              args.tester, args.location, args.min_count)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    if args.top:
+        rows = sorted(rows, key=lambda row: (row[2] is not None, row[2] or 0, row[1]), reverse=True)[:args.top]
+
+    heading = {
+        "tests": "",
+        "pass": "compatible",
+        "status": f"{args.status}s",
+        "score": "mean score",
+        "latency": f"p{args.percentile:g}",
+    }[args.metric]
+    print(format_report(by, args.metric, rows, heading))
+    print(f"\n{len(rows)} groups over {len(history)} tests in {elapsed:.2f}s"
+          f"{'' if np is not None else ' (install numpy for faster reports)'}")
+
+
+if __name__ == "__main__":
+    main()
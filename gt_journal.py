@@ -0,0 +1,129 @@
+"""
+Crash-safe progress journal for long Growtopia proxy runs
+
+An append-only JSON-lines file recording which proxies were started,
+which finished (with verdict and score) and the test cycle's rotation
+state. Every record reaches the OS as soon as it is written, so a
+killed process loses nothing; fsync happens in batches (every
+sync_every records or sync_interval seconds) plus immediately for
+state changes, since those track rotations we paid for. A power loss
+costs at most the last unsynced batch, and those proxies are simply
+tested again.
+
+On resume the journal is replayed: finished proxies are skipped and
+proxies that were mid-test are tested again. A torn last line from a
+crash is cut off.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+
+class ProgressJournal:
+    """Append-only record of finished proxies and run state"""
+
+    def __init__(self, path: str, resume: bool = False, sync_every: int = 64, sync_interval: float = 1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.done: Dict[str, Tuple[bool, int]] = {}
+        self.in_flight: Dict[str, None] = {}
+        self.state: dict = {}
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        if resume and os.path.exists(path):
+            self._replay()
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+
+    def _replay(self):
+        records = 0
+        good_offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn write from a crash; everything after it is unreliable
+                good_offset += len(line)
+                records += 1
+                kind = record.get("t")
+                if kind == "start":
+                    self.in_flight[record["url"]] = None
+                elif kind == "done":
+                    self.in_flight.pop(record["url"], None)
+                    self.done[record["url"]] = (record["ok"], record["score"])
+                elif kind == "state":
+                    self.state.update(record["data"])
+
+        if good_offset < os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good_offset)
+        # Rewrite only the live records once replaying gets mostly redundant
+        if records > 1000 and records > 2 * (len(self.done) + len(self.in_flight) + 1):
+            self._compact()
+
+    def _compact(self):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            for url, (ok, score) in self.done.items():
+                f.write(json.dumps({"t": "done", "url": url, "ok": ok, "score": score}) + "\n")
+            for url in self.in_flight:
+                f.write(json.dumps({"t": "start", "url": url}) + "\n")
+            if self.state:
+                f.write(json.dumps({"t": "state", "data": self.state}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def _append(self, record: dict, durable: bool = False):
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if (durable or self._unsynced >= self.sync_every
+                    or time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def started(self, url: str):
+        self.in_flight[url] = None
+        self._append({"t": "start", "url": url})
+
+    def finished(self, url: str, compatible: bool, score: int):
+        self.in_flight.pop(url, None)
+        self.done[url] = (compatible, score)
+        self._append({"t": "done", "url": url, "ok": compatible, "score": score})
+
+    def update_state(self, **fields):
+        """Record run state (attempt number, rotation phase); synced immediately"""
+        self.state.update(fields)
+        self._append({"t": "state", "data": fields}, durable=True)
+
+    def is_done(self, url: str) -> bool:
+        return url in self.done
+
+    def summary(self) -> str:
+        working = sum(1 for ok, _ in self.done.values() if ok)
+        return (f"{len(self.done)} already tested ({working} working), "
+                f"{len(self.in_flight)} interrupted mid-test will be tested again")
+
+    def close(self, remove: bool = False):
+        """Sync and close; remove=True once the run has completed"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync()
+            self._file.close()
+        if remove:
+            os.remove(self.path)
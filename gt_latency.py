@@ -0,0 +1,223 @@
+"""
+Stage latency histograms per location
+
+Averages hide the tail, and proxy exits have long ones. LatencyHistogram
+is an HDR-style log-linear histogram: values are kept in microseconds in
+buckets 1/64 of a power of two wide, so any percentile is exact to about
+1.6% from 1 us to hours, recording is a few integer operations, and two
+histograms (say from two worker processes) merge by adding counts.
+
+LatencyHistograms keeps one per (stage, location) for successful stage
+runs, each with a rolling window (the last window_seconds, in slots)
+next to the all-time totals, and reports p50/p90/p99/max from either.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+SUB_BUCKET_BITS = 7                         # 128 linear buckets below 128 us, then 64 per power of two
+_HALF = 1 << (SUB_BUCKET_BITS - 1)
+_LINEAR = 1 << SUB_BUCKET_BITS
+QUANTILES = (50.0, 90.0, 99.0)
+
+
+def _index(micros: int) -> int:
+    if micros < _LINEAR:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS
+    return (shift + 1) * _HALF + (micros >> shift) - _HALF
+
+
+def _upper(index: int) -> int:
+    """Largest value that lands in bucket index"""
+    if index < _LINEAR:
+        return index
+    shift = index // _HALF - 1
+    mantissa = index - shift * _HALF
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Log-linear histogram of durations (seconds in, seconds out)"""
+
+    __slots__ = ("counts", "count", "max_us", "sum_us")
+
+    def __init__(self):
+        self.counts: List[int] = []
+        self.count = 0
+        self.max_us = 0
+        self.sum_us = 0
+
+    def record(self, seconds: float):
+        micros = int(seconds * 1_000_000) if seconds > 0 else 0
+        index = _index(micros)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.sum_us += micros
+        if micros > self.max_us:
+            self.max_us = micros
+
+    def merge(self, other: "LatencyHistogram"):
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Seconds at or below which percentile% of the values fall (None when empty)"""
+        if not self.count:
+            return None
+        rank = max(1, int(self.count * percentile / 100.0 + 0.999999))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_upper(index), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    def snapshot(self) -> dict:
+        stats = {"count": self.count, "mean": round(self.sum_us / self.count / 1_000_000, 4) if self.count else None}
+        for quantile in QUANTILES:
+            value = self.percentile(quantile)
+            stats[f"p{quantile:g}"] = None if value is None else round(value, 4)
+        stats["max"] = round(self.max_us / 1_000_000, 4)
+        return stats
+
+    def to_dict(self) -> dict:
+        """Sparse form for JSON or pipes between processes"""
+        return {"counts": {index: count for index, count in enumerate(self.counts) if count},
+                "max_us": self.max_us, "sum_us": self.sum_us}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencyHistogram":
+        histogram = cls()
+        for index, count in data["counts"].items():
+            index = int(index)
+            if index >= len(histogram.counts):
+                histogram.counts.extend([0] * (index + 1 - len(histogram.counts)))
+            histogram.counts[index] += count
+            histogram.count += count
+        histogram.max_us = data["max_us"]
+        histogram.sum_us = data["sum_us"]
+        return histogram
+
+
+class RollingHistogram:
+    """All-time totals plus the last window_seconds, kept as slots that age out"""
+
+    SLOTS = 6
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.slot_seconds = window_seconds / self.SLOTS
+        self.total = LatencyHistogram()
+        self._slots: List[Tuple[int, LatencyHistogram]] = []
+
+    def record(self, seconds: float, now: float):
+        slot = int(now // self.slot_seconds)
+        if not self._slots or self._slots[-1][0] != slot:
+            self._slots = [item for item in self._slots if item[0] > slot - self.SLOTS]
+            self._slots.append((slot, LatencyHistogram()))
+        self._slots[-1][1].record(seconds)
+        self.total.record(seconds)
+
+    def window(self, now: float) -> LatencyHistogram:
+        slot = int(now // self.slot_seconds)
+        merged = LatencyHistogram()
+        for start, histogram in self._slots:
+            if start > slot - self.SLOTS:
+                merged.merge(histogram)
+        return merged
+
+
+class LatencyHistograms:
+    """Successful stage durations per (stage, location)"""
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.window_seconds = window_seconds
+        self._series: Dict[Tuple[str, str], RollingHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, location: Optional[str], seconds: float):
+        key = (stage, location or "unknown")
+        now = time.monotonic()
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = RollingHistogram(self.window_seconds)
+            series.record(seconds, now)
+
+    def histogram(self, stage: str, location: Optional[str] = None, window: bool = False) -> LatencyHistogram:
+        """One stage's histogram for a location, or merged over all locations"""
+        now = time.monotonic()
+        merged = LatencyHistogram()
+        with self._lock:
+            for (name, where), series in self._series.items():
+                if name == stage and location in (None, where):
+                    merged.merge(series.window(now) if window else series.total)
+        return merged
+
+    def percentile(self, stage: str, percentile: float, location: Optional[str] = None,
+                   window: bool = False, min_count: int = 1) -> Optional[float]:
+        """Seconds, or None with fewer than min_count samples"""
+        histogram = self.histogram(stage, location, window)
+        return histogram.percentile(percentile) if histogram.count >= min_count else None
+
+    def keys(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return sorted(self._series)
+
+    def snapshot(self, window: bool = False) -> Dict[str, dict]:
+        """{"stage@location": {count, mean, p50, p90, p99, max}} plus "stage@*" over all locations"""
+        stats = {}
+        for stage in sorted({stage for stage, _ in self.keys()}):
+            locations = [where for name, where in self.keys() if name == stage]
+            for location in locations + ([None] if len(locations) > 1 else []):
+                histogram = self.histogram(stage, location, window)
+                if histogram.count:
+                    stats[f"{stage}@{location or '*'}"] = histogram.snapshot()
+        return stats
+
+    def summary(self, window: bool = False) -> str:
+        """One line per stage and location: p50 / p90 / p99 / max"""
+        lines = []
+        for key, stats in self.snapshot(window).items():
+            lines.append(f"{key}: {stats['p50']:.3f}s / {stats['p90']:.3f}s / {stats['p99']:.3f}s / "
+                         f"{stats['max']:.3f}s ({stats['count']} runs, mean {stats['mean']:.3f}s)")
+        return "\n".join(lines)
+
+    def export(self) -> dict:
+        """All-time histograms in a JSON-safe form for merge() in another process"""
+        with self._lock:
+            return {f"{stage}@{location}": series.total.to_dict() for (stage, location), series in self._series.items()}
+
+    def merge(self, data: dict):
+        """Add another process's export() to the all-time totals"""
+        with self._lock:
+            for key, histogram in data.items():
+                stage, _, location = key.rpartition("@")
+                series = self._series.get((stage, location))
+                if series is None:
+                    series = self._series[(stage, location)] = RollingHistogram(self.window_seconds)
+                series.total.merge(LatencyHistogram.from_dict(histogram))
+
+    def exposition(self, name: str = "gt_stage_latency_seconds") -> List[str]:
+        """Prometheus summary lines (all-time quantiles per stage and location)"""
+        lines = [f"# HELP {name} Successful stage duration quantiles by stage and proxy location",
+                 f"# TYPE {name} summary"]
+        for stage, location in self.keys():
+            histogram = self.histogram(stage, location)
+            labels = f'stage="{stage}",location="{location}"'
+            for quantile in QUANTILES:
+                lines.append(f'{name}{{{labels},quantile="{quantile / 100:g}"}} {histogram.percentile(quantile)!r}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum_us / 1_000_000!r}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return lines
+
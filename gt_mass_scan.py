@@ -0,0 +1,592 @@
+#!/home/joy/cproxy/venv/bin/python3
+
+"""
+Growtopia Mass Proxy Scanner
+Screens large third-party SOCKS5 lists before the expensive tests
+
+Phase 1 runs only the raw SOCKS5 greeting and username/password
+sub-negotiation (RFC 1928/1929) on non-blocking sockets with very high
+concurrency. Phase 2 runs the full Growtopia compatibility test on the
+survivors only. Both phases size their concurrency adaptively
+(gt_concurrency) below the configured maximum.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from multiprocessing.connection import wait
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from gt_bytes import format_bytes
+from gt_concurrency import AIMDController, RESOURCE_ERRNOS
+from gt_ingest import ProxyIngestor
+from gt_ratelimit import parse_rate, parse_rate_rule
+from gt_proxy_tester import GrowtopiaProxyTester
+from gt_records import ResultTable
+
+# Phase 1 outcome codes, ordered by how far the handshake got
+RESOURCE_EXHAUSTED = -1  # local EMFILE/port exhaustion; the proxy is retried
+CONNECT_FAILED = 0
+CONNECTED = 1
+HANDSHAKE_OK = 2
+AUTH_OK = 3
+
+FUNNEL_KEYS = ("scanned", "connected", "handshake_ok", "auth_ok", "fully_compatible")
+
+# Worker -> parent messages (one tag byte, then a fixed header or payload):
+#   R json(url, tester, compatible, results, stages)   one fully tested proxy
+#   S url                            handshake survivor (handshake-only mode)
+#   K json(concurrency stats per phase)   sent just before F
+#   B json(traffic bytes, per-stage bytes)
+#   T json(stage timeout session stats)
+#   H json(latency histograms)       gt_latency export, merged into the parent's
+#   F <5 x I funnel> <2 x d timings> shard finished
+FUNNEL_RECORD = struct.Struct("<5I2d")
+HANDSHAKE_RETRIES = 3
+
+
+async def socks5_handshake(host: str, port: int, username: str, password: str, timeout: float = 5.0) -> int:
+    """Greeting plus user/pass auth only; returns how far the proxy got"""
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except OSError as e:
+        return RESOURCE_EXHAUSTED if e.errno in RESOURCE_ERRNOS else CONNECT_FAILED
+    except asyncio.TimeoutError:
+        return CONNECT_FAILED
+
+    stage = CONNECTED
+    try:
+        # VER=5, two methods: no-auth (0x00) and username/password (0x02)
+        writer.write(b"\x05\x02\x00\x02")
+        reply = await asyncio.wait_for(reader.readexactly(2), timeout)
+        if reply[0] != 0x05 or reply[1] == 0xFF:
+            return stage
+        stage = HANDSHAKE_OK
+
+        if reply[1] == 0x00:
+            return AUTH_OK
+        if reply[1] != 0x02:
+            return stage
+
+        user = username.encode()[:255]
+        secret = password.encode()[:255]
+        writer.write(b"\x01" + bytes([len(user)]) + user + bytes([len(secret)]) + secret)
+        status = await asyncio.wait_for(reader.readexactly(2), timeout)
+        if status[1] == 0x00:
+            stage = AUTH_OK
+        return stage
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return stage
+    finally:
+        writer.close()
+
+
+def _raise_fd_limit():
+    """Lift the soft open-file limit to the hard limit for high concurrency"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        target = hard if hard != resource.RLIM_INFINITY else max(soft, 65536)
+        if soft < target:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+class MassScanner:
+    """Two-phase scanner: cheap handshake prefilter, then full Growtopia tests"""
+
+    def __init__(self, tester: GrowtopiaProxyTester, concurrency: int = 1000,
+                 handshake_timeout: float = 5.0, full_workers: int = 32, adaptive: bool = True):
+        self.tester = tester
+        self.concurrency = concurrency
+        self.handshake_timeout = handshake_timeout
+        self.full_workers = full_workers
+        self.adaptive = adaptive
+        self.funnel = {"scanned": 0, "connected": 0, "handshake_ok": 0, "auth_ok": 0, "fully_compatible": 0}
+        self.timings = {"prefilter_s": 0.0, "full_s": 0.0}
+        self.failed_shards: List[int] = []
+        # Every full-test result, kept compact; dicts are rebuilt only for output
+        self.results = ResultTable()
+        # Final limit, peak and cutbacks of each phase's concurrency controller
+        self.concurrency_stats: Dict[str, dict] = {}
+        # Bytes exchanged with the proxies over all full tests, in total and per stage
+        self.traffic_bytes = 0
+        self.traffic = Counter()
+        self.live = sys.stderr.isatty()
+        self._progress_at = 0.0
+        # Seconds between rolling-window latency snapshots in the log (0: only the final report)
+        self.latency_every = 0.0
+        self._latency_at = time.monotonic()
+
+    def _controller(self, phase: str, maximum: int, initial: int) -> AIMDController:
+        return AIMDController(maximum, initial=initial, adaptive=self.adaptive,
+                              name=phase, metrics=self.tester.metrics)
+
+    def _show_progress(self, phase: str, done: int, controller: AIMDController, final: bool = False):
+        """Live status line on a terminal: progress and the current concurrency"""
+        if not self.live:
+            return
+        now = time.monotonic()
+        if not final and now - self._progress_at < 0.5:
+            return
+        self._progress_at = now
+        sys.stderr.write(f"\r  {phase}: {done:,} done, {controller.in_flight} in flight, "
+                         f"concurrency {controller.limit}/{controller.maximum}   " + ("\n" if final else ""))
+        sys.stderr.flush()
+
+    async def _prefilter(self, proxies: Iterable[Tuple[str, dict]]) -> List[Tuple[str, dict]]:
+        # Tasks are started only while the controller has room, so memory
+        # stays bounded by the concurrency rather than by the size of the list
+        controller = self._controller("prefilter", self.concurrency, min(self.concurrency, 64))
+        pending = iter(proxies)
+        retry = deque()
+        tasks = set()
+        survivors = []
+
+        async def check(proxy_url: str, config: dict, attempt: int):
+            started = time.perf_counter()
+            stage = await socks5_handshake(config['host'], config['port'], config['username'],
+                                           config['password'], self.handshake_timeout)
+            return proxy_url, config, attempt, stage, time.perf_counter() - started
+
+        def collect(done):
+            for task in done:
+                proxy_url, config, attempt, stage, seconds = task.result()
+                exhausted = stage == RESOURCE_EXHAUSTED
+                controller.release(stage >= CONNECTED, seconds, exhausted)
+                if exhausted and attempt < HANDSHAKE_RETRIES:
+                    retry.append((proxy_url, config, attempt + 1))
+                    continue
+                self.funnel["scanned"] += 1
+                if stage >= CONNECTED:
+                    self.funnel["connected"] += 1
+                if stage >= HANDSHAKE_OK:
+                    self.funnel["handshake_ok"] += 1
+                if stage >= AUTH_OK:
+                    self.funnel["auth_ok"] += 1
+                    survivors.append((proxy_url, config))
+            self._show_progress("prefilter", self.funnel["scanned"], controller)
+
+        while True:
+            if retry:
+                item = retry.popleft()
+            else:
+                proxy = next(pending, None)
+                if proxy is None:
+                    if not tasks:
+                        break
+                    done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    collect(done)
+                    continue
+                item = (*proxy, 1)
+            while not controller.acquire(blocking=False):
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                collect(done)
+            tasks.add(asyncio.ensure_future(check(*item)))
+
+        self._show_progress("prefilter", self.funnel["scanned"], controller, final=True)
+        self.concurrency_stats["prefilter"] = controller.stats()
+        return survivors
+
+    def prefilter(self, proxies: Iterable[Tuple[str, dict]]) -> List[Tuple[str, dict]]:
+        """Phase 1: handshake-only screening"""
+        _raise_fd_limit()
+        start = time.perf_counter()
+        survivors = asyncio.run(self._prefilter(proxies))
+        self.timings["prefilter_s"] = time.perf_counter() - start
+        return survivors
+
+    def _timed_test(self, url: str) -> Tuple[bool, dict, float]:
+        started = time.perf_counter()
+        is_compatible, results = self.tester.test_full_growtopia_compatibility(url)
+        return is_compatible, results, time.perf_counter() - started
+
+    def full_test(self, survivors: Iterable[Tuple[str, dict]],
+                  on_result: Optional[Callable[[str, bool, dict], None]] = None) -> List[Tuple[str, dict]]:
+        """Phase 2: full Growtopia compatibility on handshake survivors"""
+        start = time.perf_counter()
+        first_row = len(self.results)
+        controller = self._controller("full", self.full_workers, min(self.full_workers, 4))
+        running = {}
+
+        def collect(done):
+            # Results are handled on this thread, in completion order
+            for future in done:
+                url = running.pop(future)
+                is_compatible, results, seconds = future.result()
+                controller.release(bool(results.get("socks5_basic")), seconds)
+                if on_result is not None:
+                    on_result(url, is_compatible, results)
+                if is_compatible:
+                    self.funnel["fully_compatible"] += 1
+                # Per-stage bytes go into the scan totals rather than a per-row JSON blob
+                self.traffic_bytes += results.get("bytes_sent", 0) + results.get("bytes_received", 0)
+                self.traffic.update(results.pop("stage_bytes", {}))
+                self.results.append(url, is_compatible, results)
+            self._show_progress("full tests", len(self.results) - first_row, controller)
+            self._show_latency()
+
+        with ThreadPoolExecutor(max_workers=self.full_workers) as pool:
+            for url, _ in survivors:
+                while not controller.acquire(blocking=False):
+                    done, _ = wait_futures(running, return_when=FIRST_COMPLETED)
+                    collect(done)
+                running[pool.submit(self._timed_test, url)] = url
+            while running:
+                done, _ = wait_futures(running, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        self._show_progress("full tests", len(self.results) - first_row, controller, final=True)
+        self.concurrency_stats["full"] = controller.stats()
+        self.timings["full_s"] = time.perf_counter() - start
+        return [(self.results.url(row), self.results.to_dict(row))
+                for row in range(first_row, len(self.results)) if self.results.compatible(row)]
+
+    def _show_latency(self):
+        """Log the last window's stage percentiles every latency_every seconds"""
+        latency = self.tester.latency
+        if latency is None or not self.latency_every:
+            return
+        now = time.monotonic()
+        if now - self._latency_at < self.latency_every:
+            return
+        self._latency_at = now
+        summary = latency.summary(window=True)
+        if summary:
+            self.tester._log("INFO", f"Stage latency over the last {latency.window_seconds:g}s "
+                                     f"(p50 / p90 / p99 / max):\n  " + summary.replace("\n", "\n  "))
+
+    def scan(self, proxy_urls: Iterable[str], handshake_only: bool = False, prefilter: bool = True,
+             on_result: Optional[Callable[[str, bool, dict], None]] = None) -> List[Tuple[str, dict]]:
+        parse = self.tester.parse_proxy_url
+        proxies = ((url, config) for url, config in ((url, parse(url)) for url in proxy_urls) if config)
+        return self.scan_proxies(proxies, handshake_only, prefilter, on_result)
+
+    def scan_proxies(self, proxies: Iterable[Tuple[str, dict]], handshake_only: bool = False, prefilter: bool = True,
+                     on_result: Optional[Callable[[str, bool, dict], None]] = None) -> List[Tuple[str, dict]]:
+        """scan() for already-parsed (url, config) pairs, e.g. from gt_ingest"""
+        if prefilter:
+            survivors = self.prefilter(proxies)
+        else:
+            survivors = list(proxies)
+            self.funnel["scanned"] = len(survivors)
+        if handshake_only:
+            return [(url, {}) for url, _ in survivors]
+        return self.full_test(survivors, on_result)
+
+    def scan_sharded(self, path: str, procs: int, handshake_only: bool = False, prefilter: bool = True,
+                     on_result: Optional[Callable[[str, bool, dict], None]] = None,
+                     skip: Optional[Set[str]] = None) -> List[Tuple[str, dict]]:
+        """
+        Same as scan() but split across worker processes. Each worker reads
+        its own stride of the file and runs its own event loop and tester;
+        only compact result records travel back over a pipe. URLs in skip
+        (e.g. already done on a resumed run) are left out.
+        """
+        options = {
+            "concurrency": max(1, self.concurrency // procs),
+            "handshake_timeout": self.handshake_timeout,
+            "full_workers": self.full_workers,
+            "adaptive": self.adaptive,
+            "handshake_only": handshake_only,
+            "prefilter": prefilter,
+            "skip": skip or frozenset(),
+            "test_deadline_s": self.tester.test_deadline_s,
+            "rate_limits": None,
+            "stage_timeouts": None,
+            "byte_counters": self.tester.byte_counters,
+            "low_bytes": self.tester.low_bytes,
+            "latency_window": self.tester.latency.window_seconds if self.tester.latency is not None else None,
+            "latency_every": self.latency_every,
+            "history": self.tester.history.path if self.tester.history is not None else None,
+        }
+        timeouts = self.tester.stage_timeouts
+        if timeouts is not None:
+            options["stage_timeouts"] = (timeouts.percentile, timeouts.margin, timeouts.audit_rate)
+        if self.tester.rate_limiter is not None:
+            # Every shard gets its share of each target's rate and burst
+            share = self.tester.rate_limiter.scaled(1 / procs)
+            options["rate_limits"] = (share.rates, share.egress_rate)
+        start = time.perf_counter()
+        workers = []
+        for shard in range(procs):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_scan_shard, args=(path, shard, procs, options, sender),
+                                              name=f"gt-scan-{shard}", daemon=True)
+            process.start()
+            sender.close()
+            workers.append((process, receiver))
+
+        survivors = []
+        prefilter_s = full_s = 0.0
+        open_channels = [receiver for _, receiver in workers]
+        while open_channels:
+            for channel in wait(open_channels):
+                try:
+                    message = channel.recv_bytes()
+                except EOFError:
+                    open_channels.remove(channel)
+                    continue
+                tag, body = message[:1], message[1:]
+                if tag == b"R":
+                    url, tester, compatible, results, stages = json.loads(body)
+                    if self.tester.jsonl_output is not None:
+                        # Shards have no output of their own: their records, stages included, are written here
+                        self.tester.jsonl_output.record(url, tester, compatible, results, stages)
+                    if on_result is not None:
+                        on_result(url, compatible, results)
+                    if compatible:
+                        # Per-stage bytes already came in the shard's B totals
+                        results.pop("stage_bytes", None)
+                        self.results.append(url, True, results)
+                elif tag == b"S":
+                    survivors.append((body.decode(), {}))
+                elif tag == b"K":
+                    for phase, stats in json.loads(body).items():
+                        self._merge_concurrency(phase, stats)
+                elif tag == b"B":
+                    traffic_bytes, traffic = json.loads(body)
+                    self.traffic_bytes += traffic_bytes
+                    self.traffic.update(traffic)
+                elif tag == b"T" and self.tester.stage_timeouts is not None:
+                    self.tester.stage_timeouts.merge_session(json.loads(body))
+                elif tag == b"H" and self.tester.latency is not None:
+                    self.tester.latency.merge(json.loads(body))
+                elif tag == b"F":
+                    *counts, shard_prefilter_s, shard_full_s = FUNNEL_RECORD.unpack(body)
+                    for key, count in zip(FUNNEL_KEYS, counts):
+                        self.funnel[key] += count
+                    prefilter_s = max(prefilter_s, shard_prefilter_s)
+                    full_s = max(full_s, shard_full_s)
+
+        for process, _ in workers:
+            process.join()
+        self.failed_shards = [shard for shard, (process, _) in enumerate(workers) if process.exitcode != 0]
+        if self.tester.stage_timeouts is not None:
+            # Pick up the latencies the shards saved
+            self.tester.stage_timeouts.load()
+        # Shards run side by side, so phase times are those of the slowest shard
+        self.timings["prefilter_s"] = prefilter_s
+        self.timings["full_s"] = full_s
+        self.timings["wall_s"] = time.perf_counter() - start
+        if handshake_only:
+            return survivors
+        return [(url, detail) for url, _, detail in self.results.rows(compatible_only=True)]
+
+    def _merge_concurrency(self, phase: str, stats: dict):
+        """Add one shard's controller stats; limits of shards running side by side add up"""
+        merged = self.concurrency_stats.setdefault(phase, {"limit": 0, "peak": 0, "completed": 0, "cutbacks": {}})
+        for key in ("limit", "peak", "completed"):
+            merged[key] += stats[key]
+        for reason, count in stats["cutbacks"].items():
+            merged["cutbacks"][reason] = merged["cutbacks"].get(reason, 0) + count
+
+    def report(self) -> str:
+        f = self.funnel
+        scanned = f["scanned"] or 1
+        prefilter_rate = f["scanned"] / self.timings["prefilter_s"] if self.timings["prefilter_s"] else 0.0
+        total_s = self.timings.get("wall_s") or self.timings["prefilter_s"] + self.timings["full_s"]
+        lines = [
+            f"\n{'='*60}",
+            "MASS SCAN FUNNEL",
+            f"{'='*60}",
+        ]
+        for label, key in (("Scanned", "scanned"), ("TCP connected", "connected"),
+                           ("SOCKS5 handshake OK", "handshake_ok"), ("Auth OK", "auth_ok"),
+                           ("Fully compatible", "fully_compatible")):
+            lines.append(f"  {label:<22}{f[key]:>10}  ({100.0 * f[key] / scanned:5.1f}%)")
+        lines.append(f"{'─'*60}")
+        lines.append(f"  Prefilter: {self.timings['prefilter_s']:.2f}s ({prefilter_rate:,.0f} scans/sec)")
+        lines.append(f"  Full tests: {self.timings['full_s']:.2f}s")
+        if total_s:
+            lines.append(f"  Overall: {f['scanned'] / total_s:,.1f} proxies/sec")
+        for phase, label in (("prefilter", "Prefilter"), ("full", "Full tests")):
+            stats = self.concurrency_stats.get(phase)
+            if stats:
+                cuts = ", ".join(f"{count} {reason}" for reason, count in sorted(stats["cutbacks"].items()))
+                lines.append(f"  {label} concurrency: ended at {stats['limit']}, peak {stats['peak']}"
+                             f"{' (cutbacks: ' + cuts + ')' if cuts else ''}")
+        if self.traffic:
+            tested = f["auth_ok"] or len(self.results) or 1
+            lines.append(f"  Traffic: {format_bytes(self.traffic_bytes)} "
+                         f"(~{format_bytes(self.traffic_bytes / tested)} per fully tested proxy)")
+            lines.append("    " + ", ".join(f"{stage} {format_bytes(count)}" for stage, count in self.traffic.most_common()))
+        if self.tester.rate_limiter is not None and self.tester.rate_limiter.summary():
+            lines.append("  Rate limits:")
+            lines.extend(f"    {line}" for line in self.tester.rate_limiter.summary().splitlines())
+        if self.tester.latency is not None and self.tester.latency.summary():
+            lines.append("  Stage latency, successful runs (p50 / p90 / p99 / max):")
+            lines.extend(f"    {line}" for line in self.tester.latency.summary().splitlines())
+        if self.tester.stage_timeouts is not None:
+            lines.append("  Stage timeouts:")
+            lines.extend(f"    {line}" for line in self.tester.stage_timeouts.summary().splitlines())
+        if self.failed_shards:
+            lines.append(f"  ⚠️  Shards {self.failed_shards} died; their counts are incomplete")
+        lines.append(f"{'='*60}")
+        return "\n".join(lines)
+
+
+def _scan_shard(path: str, shard: int, procs: int, options: dict, channel):
+    """Worker process body for MassScanner.scan_sharded"""
+    tester = GrowtopiaProxyTester()
+    tester.enable_console_output()
+    tester.enable_dns_cache()
+    tester.test_deadline_s = options["test_deadline_s"]
+    if options["rate_limits"] is not None:
+        tester.enable_rate_limits(*options["rate_limits"])
+    if options["stage_timeouts"] is not None:
+        tester.enable_stage_timeouts(*options["stage_timeouts"])
+    if options["byte_counters"]:
+        tester.enable_byte_counters()
+    if options["latency_window"] is not None:
+        tester.enable_latency_histograms(options["latency_window"])
+    if options["history"] is not None:
+        tester.enable_history(options["history"])
+    tester.low_bytes = options["low_bytes"]
+    scanner = MassScanner(tester, options["concurrency"], options["handshake_timeout"], options["full_workers"],
+                          options["adaptive"])
+    scanner.live = False
+    scanner.latency_every = options["latency_every"]
+
+    # Stage outcomes per proxy, as the parent's JSONL output would have collected them
+    local = threading.local()
+    verdicts = {}
+
+    def test_started(proxy: str):
+        local.stages = {}
+
+    def stage_finished(stage: str, outcome: str, seconds: float, result):
+        stages = getattr(local, "stages", None)
+        if stages is not None:
+            stages[stage] = {"outcome": outcome, "seconds": round(seconds, 3)}
+
+    def verdict(proxy: str, tester: str, compatible: bool, results: dict):
+        # Recorded on the test's thread; send_result runs on the collecting one
+        verdicts[proxy] = (tester, getattr(local, "stages", None))
+
+    tester.events.on("test_started", test_started)
+    tester.events.on("stage_finished", stage_finished)
+    tester.events.on("verdict", verdict)
+
+    def send_result(url: str, compatible: bool, results: dict):
+        label, stages = verdicts.pop(url, ("standard", None))
+        channel.send_bytes(b"R" + json.dumps([url, label, compatible, results, stages], default=str).encode())
+
+    skip = options["skip"]
+    # Each shard parses only its own byte range of the file
+    shard_proxies = ((url, config) for url, config in ProxyIngestor().iter_file(path, shard, procs)
+                     if url not in skip)
+    try:
+        survivors = scanner.scan_proxies(shard_proxies, options["handshake_only"], options["prefilter"], send_result)
+        if options["handshake_only"]:
+            for url, _ in survivors:
+                channel.send_bytes(b"S" + url.encode())
+    finally:
+        channel.send_bytes(b"K" + json.dumps(scanner.concurrency_stats).encode())
+        channel.send_bytes(b"B" + json.dumps([scanner.traffic_bytes, scanner.traffic]).encode())
+        if tester.stage_timeouts is not None:
+            tester.stage_timeouts.save()
+            channel.send_bytes(b"T" + json.dumps(tester.stage_timeouts.session_stats()).encode())
+        if tester.latency is not None:
+            channel.send_bytes(b"H" + json.dumps(tester.latency.export()).encode())
+        if tester.history is not None:
+            # Worker processes skip atexit handlers
+            tester.history.close()
+        counts = [scanner.funnel[key] for key in FUNNEL_KEYS]
+        channel.send_bytes(b"F" + FUNNEL_RECORD.pack(*counts, scanner.timings["prefilter_s"], scanner.timings["full_s"]))
+        channel.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Growtopia Mass Proxy Scanner")
+    parser.add_argument("proxy_file", help="Proxy list (URLs, host:port:user:pass, user:pass@host:port, JSON lines)")
+    parser.add_argument("--concurrency", type=int, default=1000, help="Maximum simultaneous handshakes")
+    parser.add_argument("--handshake-timeout", type=float, default=5.0, help="Seconds per handshake")
+    parser.add_argument("--full-workers", type=int, default=32, help="Maximum parallel full Growtopia tests")
+    parser.add_argument("--fixed-concurrency", action="store_true",
+                        help="Always run at the maximums instead of adapting (AIMD) below them")
+    parser.add_argument("--handshake-only", action="store_true", help="Stop after the handshake prefilter")
+    parser.add_argument("--save", action="store_true", help="Append compatible proxies to working_proxies.txt")
+    parser.add_argument("--procs", type=int, default=1, help="Shard the list across this many worker processes")
+    parser.add_argument("--rate", action="append", default=[], metavar="DOMAIN=RATE[/BURST]",
+                        help="Requests/sec (and burst) allowed to a Growtopia domain; repeatable, replaces the defaults")
+    parser.add_argument("--egress-rate", metavar="RATE[/BURST]",
+                        help="Also limit requests per domain from each proxy (egress IP)")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Send requests to Growtopia unthrottled")
+    parser.add_argument("--test-deadline", type=float, metavar="SECONDS",
+                        help="Per-proxy time budget; rate-limited requests never queue past it")
+    parser.add_argument("--low-bytes", action="store_true",
+                        help="Read only the status of pages whose body is unused (metered bandwidth)")
+    parser.add_argument("--fixed-timeouts", action="store_true",
+                        help="Keep the default stage timeouts instead of learning them from past latencies")
+    parser.add_argument("--timeout-percentile", type=float, default=99.0,
+                        help="Latency percentile of successful stages that sets each stage's timeout")
+    parser.add_argument("--timeout-margin", type=float, default=1.5, help="Multiplier applied to that percentile")
+    parser.add_argument("--latency-every", type=float, default=0.0, metavar="SECONDS",
+                        help="Log p50/p90/p99/max per stage and location over the last minute this often")
+    parser.add_argument("--history", metavar="DIR",
+                        help="Record every outcome in a columnar history for gt_history.py reports")
+
+    args = parser.parse_args()
+
+    tester = GrowtopiaProxyTester()
+    tester.enable_console_output()
+    tester.enable_dns_cache()
+    tester.test_deadline_s = args.test_deadline
+    if not args.no_rate_limit:
+        try:
+            rates = dict(parse_rate_rule(rule) for rule in args.rate) or None
+            egress_rate = parse_rate(args.egress_rate) if args.egress_rate else None
+        except ValueError as e:
+            parser.error(str(e))
+        tester.enable_rate_limits(rates, egress_rate)
+    if not args.fixed_timeouts:
+        tester.enable_stage_timeouts(args.timeout_percentile, args.timeout_margin)
+    tester.enable_byte_counters()
+    tester.enable_latency_histograms()
+    if args.history:
+        tester.enable_history(args.history)
+    tester.low_bytes = args.low_bytes
+    scanner = MassScanner(tester, args.concurrency, args.handshake_timeout, args.full_workers,
+                          adaptive=not args.fixed_concurrency)
+    scanner.latency_every = args.latency_every
+
+    if not os.path.isfile(args.proxy_file):
+        print(f"Error: File {args.proxy_file} not found")
+        sys.exit(1)
+
+    if args.procs > 1:
+        print(f"Scanning {args.proxy_file} with {args.procs} processes (concurrency up to {args.concurrency})...")
+        results = scanner.scan_sharded(args.proxy_file, args.procs, handshake_only=args.handshake_only)
+    else:
+        print(f"Scanning {args.proxy_file} (concurrency up to {args.concurrency})...")
+        ingestor = ProxyIngestor()
+        results = scanner.scan_proxies(ingestor.iter_file(args.proxy_file), handshake_only=args.handshake_only)
+        print(ingestor.summary())
+
+    if args.save and not args.handshake_only:
+        for proxy_url, test_results in results:
+            tester.save_working_proxy(proxy_url, test_results)
+    elif args.handshake_only:
+        for proxy_url, _ in results:
+            print(proxy_url)
+
+    if tester.stage_timeouts is not None:
+        tester.stage_timeouts.save()
+    print(scanner.report())
+    sys.exit(0 if results else 1)
+
+
+if __name__ == "__main__":
+    main()
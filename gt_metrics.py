@@ -0,0 +1,263 @@
+"""
+Prometheus-style metrics for Growtopia proxy testers
+
+Counters, gauges and histograms kept in memory and served as plain text
+exposition format from a small local HTTP endpoint, so test cycles and
+rotations can be scraped and graphed instead of read off stdout.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(labels: Optional[dict]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Optional[dict] = None, value: float = 1):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, labels: Optional[dict] = None) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def set(self, value: float, labels: Optional[dict] = None):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    """Cumulative bucket histogram per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Optional[dict] = None):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts..., +Inf count, sum]
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, labels: Optional[dict] = None) -> int:
+        series = self._series.get(_label_key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> list:
+        lines = []
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric a tester exports"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_text: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, *args)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets)
+
+    def render(self) -> str:
+        """Text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RateWindow:
+    """Events per minute over a sliding window"""
+
+    def __init__(self, window_seconds: float = 60.0):
+        self.window = window_seconds
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def add(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._events.append(now)
+            self._trim(now)
+
+    def per_minute(self, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._trim(now)
+            return len(self._events) * 60.0 / self.window
+
+    def _trim(self, now: float):
+        while self._events and now - self._events[0] > self.window:
+            self._events.popleft()
+
+
+class TesterMetrics:
+    """The metric set recorded by GrowtopiaProxyTester and its subclasses"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.stage_outcomes = r.counter("gt_stage_outcomes_total", "Test stage results by stage and outcome")
+        self.stage_latency = r.histogram("gt_stage_duration_seconds", "Wall time spent in each test stage")
+        self.http_checks = r.counter("gt_http_checks_total", "Growtopia website checks by proxy location")
+        self.http_blocked = r.counter("gt_http_blocked_total", "Growtopia 403 responses by proxy location")
+        self.rotations = r.counter("gt_rotations_total", "IP rotations by location and result")
+        self.rotation_phases = r.histogram("gt_rotation_phase_seconds", "Duration of each IP rotation phase")
+        self.proxies_tested = r.counter("gt_proxies_tested_total", "Completed proxy tests by tester and verdict")
+        self.validated_rate = r.gauge("gt_proxies_validated_per_minute", "Proxy tests completed over the last minute")
+        self.concurrency_limit = r.gauge("gt_concurrency_limit", "Tests allowed in flight by the adaptive controller, by phase")
+        self.concurrency_cutbacks = r.counter("gt_concurrency_cutbacks_total", "Adaptive concurrency decreases by phase and reason")
+        self.rate_limit_wait = r.histogram("gt_rate_limit_wait_seconds", "Time requests queued for a target's rate limit")
+        self.rate_limited = r.counter("gt_rate_limited_total", "Requests refused because their slot came after the proxy's deadline")
+        self.stage_bytes = r.counter("gt_stage_bytes_total", "Bytes exchanged with the proxy by stage and direction")
+        self._window = RateWindow()
+        # gt_latency.LatencyHistograms, exported as a summary when set
+        self.latency = None
+
+    def record_stage(self, stage: str, outcome: str, seconds: float):
+        self.stage_outcomes.inc({"stage": stage, "outcome": outcome})
+        self.stage_latency.observe(seconds, {"stage": stage})
+
+    def record_http_status(self, location: str, status: str):
+        self.http_checks.inc({"location": location})
+        if status == "403":
+            self.http_blocked.inc({"location": location})
+
+    def record_rotation(self, location: str, success: bool):
+        self.rotations.inc({"location": location, "result": "success" if success else "failure"})
+
+    def record_rotation_phase(self, phase: str, seconds: float):
+        self.rotation_phases.observe(seconds, {"phase": phase})
+
+    def record_verdict(self, tester: str, compatible: bool, new_proxy: bool = True):
+        """new_proxy=False for further verdicts on the same proxy (gt_compare's variants)"""
+        self.proxies_tested.inc({"tester": tester, "verdict": "compatible" if compatible else "incompatible"})
+        if new_proxy:
+            self._window.add()
+
+    def record_concurrency(self, phase: str, limit: int, reason: Optional[str] = None):
+        self.concurrency_limit.set(limit, {"phase": phase})
+        if reason:
+            self.concurrency_cutbacks.inc({"phase": phase, "reason": reason})
+
+    def record_rate_limit(self, target: str, waited: Optional[float]):
+        """waited is None for a refused request"""
+        if waited is None:
+            self.rate_limited.inc({"target": target})
+        else:
+            self.rate_limit_wait.observe(waited, {"target": target})
+
+    def record_stage_bytes(self, stage: str, sent: int, received: int):
+        self.stage_bytes.inc({"stage": stage, "direction": "sent"}, sent)
+        self.stage_bytes.inc({"stage": stage, "direction": "received"}, received)
+
+    def render(self) -> str:
+        self.validated_rate.set(self._window.per_minute())
+        text = self.registry.render()
+        if self.latency is not None:
+            text += "\n".join(self.latency.exposition()) + "\n"
+        return text
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(metrics: TesterMetrics, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics from a daemon thread; returns the running server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics
+    threading.Thread(target=server.serve_forever, name="gt-metrics", daemon=True).start()
+    return server
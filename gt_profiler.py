@@ -0,0 +1,231 @@
+"""
+Profiling mode for Growtopia proxy testers
+
+Records wall and CPU time per test stage and splits each stage into the
+hot paths that usually dominate a slow run: DNS lookups, SOCKS5
+negotiation, TLS handshakes, CLI subprocess spawns and time.sleep.
+Whatever is left over is "other" (mostly requests/urllib3 overhead and
+waiting on the proxy). Optionally writes a cProfile dump or a collapsed
+stack file for flame graphs.
+"""
+
+import os
+import socket
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Optional
+
+CATEGORIES = ("dns", "socks", "tls", "subprocess", "sleep")
+
+
+class StageStats:
+    """Accumulated timings for one stage"""
+
+    __slots__ = ("calls", "wall", "cpu", "categories")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.categories = dict.fromkeys(CATEGORIES, 0.0)
+
+    @property
+    def total(self) -> float:
+        return max(self.wall, sum(self.categories.values()))
+
+    @property
+    def other(self) -> float:
+        return max(0.0, self.wall - sum(self.categories.values()))
+
+
+class StageProfiler:
+    """
+    Per-stage wall/CPU profiler with hot-path attribution
+
+    Hot paths are measured by temporarily wrapping socket.getaddrinfo,
+    PySocks' SOCKS5 negotiation, ssl handshakes, subprocess.run and
+    time.sleep while profiling is active. Only the outermost hot path is
+    counted so nested calls (DNS inside a SOCKS connect) aren't doubled.
+    """
+
+    def __init__(self, output: Optional[str] = None, sample_interval: float = 0.005):
+        self.output = output
+        self.sample_interval = sample_interval
+        self.stats = defaultdict(StageStats)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._originals = []
+        self._cprofile = None
+        self._sampler = None
+        self._samples = Counter()
+        self._running = False
+        self._started = 0.0
+        self._cpu_started = 0.0
+        self._elapsed = None
+
+    # -- lifecycle -------------------------------------------------------
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._sleep = time.sleep
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._install_hooks()
+
+        if self.output and self.output.endswith((".folded", ".collapsed")):
+            self._sampler = threading.Thread(target=self._sample_loop, name="gt-profiler", daemon=True)
+            self._sampler.start()
+        elif self.output:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._elapsed = (time.perf_counter() - self._started, time.process_time() - self._cpu_started)
+        self._remove_hooks()
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.output)
+        if self._sampler is not None:
+            self._sampler.join()
+            with open(self.output, "w", encoding="utf-8") as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+
+    # -- stage and hot-path accounting ----------------------------------
+
+    @contextmanager
+    def stage(self, name: str):
+        local = self._local
+        previous = getattr(local, "stage", None)
+        local.stage = name
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            local.stage = previous
+            with self._lock:
+                stats = self.stats[name]
+                stats.calls += 1
+                stats.wall += wall
+                stats.cpu += cpu
+                # Time in a nested stage was already charged to that stage
+                if previous is not None:
+                    self.stats[previous].wall -= wall
+                    self.stats[previous].cpu -= cpu
+
+    def _timed(self, category: str, func):
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            local = profiler._local
+            if getattr(local, "in_hot_path", False):
+                return func(*args, **kwargs)
+            local.in_hot_path = True
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                local.in_hot_path = False
+                stage = getattr(local, "stage", None) or "(outside stages)"
+                with profiler._lock:
+                    profiler.stats[stage].categories[category] += elapsed
+
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def _patch(self, owner, attribute: str, category: str):
+        original = getattr(owner, attribute)
+        self._originals.append((owner, attribute, original))
+        setattr(owner, attribute, self._timed(category, original))
+
+    def _install_hooks(self):
+        self._patch(socket, "getaddrinfo", "dns")
+        self._patch(socket, "gethostbyname", "dns")
+        self._patch(ssl.SSLSocket, "do_handshake", "tls")
+        self._patch(subprocess, "run", "subprocess")
+        self._patch(time, "sleep", "sleep")
+        try:
+            import socks
+            self._patch(socks.socksocket, "_negotiate_SOCKS5", "socks")
+        except (ImportError, AttributeError):
+            pass
+
+    def _remove_hooks(self):
+        while self._originals:
+            owner, attribute, original = self._originals.pop()
+            setattr(owner, attribute, original)
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while self._running:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self._samples[";".join(reversed(stack))] += 1
+            self._sleep(self.sample_interval)
+
+    # -- reporting -------------------------------------------------------
+
+    def report(self) -> str:
+        """Per-stage table plus a ranked list of where the time went"""
+        if self._elapsed is not None:
+            total_wall, total_cpu = self._elapsed
+        else:
+            total_wall = time.perf_counter() - self._started
+            total_cpu = time.process_time() - self._cpu_started
+
+        lines = [
+            f"\n{'='*93}",
+            "PROFILE SUMMARY",
+            f"{'='*93}",
+            f"Total wall: {total_wall:.2f}s   Total CPU: {total_cpu:.2f}s",
+            f"{'─'*93}",
+            f"{'Stage':<20}{'Calls':>6}{'Wall':>8}{'CPU':>8}" + "".join(f"{c:>11}" for c in CATEGORIES) + f"{'Other':>8}",
+        ]
+
+        hot_paths = []
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+            for name, stats in items:
+                if stats.total < 0.0005:
+                    continue
+                lines.append(
+                    f"{name:<20}{stats.calls:>6}{stats.wall:>8.2f}{stats.cpu:>8.2f}"
+                    + "".join(f"{stats.categories[c]:>11.2f}" for c in CATEGORIES)
+                    + f"{stats.other:>8.2f}"
+                )
+                for category, seconds in stats.categories.items():
+                    hot_paths.append((seconds, f"{name} / {category}"))
+                hot_paths.append((stats.other, f"{name} / other"))
+
+        lines.append(f"{'─'*93}")
+        lines.append("Where the time went:")
+        ranked = [item for item in sorted(hot_paths, reverse=True) if item[0] >= 0.0005]
+        for rank, (seconds, label) in enumerate(ranked[:10], 1):
+            share = 100.0 * seconds / total_wall if total_wall else 0.0
+            lines.append(f"  {rank:>2}. {label:<40}{seconds:>8.2f}s  {share:5.1f}%")
+        if self.output:
+            lines.append(f"Profile written to {self.output}")
+        lines.append(f"{'='*93}")
+        return "\n".join(lines)
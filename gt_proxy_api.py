@@ -0,0 +1,528 @@
+#!/home/joy/cproxy/venv/bin/python3
+
+"""
+Growtopia Proxy API
+Hands verified proxies to bot clients over a small local HTTP service
+
+Instead of every bot reading working_proxies.txt, the service tests the
+pool with the usual tester classes and keeps the verified proxies in an
+in-memory index ordered by score, then connect latency. Bots lease a
+proxy for a limited time; each proxy serves at most its capacity in
+bots at once, leases and sticky assignments (/assign) together. A bot that finds its proxy broken reports it, which takes the
+proxy out of rotation and re-tests it straight away. Reports and adds
+for a proxy that is already being tested share that test.
+
+    GET  /proxy?min_score=&location=   lease the best matching proxy
+    POST /renew?lease=ID               extend a lease
+    POST /release?lease=ID             give a proxy back
+    POST /report?lease=ID|proxy=URL    proxy failed: re-test it now
+    POST /add?proxy=URL&location=      test a proxy and index it if it passes
+    GET  /assign?bot=ID&location=      the bot's sticky proxy (see gt_assign)
+    POST /unassign?bot=ID              the bot left the fleet
+    GET  /status                       index, lease and assignment counts
+
+The index keeps, per location, a sorted list holding only the proxies
+that can take another lease, so a lookup is a look at the head of a
+list (plus a short walk when the caller asks for a location it has to
+filter by score).
+"""
+
+import bisect
+import heapq
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from gt_assign import SLOW_CONNECT_MS, BotAssigner, proxy_capacity
+from gt_coordinator import make_tester
+from gt_records import SCORE_KEYS
+
+ANY_LOCATION = "*"
+
+
+class ProxyEntry:
+    """One verified (or being re-verified) proxy"""
+
+    __slots__ = ("url", "location", "score", "latency_ms", "leases", "bots", "capacity", "state",
+                 "tested_at", "failures")
+
+    def __init__(self, url: str, location: str, capacity: int):
+        self.url = url
+        self.location = location
+        self.score = 0
+        self.latency_ms = 0.0
+        self.leases = 0
+        self.bots = 0              # sticky assignments (gt_assign), which share the capacity
+        self.capacity = capacity
+        self.state = "testing"     # testing | ready | failed
+        self.tested_at = 0.0
+        self.failures = 0
+
+    def rank(self) -> Tuple[int, float, str]:
+        return (-self.score, self.latency_ms, self.url)
+
+    def to_dict(self) -> dict:
+        return {"proxy": self.url, "location": self.location, "score": self.score,
+                "latency_ms": self.latency_ms, "leases": self.leases, "bots": self.bots,
+                "capacity": self.capacity, "state": self.state}
+
+
+class ProxyIndex:
+    """Verified proxies ranked by score and latency, with leases and per-proxy caps"""
+
+    def __init__(self, max_leases: int = 4, lease_seconds: float = 300.0, lock=None,
+                 on_leases: Optional[Callable[[str, int], None]] = None):
+        """
+        max_leases: the capacity of a proxy update() gives none for.
+        lock and on_leases(url, leases) pair with a gt_assign.BotAssigner,
+        whose bot counts come back through set_bots().
+        """
+        self.max_leases = max_leases
+        self.lease_seconds = lease_seconds
+        self.entries: Dict[str, ProxyEntry] = {}
+        self.leases: Dict[str, Tuple[str, float]] = {}     # lease id -> (url, expires)
+        self.served = 0
+        self.refused = 0
+        # location -> sorted (rank, entry) of proxies that can take another lease
+        self._available: Dict[str, List[tuple]] = {ANY_LOCATION: []}
+        self._expiry: List[Tuple[float, str]] = []
+        # Kept up to date as entries change, so stats() doesn't walk the index
+        self._states = {"ready": 0, "testing": 0, "failed": 0}
+        self._ready_locations: Dict[str, int] = {}
+        self.on_leases = on_leases
+        self._lock = lock or threading.Lock()
+
+    # -- ranking ---------------------------------------------------------
+
+    def _is_available(self, entry: ProxyEntry) -> bool:
+        return entry.state == "ready" and entry.leases + entry.bots < entry.capacity
+
+    def _insert(self, entry: ProxyEntry):
+        key = (entry.rank(), entry.url)
+        for location in (ANY_LOCATION, entry.location):
+            bisect.insort(self._available.setdefault(location, []), key)
+
+    def _remove(self, entry: ProxyEntry):
+        key = (entry.rank(), entry.url)
+        for location in (ANY_LOCATION, entry.location):
+            ranked = self._available.get(location, [])
+            position = bisect.bisect_left(ranked, key)
+            if position < len(ranked) and ranked[position] == key:
+                del ranked[position]
+
+    def _count(self, entry: ProxyEntry, change: int):
+        self._states[entry.state] += change
+        if entry.state == "ready":
+            count = self._ready_locations.get(entry.location, 0) + change
+            if count:
+                self._ready_locations[entry.location] = count
+            else:
+                del self._ready_locations[entry.location]
+
+    def _add(self, entry: ProxyEntry) -> ProxyEntry:
+        self.entries[entry.url] = entry
+        self._count(entry, 1)
+        return entry
+
+    def _change(self, entry: ProxyEntry, **fields):
+        """Update fields, keeping the ranked lists and counts consistent"""
+        if self._is_available(entry):
+            self._remove(entry)
+        self._count(entry, -1)
+        for name, value in fields.items():
+            setattr(entry, name, value)
+        self._count(entry, 1)
+        if self._is_available(entry):
+            self._insert(entry)
+
+    # -- proxies ---------------------------------------------------------
+
+    def update(self, url: str, location: str, score: int, latency_ms: float, capacity: Optional[int] = None):
+        """Record a passing test: the proxy is (back) in rotation"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                entry = self._add(ProxyEntry(url, location, self.max_leases))
+            self._change(entry, location=location, score=score, latency_ms=latency_ms, state="ready",
+                         tested_at=time.time(), failures=0, capacity=capacity or entry.capacity)
+
+    def suspend(self, url: str, state: str = "testing") -> Optional[ProxyEntry]:
+        """Take a proxy out of rotation (while it is re-tested, or for good when it failed)"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                failures = entry.failures + (state == "failed")
+                self._change(entry, state=state, failures=failures,
+                             tested_at=time.time() if state == "failed" else entry.tested_at)
+            return entry
+
+    def track(self, url: str, location: str) -> ProxyEntry:
+        """Entry for a proxy about to be tested for the first time"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is None:
+                entry = self._add(ProxyEntry(url, location, self.max_leases))
+            return entry
+
+    def set_bots(self, url: str, bots: int):
+        """Bots assigned to url (BotAssigner.on_bots)"""
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is not None and entry.bots != bots:
+                self._change(entry, bots=bots)
+
+    # -- leases ----------------------------------------------------------
+
+    def _reap(self, now: float):
+        while self._expiry and self._expiry[0][0] <= now:
+            expires, lease_id = heapq.heappop(self._expiry)
+            lease = self.leases.get(lease_id)
+            # Renewed leases leave stale heap items behind
+            if lease is not None and lease[1] == expires:
+                self._drop_lease(lease_id)
+
+    def _drop_lease(self, lease_id: str) -> Optional[str]:
+        url, _ = self.leases.pop(lease_id)
+        entry = self.entries.get(url)
+        if entry is not None:
+            self._change(entry, leases=entry.leases - 1)
+            self._leases_changed(entry)
+        return url
+
+    def _leases_changed(self, entry: ProxyEntry):
+        if self.on_leases is not None:
+            self.on_leases(entry.url, entry.leases)
+
+    def acquire(self, min_score: int = 0, location: Optional[str] = None) -> Optional[Tuple[str, ProxyEntry, float]]:
+        """Lease the best available proxy; returns (lease id, entry, expires) or None"""
+        now = time.time()
+        with self._lock:
+            self._reap(now)
+            ranked = self._available.get(location or ANY_LOCATION, ())
+            if not ranked or -ranked[0][0][0] < min_score:
+                self.refused += 1
+                return None
+            entry = self.entries[ranked[0][1]]
+            lease_id = secrets.token_urlsafe(12)
+            expires = now + self.lease_seconds
+            self.leases[lease_id] = (entry.url, expires)
+            heapq.heappush(self._expiry, (expires, lease_id))
+            self._change(entry, leases=entry.leases + 1)
+            self._leases_changed(entry)
+            self.served += 1
+            return lease_id, entry, expires
+
+    def renew(self, lease_id: str) -> Optional[float]:
+        now = time.time()
+        with self._lock:
+            self._reap(now)
+            lease = self.leases.get(lease_id)
+            if lease is None:
+                return None
+            expires = now + self.lease_seconds
+            self.leases[lease_id] = (lease[0], expires)
+            heapq.heappush(self._expiry, (expires, lease_id))
+            return expires
+
+    def release(self, lease_id: str) -> Optional[str]:
+        """End a lease; returns its proxy URL (None for unknown or expired leases)"""
+        with self._lock:
+            self._reap(time.time())
+            if lease_id not in self.leases:
+                return None
+            return self._drop_lease(lease_id)
+
+    def lease_url(self, lease_id: str) -> Optional[str]:
+        lease = self.leases.get(lease_id)
+        return lease[0] if lease else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._reap(time.time())
+            return {
+                "proxies": dict(self._states),
+                "available": len(self._available[ANY_LOCATION]),
+                "locations": dict(self._ready_locations),
+                "leases": len(self.leases),
+                "served": self.served,
+                "refused": self.refused,
+            }
+
+
+class ProxyService:
+    """The index plus the tester that fills and repairs it"""
+
+    def __init__(self, tester_kind: str = "standard", workers: int = 8,
+                 max_leases: int = 4, lease_seconds: float = 300.0):
+        self.tester_kind = tester_kind
+        self.tester, self.test = make_tester(tester_kind)
+        # Leases and sticky assignments count against one capacity per proxy, under one lock
+        lock = threading.RLock()
+        self.index = ProxyIndex(max_leases, lease_seconds, lock)
+        self.assigner = BotAssigner(lock, on_bots=self.index.set_bots)
+        self.index.on_leases = self.assigner.set_leases
+        self.tests_run = 0
+        self.tests_coalesced = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gt-api-test")
+        self._testing: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit_test(self, url: str, location: str = "unknown") -> Tuple[Future, bool]:
+        """Queue a test of url unless one is already running; returns (future, coalesced)"""
+        with self._lock:
+            future = self._testing.get(url)
+            if future is not None:
+                self.tests_coalesced += 1
+                return future, True
+            self.index.track(url, location)
+            future = self._testing[url] = self._pool.submit(self._run_test, url, location)
+            return future, False
+
+    def _run_test(self, url: str, location: str) -> bool:
+        try:
+            started = time.perf_counter()
+            is_compatible, results = self.test(url, location)
+            self.tests_run += 1
+            if is_compatible:
+                latency_ms = results.get("connect_ms") or round((time.perf_counter() - started) * 1000, 1)
+                capacity = proxy_capacity(results, default=self.index.max_leases,
+                                          slow_connect_ms=self._slow_connect_ms())
+                self.index.update(url, location, results.get(SCORE_KEYS[self.tester_kind], 0), latency_ms, capacity)
+                self._reassigned(url, self.assigner.update(url, location, capacity))
+            else:
+                self._failed(url)
+            return is_compatible
+        except Exception as e:
+            self.tester._log("ERROR", f"Test of {url} failed: {e}")
+            self._failed(url)
+            return False
+        finally:
+            with self._lock:
+                self._testing.pop(url, None)
+
+    def _slow_connect_ms(self) -> float:
+        """Connects slower than 90% of the pool's count as slow, once there are enough of them"""
+        latency = self.tester.latency
+        p90 = latency.percentile("socks5_basic", 90, min_count=30) if latency is not None else None
+        return p90 * 1000 if p90 is not None else SLOW_CONNECT_MS
+
+    def _failed(self, url: str):
+        self.index.suspend(url, "failed")
+        self._reassigned(url, self.assigner.remove(url))
+
+    def _reassigned(self, url: str, moves: Dict[str, Optional[str]]):
+        if moves:
+            placed = sum(new is not None for new in moves.values())
+            self.tester._log("WARNING", f"Moved {placed}/{len(moves)} bots off {url}")
+
+    def report(self, url: str) -> Optional[Tuple[Future, bool]]:
+        """A bot found url broken: out of rotation and re-tested now"""
+        entry = self.index.suspend(url)
+        if entry is None:
+            return None
+        return self.submit_test(url, entry.location)
+
+    def load(self, path: str, location: str = "unknown") -> int:
+        """Queue every proxy in a list file for testing"""
+        from gt_ingest import iter_proxies
+
+        queued = 0
+        for url, _ in iter_proxies(path):
+            _, coalesced = self.submit_test(url, location)
+            queued += not coalesced
+        return queued
+
+    def stats(self) -> dict:
+        stats = self.index.stats()
+        stats["tests_run"] = self.tests_run
+        stats["tests_running"] = len(self._testing)
+        stats["tests_coalesced"] = self.tests_coalesced
+        stats["assignments"] = self.assigner.stats()
+        if self.tester.latency is not None:
+            stats["latency"] = self.tester.latency.snapshot()
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _APIHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so a bot polling for proxies reuses its connection
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as two writes: with Nagle on, the body waits for the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _params(self) -> Tuple[str, dict]:
+        parts = urlsplit(self.path)
+        return parts.path.rstrip("/") or "/", {key: values[-1] for key, values in parse_qs(parts.query).items()}
+
+    def do_GET(self):
+        service: ProxyService = self.server.service
+        path, params = self._params()
+        if path == "/proxy":
+            try:
+                min_score = int(params.get("min_score", 0))
+            except ValueError:
+                self._reply(400, {"error": "min_score must be an integer"})
+                return
+            lease = service.index.acquire(min_score, params.get("location"))
+            if lease is None:
+                self._reply(503, {"error": "no proxy available"})
+                return
+            lease_id, entry, expires = lease
+            body = entry.to_dict()
+            body.update(lease=lease_id, expires_in=round(expires - time.time(), 1))
+            del body["leases"], body["bots"], body["capacity"], body["state"]
+            self._reply(200, body)
+        elif path == "/assign":
+            bot = params.get("bot")
+            if not bot:
+                self._reply(400, {"error": "bot is required"})
+                return
+            url = service.assigner.assign(bot, params.get("location"))
+            if url is None:
+                self._reply(503, {"error": "every proxy is at capacity"})
+                return
+            self._reply(200, {"bot": bot, "proxy": url})
+        elif path == "/status":
+            self._reply(200, service.stats())
+        else:
+            self._reply(404, {"error": f"unknown endpoint {path}"})
+
+    def do_POST(self):
+        service: ProxyService = self.server.service
+        path, params = self._params()
+        # Parameters may also come as a form body
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            body = self.rfile.read(length).decode("utf-8", "replace")
+            params.update({key: values[-1] for key, values in parse_qs(body).items()})
+
+        if path in ("/renew", "/release"):
+            lease_id = params.get("lease", "")
+            if path == "/renew":
+                expires = service.index.renew(lease_id)
+                result = None if expires is None else {"lease": lease_id, "expires_in": round(expires - time.time(), 1)}
+            else:
+                url = service.index.release(lease_id)
+                result = None if url is None else {"released": url}
+            self._reply(404, {"error": "unknown or expired lease"}) if result is None else self._reply(200, result)
+        elif path == "/unassign":
+            url = service.assigner.release(params.get("bot", ""))
+            self._reply(404, {"error": "unknown bot"}) if url is None else self._reply(200, {"released": url})
+        elif path == "/report":
+            url = params.get("proxy") or service.index.lease_url(params.get("lease", ""))
+            if params.get("lease"):
+                service.index.release(params["lease"])
+            queued = service.report(url) if url else None
+            if queued is None:
+                self._reply(404, {"error": "unknown proxy"})
+            else:
+                self._reply(202, {"proxy": url, "retest": "joined" if queued[1] else "queued"})
+        elif path == "/add":
+            url = params.get("proxy")
+            config = service.tester.parse_proxy_url(url) if url else None
+            if not config:
+                self._reply(400, {"error": "proxy must be a proxy URL"})
+                return
+            _, coalesced = service.submit_test(url, params.get("location", "unknown"))
+            self._reply(202, {"proxy": url, "test": "joined" if coalesced else "queued"})
+        else:
+            self._reply(404, {"error": f"unknown endpoint {path}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_api_server(service: ProxyService, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve the API from a daemon thread; returns the running server"""
+    server = ThreadingHTTPServer((host, port), _APIHandler)
+    server.daemon_threads = True
+    server.service = service
+    threading.Thread(target=server.serve_forever, name="gt-proxy-api", daemon=True).start()
+    return server
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Growtopia Proxy API")
+    parser.add_argument("--port", type=int, default=8765, help="Local port to serve on")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (keep it local)")
+    parser.add_argument("--pool", action="append", default=[], metavar="FILE[@LOCATION]",
+                        help="Proxy list to test and serve; repeatable (default working_proxies.txt)")
+    parser.add_argument("--tester", choices=sorted(SCORE_KEYS), default="standard")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel proxy tests")
+    parser.add_argument("--max-leases", type=int, default=4,
+                        help="Bots (leased or assigned) one proxy may serve at once when its bandwidth isn't measured")
+    parser.add_argument("--bandwidth-url", help="Payload URL for the bandwidth test that sizes each proxy's capacity")
+    parser.add_argument("--lease", type=float, default=300.0, help="Lease length in seconds")
+    parser.add_argument("--assignments", default="gt_assignments.json",
+                        help="File that keeps bot -> proxy assignments across restarts")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Send requests to Growtopia unthrottled")
+    parser.add_argument("--low-bytes", action="store_true",
+                        help="Read only the status of pages whose body is unused (metered bandwidth)")
+
+    args = parser.parse_args()
+
+    service = ProxyService(args.tester, args.workers, args.max_leases, args.lease)
+    tester = service.tester
+    tester.enable_console_output()
+    tester.enable_dns_cache()
+    if not args.no_rate_limit:
+        tester.enable_rate_limits()
+    tester.enable_byte_counters()
+    tester.enable_latency_histograms()
+    tester.low_bytes = args.low_bytes
+    tester.bandwidth_url = args.bandwidth_url
+    if args.metrics_port:
+        tester.enable_metrics(args.metrics_port)
+
+    restored = service.assigner.restore(args.assignments)
+    if restored:
+        print(f"Restoring {restored} bot assignments from {args.assignments}")
+
+    for pool in args.pool or ["working_proxies.txt"]:
+        path, _, location = pool.partition("@")
+        if not os.path.isfile(path):
+            print(f"Error: File {path} not found")
+            sys.exit(1)
+        print(f"Testing {service.load(path, location or 'unknown')} proxies from {path}...")
+
+    start_api_server(service, args.port, args.host)
+    print(f"Proxy API listening on http://{args.host}:{args.port} (GET /proxy, GET /status)")
+    try:
+        while True:
+            time.sleep(60)
+            stats = service.stats()
+            print(f"{stats['proxies']['ready']} ready, {stats['leases']} leased, "
+                  f"{stats['assignments']['bots']} bots assigned, "
+                  f"{stats['served']} served, {stats['tests_running']} tests running")
+            service.assigner.save(args.assignments)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+        service.assigner.save(args.assignments)
+
+
+if __name__ == "__main__":
+    main()
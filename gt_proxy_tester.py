@@ -1,27 +1,39 @@
 #!/home/joy/cproxy/venv/bin/python3
 
+import atexit
+import hashlib
 import json
+import os
 import random
 import re
+import shutil
 import socket
 import subprocess
 import sys
 import threading
 import time
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from typing import Optional, Tuple
+from urllib.parse import urlsplit
 
-import requests
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
-from urllib3.contrib.socks import SOCKSProxyManager
+from gt_library import EventBus
+from gt_records import SCORE_FIELDS
+
+# requests/urllib3 and PySocks are imported lazily by the stages that use
+# them, so short runs like --test-proxy or --help don't pay for them upfront.
+
+PREREQ_CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "cproxy", "prerequisites.json"
+)
 
 
 class GrowtopiaProxyTester:
-    def __init__(self, app_name: str = "ipburger-demo-joy"):
+    def __init__(self, app_name: str = "ipburger-demo-joy", show_banner: bool = False):
         self.app_name = app_name
         self.locations = ["au", "us", "ca", "uk", "de", "fr", "nl", "sg"]
         self.working_proxies_file = "working_proxies.txt"
+        self.cycle_journal_file = "gt_test_cycle.progress"
         
         # Growtopia specific constants based on Mori source
         self.USER_AGENT = "UbiServices_SDK_2022.Release.9_PC64_ansi_static"
@@ -40,7 +52,63 @@ class GrowtopiaProxyTester:
             "https://www.growtopia1.com/growtopia/server_data.php"
         ]
         
-        print(self._get_banner())
+        # Optional bandwidth stage (disabled until a payload URL is set)
+        self.bandwidth_url = None
+        self.BANDWIDTH_MAX_BYTES = 4 * 1024 * 1024
+        self.BANDWIDTH_MIN_KB_PER_S = 256
+        self.BANDWIDTH_STALL_SECONDS = 1.0
+        
+        # Optional metrics export (see enable_metrics)
+        self.metrics = None
+        self.current_location = "unknown"
+        
+        # Optional profiling mode (see enable_profiling)
+        self.profiler = None
+        
+        # Optional per-target request rate limits (see enable_rate_limits) and
+        # per-proxy time budget that queued requests must not overrun
+        self.rate_limiter = None
+        self.test_deadline_s = None
+        
+        # Optional stage timeouts learned from past latencies (see enable_stage_timeouts)
+        self.stage_timeouts = None
+        
+        # Optional latency histograms per stage and location (see enable_latency_histograms)
+        self.latency = None
+        
+        # Optional columnar history of every verdict (see enable_history)
+        self.history = None
+        
+        # Optional per-stage byte counters (see enable_byte_counters). Low-byte
+        # mode reads only the status line of pages whose body nobody looks at.
+        self.byte_counters = False
+        self.low_bytes = False
+        
+        # DNS: shared resolver cache (see enable_dns_cache) and per-stage policy.
+        # "remote" lets the proxy resolve the target, "local" resolves it here.
+        # A socks5h:// proxy URL forces remote resolution for every stage.
+        self.dns_cache = None
+        self.DNS_POLICY = {
+            "socks5_basic": "remote",
+            "http_website": "local",
+            "server_data": "local",
+            "tcp_game_server": "remote",
+            "enet_compat": "remote",
+            "enet_handshake": "remote",
+            "login_sequence": "local",
+            "bandwidth": "local",
+            "udp_probe": "local"
+        }
+        self._local = threading.local()
+        
+        # Quiet by default: log lines, stages and verdicts are events (see
+        # gt_library); enable_console_output() prints them as before
+        self.events = EventBus()
+        self.console = None
+        self.jsonl_output = None
+        
+        if show_banner:
+            print(self._get_banner())
         
     def _get_banner(self) -> str:
         return f"""
@@ -54,17 +122,309 @@ Implementation: Based on Mori Protocol Analysis
 """
 
     def _log(self, level: str, message: str):
-        """Enhanced logging with colors"""
-        colors = {
-            "INFO": "\033[96m",     # Cyan
-            "SUCCESS": "\033[92m",  # Green
-            "WARNING": "\033[93m",  # Yellow
-            "ERROR": "\033[91m",    # Red
-            "DEBUG": "\033[95m"     # Magenta
-        }
-        reset = "\033[0m"
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {colors.get(level, '')}{level}: {message}{reset}")
+        """Emit a log event (printed with colors once console output is enabled)"""
+        self.events.emit("log", level=level, message=message)
+
+    def enable_console_output(self):
+        """Print log lines and rotation progress to the terminal, as the CLIs do"""
+        from gt_library import ConsoleOutput
+        
+        if self.console is None:
+            self.console = ConsoleOutput()
+            self.console.attach(self.events)
+        return self.console
+
+    def enable_jsonl_output(self, stream=None):
+        """Write a JSON Lines record for every finished test (stdout by default)"""
+        from gt_library import JsonLinesOutput
+        
+        if self.jsonl_output is None:
+            self.jsonl_output = JsonLinesOutput(stream)
+            self.jsonl_output.attach(self.events)
+        return self.jsonl_output
+
+    def enable_metrics(self, port: Optional[int] = None):
+        """Start recording metrics; serve them on localhost if a port is given"""
+        from gt_metrics import TesterMetrics, start_metrics_server
+        
+        if self.metrics is None:
+            self.metrics = TesterMetrics()
+            if self.rate_limiter is not None:
+                self.rate_limiter.metrics = self.metrics
+            self.metrics.latency = self.latency
+        if port is not None:
+            start_metrics_server(self.metrics, port)
+            self._log("INFO", f"Metrics available at http://127.0.0.1:{port}/metrics")
+        return self.metrics
+
+    def enable_profiling(self, output: Optional[str] = None):
+        """Profile stages from now on; output may be a .prof or .folded file"""
+        from gt_profiler import StageProfiler
+        
+        if self.profiler is None:
+            self.profiler = StageProfiler(output)
+            self.profiler.start()
+        return self.profiler
+
+    def finish_profiling(self):
+        """Stop profiling and print the ranked summary"""
+        if self.profiler is not None:
+            self.profiler.stop()
+            print(self.profiler.report())
+
+    def _profiled(self, section: str):
+        """Context manager charging time to a profiler section (no-op when off)"""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.stage(section)
+
+    def enable_dns_cache(self, prefetch: bool = True):
+        """Share one resolver cache across all stages and prefetch known hosts"""
+        from gt_dns import DNSCache
+        
+        if self.dns_cache is None:
+            self.dns_cache = DNSCache()
+            self.dns_cache.install()
+            if prefetch:
+                self.dns_cache.prefetch(self._known_hosts())
+        return self.dns_cache
+
+    def enable_rate_limits(self, rates: Optional[dict] = None, egress_rate: Optional[Tuple[float, int]] = None):
+        """Share per-domain token buckets (gt_ratelimit.DEFAULT_RATES by default) across all tests"""
+        from gt_ratelimit import RateLimiter
+        
+        if self.rate_limiter is None:
+            self.rate_limiter = RateLimiter(rates, egress_rate, metrics=self.metrics)
+        return self.rate_limiter
+
+    def enable_stage_timeouts(self, percentile: float = 99.0, margin: float = 1.5, audit_rate: float = 0.05):
+        """Set stage timeouts from persisted latency quantiles instead of the fixed defaults"""
+        from gt_timeouts import StageTimeouts
+        
+        if self.stage_timeouts is None:
+            self.stage_timeouts = StageTimeouts(percentile, margin, audit_rate)
+        return self.stage_timeouts
+
+    def enable_latency_histograms(self, window_seconds: float = 60.0):
+        """Keep HDR-style histograms of successful stage durations per location"""
+        from gt_latency import LatencyHistograms
+        
+        if self.latency is None:
+            self.latency = LatencyHistograms(window_seconds)
+            if self.metrics is not None:
+                self.metrics.latency = self.latency
+        return self.latency
+
+    def enable_history(self, path: str = "gt_history"):
+        """Append every verdict, pass or fail, to the columnar history in path (see gt_history)"""
+        from gt_history import HistoryWriter
+        
+        if self.history is None:
+            # Called on the test's thread when its verdict is recorded
+            self.history = HistoryWriter(path, location=self._test_location)
+            self.history.attach(self.events)
+            atexit.register(self.history.close)
+        return self.history
+
+    def enable_byte_counters(self):
+        """Count the bytes each stage exchanges with the proxy (results and metrics)"""
+        import gt_bytes
+        
+        gt_bytes.install()
+        self.byte_counters = True
+
+    def _known_hosts(self) -> list:
+        """Every hostname the stages are going to need"""
+        hosts = ["www.google.com", "growtopiagame.com", "login.growtopiagame.com"]
+        hosts += [server.split(':')[0] for server in self.GROWTOPIA_SERVERS]
+        hosts += [urlsplit(url).hostname for url in self.SERVER_DATA_URLS]
+        if self.bandwidth_url:
+            hosts.append(urlsplit(self.bandwidth_url).hostname)
+        return hosts
+
+    def _proxy_address(self, proxy_config: dict) -> str:
+        """Proxy host for raw PySocks sockets, resolved through the DNS cache"""
+        if self.dns_cache is None:
+            return proxy_config['host']
+        try:
+            return self.dns_cache.resolve(proxy_config['host'])
+        except socket.gaierror:
+            return proxy_config['host']
+
+    def _remote_dns(self, stage: str, proxy_config: dict) -> bool:
+        """Whether a stage should let the proxy resolve target hostnames"""
+        if proxy_config.get('remote_dns'):
+            return True
+        return self.DNS_POLICY.get(stage, "remote") == "remote"
+
+    def _begin_test(self, proxy_url: str, location: Optional[str] = None):
+        """
+        Common entry point of every compatibility test. location is the
+        proxy's own (e.g. a pool's @LOCATION tag); without one, the
+        location of the last IPBurger rotation.
+        """
+        self._local.proxy_url = proxy_url
+        self._local.location = location
+        self.events.emit("test_started", proxy=proxy_url)
+        if self.dns_cache is not None:
+            self._local.dns_start = self.dns_cache.thread_counters()
+        self._local.deadline = time.monotonic() + self.test_deadline_s if self.test_deadline_s else None
+        self._local.connect_ms = None
+        self._local.stage_bytes = {}
+        self._local.bytes_sent = self._local.bytes_received = 0
+        self._local.refusals = 0
+        self._local.rate_limited = []
+        # Audited tests keep the default timeouts to measure what tuning would miss
+        self._local.audit = self.stage_timeouts is not None and self.stage_timeouts.audit()
+
+    def _test_location(self) -> str:
+        """Location of the proxy under test on this thread, which latency and timeouts are kept by"""
+        return getattr(self._local, "location", None) or self.current_location
+
+    def _stage_outcome(self, result) -> str:
+        """Map a stage's return value (bool or (bool, detail)) to a metrics label"""
+        if isinstance(result, tuple):
+            passed, detail = result[0], result[1]
+            if detail == "403":
+                return "blocked"
+            if detail in ("TIMEOUT", "PROXY_ERROR", "ERROR", "RATE_LIMITED"):
+                return detail.lower()
+            return "pass" if passed else "fail"
+        return "pass" if result else "fail"
+
+    def _run_stage(self, stage: str, func, *args, **kwargs):
+        """Run one test stage, recording its outcome and duration"""
+        tuned = None
+        audit = getattr(self._local, "audit", False)
+        location = self._test_location()
+        if self.stage_timeouts is not None and "timeout" not in kwargs:
+            tuned = self.stage_timeouts.timeout_for(stage, location)
+            if tuned is not None and not audit:
+                kwargs["timeout"] = tuned
+        
+        self.events.emit("stage_started", stage=stage)
+        refusals = getattr(self._local, "refusals", 0)
+        outer_ops = getattr(self._local, "network_ops", None)
+        self._local.network_ops = ops = [None, None]
+        start = time.monotonic()
+        try:
+            with self._profiled(stage), self._metered() as meter:
+                result = func(*args, **kwargs)
+        finally:
+            self._local.network_ops = outer_ops
+            if outer_ops is not None:
+                # A nested stage's requests count toward the outer one too
+                for index, seconds in enumerate(ops):
+                    if seconds is not None:
+                        self._record_op(seconds, index == 0)
+        elapsed = time.monotonic() - start
+        
+        outcome = self._stage_outcome(result)
+        if outcome != "pass" and getattr(self._local, "refusals", 0) > refusals:
+            # The rate limiter kept a request from being sent: inconclusive, not failed
+            outcome = "rate_limited"
+        limited = getattr(self._local, "rate_limited", None)
+        if outcome == "rate_limited" and limited is not None and stage not in limited:
+            limited.append(stage)
+        if stage == "socks5_basic":
+            # Time to open a connection through the proxy: its latency as clients see it
+            self._local.connect_ms = round(elapsed * 1000, 1)
+        if meter is not None:
+            self._record_stage_bytes(stage, meter)
+        if self.metrics is not None:
+            self.metrics.record_stage(stage, outcome, elapsed)
+            if stage == "http_website":
+                self.metrics.record_http_status(location, result[1])
+        if self.stage_timeouts is not None:
+            # The timeout bounds each request, not the stage: sample the longest timed
+            # request (without rate-limiter queueing or the other URLs/servers tried)
+            longest_ok, longest = ops
+            seconds = longest_ok if outcome == "pass" else longest
+            self.stage_timeouts.observe(stage, location, elapsed if seconds is None else seconds,
+                                        outcome == "pass", tuned, audit)
+        if self.latency is not None and outcome == "pass":
+            self.latency.record(stage, location, elapsed)
+        self.events.emit("stage_finished", stage=stage, outcome=outcome, seconds=elapsed, result=result)
+        
+        return result
+
+    def _record_op(self, seconds: float, completed: bool = True):
+        """One timed network operation of the running stage (completed or not)"""
+        ops = getattr(self._local, "network_ops", None)
+        if ops is None:
+            return
+        ops[1] = max(ops[1] or 0.0, seconds)
+        if completed:
+            ops[0] = max(ops[0] or 0.0, seconds)
+
+    @contextmanager
+    def _timed_op(self):
+        """Time a socket operation that the stage timeout bounds"""
+        start = time.monotonic()
+        completed = False
+        try:
+            yield
+            completed = True
+        finally:
+            self._record_op(time.monotonic() - start, completed)
+
+    def _refused(self, what: str, error: Exception):
+        """A request the rate limiter refused (gt_ratelimit.RateLimited); its stage reports rate_limited"""
+        self._log("WARNING", f"{what} skipped: {error}")
+        self._local.refusals = getattr(self._local, "refusals", 0) + 1
+
+    def _metered(self):
+        """Context manager yielding a gt_bytes.ByteMeter, or None when byte counters are off"""
+        if not self.byte_counters:
+            return nullcontext()
+        import gt_bytes
+        return gt_bytes.measure()
+
+    def _record_stage_bytes(self, stage: str, meter):
+        # Each stage keeps only its own bytes: nested stages (the handshake inside
+        # the login sequence) are reported under their own name, not the outer one too
+        sent = meter.sent - meter.nested_sent
+        received = meter.received - meter.nested_received
+        stage_bytes = getattr(self._local, "stage_bytes", None)
+        if stage_bytes is not None:
+            stage_bytes[stage] = stage_bytes.get(stage, 0) + sent + received
+            if meter.parent is None:
+                # The outermost meter already includes the nested ones
+                self._local.bytes_sent += meter.sent
+                self._local.bytes_received += meter.received
+        if self.metrics is not None:
+            self.metrics.record_stage_bytes(stage, sent, received)
+
+    def _finish_test(self, tester: str, compatible: bool, results: dict,
+                     new_proxy: bool = True) -> Tuple[bool, dict]:
+        """Common exit point of every compatibility test (new_proxy=False for extra verdicts on one probe)"""
+        if getattr(self._local, "connect_ms", None) is not None:
+            results["connect_ms"] = self._local.connect_ms
+        if getattr(self._local, "rate_limited", None):
+            # Stages the limiter refused were never tried, so a failed verdict is inconclusive
+            results["rate_limited"] = list(self._local.rate_limited)
+            if not compatible:
+                results["compatibility_reason"] = (f"Inconclusive: rate limit refused "
+                                                   f"{', '.join(self._local.rate_limited)} before the test deadline")
+        if self.byte_counters and getattr(self._local, "stage_bytes", None) is not None:
+            results["bytes_sent"] = self._local.bytes_sent
+            results["bytes_received"] = self._local.bytes_received
+            results["stage_bytes"] = dict(self._local.stage_bytes)
+        if self.dns_cache is not None and hasattr(self._local, "dns_start"):
+            lookups, hits, seconds, saved = (
+                now - before for now, before in zip(self.dns_cache.thread_counters(), self._local.dns_start)
+            )
+            results["dns_lookups"] = lookups
+            results["dns_cache_hits"] = hits
+            results["dns_ms"] = round(seconds * 1000, 1)
+            results["dns_saved_ms"] = round(saved * 1000, 1)
+            self._log("DEBUG", f"DNS: {lookups} lookups ({results['dns_ms']} ms), "
+                               f"{hits} cache hits (~{results['dns_saved_ms']} ms saved)")
+        if self.metrics is not None:
+            self.metrics.record_verdict(tester, compatible, new_proxy)
+        self.events.emit("verdict", proxy=getattr(self._local, "proxy_url", None), tester=tester,
+                         compatible=compatible, results=results)
+        return compatible, results
 
     def get_credential(self) -> Optional[str]:
         """Get proxy credential from Heroku"""
@@ -83,18 +443,50 @@ Implementation: Based on Mori Protocol Analysis
 
     def parse_proxy_url(self, proxy_url: str) -> Optional[dict]:
         """Parse SOCKS5 proxy URL into components"""
-        pattern = r"socks5h?://([^:]+):([^@]+)@([^:]+):([0-9]+)"
+        pattern = r"socks5(h?)://([^:]+):([^@]+)@([^:]+):([0-9]+)"
         match = re.match(pattern, proxy_url)
         
         if match:
             return {
-                'username': match.group(1),
-                'password': match.group(2),
-                'host': match.group(3),
-                'port': int(match.group(4))
+                'username': match.group(2),
+                'password': match.group(3),
+                'host': match.group(4),
+                'port': int(match.group(5)),
+                'remote_dns': match.group(1) == 'h'
             }
         return None
 
+    def _proxy_session(self, proxy_config: dict, remote_dns: bool = False):
+        """requests session routed through the SOCKS5 proxy"""
+        import requests
+        
+        scheme = "socks5h" if remote_dns else "socks5"
+        proxy_url = f"{scheme}://{proxy_config['username']}:{proxy_config['password']}@{proxy_config['host']}:{proxy_config['port']}"
+        
+        session = requests.Session()
+        session.proxies = {
+            'http': proxy_url,
+            'https': proxy_url
+        }
+        send = session.send
+        
+        def timed_send(request, **kwargs):
+            start = time.monotonic()
+            try:
+                response = send(request, **kwargs)
+            except Exception:
+                self._record_op(time.monotonic() - start, False)
+                raise
+            # requests' own per-hop time to the response headers, so redirects aren't summed
+            self._record_op(max(hop.elapsed.total_seconds() for hop in response.history + [response]))
+            return response
+        
+        session.send = timed_send
+        if self.rate_limiter is not None:
+            # The proxy endpoint stands in for its egress IP
+            self.rate_limiter.throttle_session(session, proxy_config['host'], getattr(self._local, "deadline", None))
+        return session
+
     def test_socks5_basic(self, proxy_config: dict, timeout: int = 15) -> bool:
         """Test basic SOCKS5 connectivity using socket connection"""
         try:
@@ -103,15 +495,17 @@ Implementation: Based on Mori Protocol Analysis
             sock = socks.socksocket()
             sock.set_proxy(
                 socks.SOCKS5, 
-                proxy_config['host'], 
+                self._proxy_address(proxy_config), 
                 proxy_config['port'],
                 username=proxy_config['username'],
-                password=proxy_config['password']
+                password=proxy_config['password'],
+                rdns=self._remote_dns("socks5_basic", proxy_config)
             )
             sock.settimeout(timeout)
             
             # Test connection to Google (reliable test)
-            sock.connect(("www.google.com", 80))
+            with self._timed_op():
+                sock.connect(("www.google.com", 80))
             sock.close()
             
             self._log("SUCCESS", "SOCKS5 basic connectivity test passed")
@@ -123,21 +517,20 @@ Implementation: Based on Mori Protocol Analysis
 
     def test_http_to_growtopia(self, proxy_config: dict, timeout: int = 20) -> Tuple[bool, str]:
         """Test HTTP connection to Growtopia website with proper proxy"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        from gt_ratelimit import RateLimited
+        
         try:
             # Create SOCKS proxy for requests
-            proxy_url = f"socks5://{proxy_config['username']}:{proxy_config['password']}@{proxy_config['host']}:{proxy_config['port']}"
+            session = self._proxy_session(proxy_config, self._remote_dns("http_website", proxy_config))
             
-            session = requests.Session()
-            session.proxies = {
-                'http': proxy_url,
-                'https': proxy_url
-            }
-            
-            # Configure retry strategy
+            # Configure retry strategy (low-byte mode doesn't refetch the page on 5xx/429)
             retry_strategy = Retry(
                 total=3,
                 backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504],
+                status_forcelist=[] if self.low_bytes else [429, 500, 502, 503, 504],
             )
             
             adapter = HTTPAdapter(max_retries=retry_strategy)
@@ -149,13 +542,16 @@ Implementation: Based on Mori Protocol Analysis
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
             
+            # Only the status matters; low-byte mode closes the connection once it arrives
             response = session.get(
                 "https://growtopiagame.com/",
                 headers=headers,
-                timeout=timeout
+                timeout=timeout,
+                stream=self.low_bytes
             )
             
             status_code = response.status_code
+            response.close()
             
             if status_code == 200:
                 self._log("SUCCESS", f"HTTP to Growtopia website: {status_code}")
@@ -173,20 +569,22 @@ Implementation: Based on Mori Protocol Analysis
         except requests.exceptions.Timeout as e:
             self._log("ERROR", f"HTTP request timeout: {e}")
             return False, "TIMEOUT"
+        except RateLimited as e:
+            self._refused("HTTP test", e)
+            return False, "RATE_LIMITED"
         except Exception as e:
             self._log("ERROR", f"HTTP test failed: {e}")
             return False, "ERROR"
 
-    def test_server_data_endpoint(self, proxy_config: dict, timeout: int = 20) -> bool:
-        """Test connection to Growtopia server_data.php endpoint"""
+    def fetch_server_data(self, proxy_config: dict, timeout: int = 20) -> Optional[dict]:
+        """
+        POST to Growtopia server_data.php through the proxy
+        Returns the parsed key|value fields of the first valid reply, or None
+        """
+        from gt_ratelimit import RateLimited
+        
         try:
-            proxy_url = f"socks5://{proxy_config['username']}:{proxy_config['password']}@{proxy_config['host']}:{proxy_config['port']}"
-            
-            session = requests.Session()
-            session.proxies = {
-                'http': proxy_url,
-                'https': proxy_url
-            }
+            session = self._proxy_session(proxy_config, self._remote_dns("server_data", proxy_config))
             
             headers = {
                 'User-Agent': self.USER_AGENT,
@@ -203,18 +601,30 @@ Implementation: Based on Mori Protocol Analysis
                         # Parse server data response (basic validation)
                         if "server|" in response.text or "port|" in response.text:
                             self._log("SUCCESS", f"Server data endpoint accessible: {url}")
-                            return True
+                            server_info = {}
+                            for line in response.text.strip().split('\n'):
+                                if '|' in line:
+                                    key, value = line.split('|', 1)
+                                    server_info[key] = value
+                            return server_info
                         
+                except RateLimited as e:
+                    self._refused(f"Server data from {url}", e)
+                    continue
                 except Exception as e:
                     self._log("DEBUG", f"Server data test failed for {url}: {e}")
                     continue
             
             self._log("ERROR", "All server data endpoints failed")
-            return False
+            return None
             
         except Exception as e:
             self._log("ERROR", f"Server data test failed: {e}")
-            return False
+            return None
+
+    def test_server_data_endpoint(self, proxy_config: dict, timeout: int = 20) -> bool:
+        """Test connection to Growtopia server_data.php endpoint"""
+        return self.fetch_server_data(proxy_config, timeout) is not None
 
     def test_tcp_connection_to_game_server(self, proxy_config: dict, timeout: int = 15) -> bool:
         """Test TCP connection to Growtopia game servers through SOCKS5"""
@@ -229,15 +639,17 @@ Implementation: Based on Mori Protocol Analysis
                     sock = socks.socksocket()
                     sock.set_proxy(
                         socks.SOCKS5,
-                        proxy_config['host'],
+                        self._proxy_address(proxy_config),
                         proxy_config['port'],
                         username=proxy_config['username'],
-                        password=proxy_config['password']
+                        password=proxy_config['password'],
+                        rdns=self._remote_dns("tcp_game_server", proxy_config)
                     )
                     sock.settimeout(timeout)
                     
                     self._log("DEBUG", f"Testing TCP connection to {server}")
-                    sock.connect((host, port))
+                    with self._timed_op():
+                        sock.connect((host, port))
                     sock.close()
                     
                     self._log("SUCCESS", f"TCP connection successful to {server}")
@@ -271,10 +683,11 @@ Implementation: Based on Mori Protocol Analysis
             sock = socks.socksocket(socket.AF_INET, socket.SOCK_DGRAM)
             sock.set_proxy(
                 socks.SOCKS5,
-                proxy_config['host'],
+                self._proxy_address(proxy_config),
                 proxy_config['port'],
                 username=proxy_config['username'],
-                password=proxy_config['password']
+                password=proxy_config['password'],
+                rdns=self._remote_dns("enet_compat", proxy_config)
             )
             sock.settimeout(10)
             
@@ -302,7 +715,127 @@ Implementation: Based on Mori Protocol Analysis
             self._log("DEBUG", f"ENet compatibility test failed: {e}")
             return True  # Don't fail the entire test
 
-    def test_full_growtopia_compatibility(self, proxy_url: str) -> Tuple[bool, dict]:
+    def _summarize_transfer(self, samples: list) -> dict:
+        """
+        Summarize (elapsed_seconds, total_bytes) samples of a streamed download.
+        Sustained throughput excludes the first quarter of the payload so that
+        TCP slow-start and the proxy handshake don't drag the number down.
+        """
+        stats = {"bytes": 0, "kb_per_s": 0.0, "rampup_s": 0.0, "stalls": 0, "duration_s": 0.0}
+        if not samples:
+            return stats
+        
+        total = samples[-1][1]
+        duration = samples[-1][0]
+        stats["bytes"] = total
+        stats["duration_s"] = round(duration, 3)
+        
+        # Count gaps between chunks long enough to stall a world download;
+        # connect, TLS and time to first byte before the first chunk don't count
+        previous = samples[0][0]
+        for elapsed, _ in samples:
+            if elapsed - previous > self.BANDWIDTH_STALL_SECONDS:
+                stats["stalls"] += 1
+            previous = elapsed
+        
+        # Sustained rate from the point a quarter of the payload had arrived
+        base_time, base_bytes = next((s for s in samples if s[1] >= total / 4), samples[0])
+        if duration - base_time > 0:
+            sustained = (total - base_bytes) / (duration - base_time)
+        elif duration > 0:
+            sustained = total / duration
+        else:
+            sustained = 0.0
+        stats["kb_per_s"] = round(sustained / 1024, 1)
+        
+        # Ramp-up: first moment a 0.5s window reaches 80% of the sustained rate
+        stats["rampup_s"] = round(duration, 3)
+        start = 0
+        for end in range(len(samples)):
+            while samples[end][0] - samples[start][0] > 0.5:
+                start += 1
+            window = samples[end][0] - samples[start][0]
+            if window > 0 and (samples[end][1] - samples[start][1]) / window >= 0.8 * sustained:
+                stats["rampup_s"] = round(samples[start][0], 3)
+                break
+        
+        return stats
+
+    def test_bandwidth(self, proxy_config: dict, timeout: int = 30) -> Tuple[bool, dict]:
+        """Stream a sized payload through the proxy and measure sustained throughput"""
+        stats = self._summarize_transfer([])
+        if not self.bandwidth_url:
+            return False, stats
+        
+        try:
+            session = self._proxy_session(proxy_config, self._remote_dns("bandwidth", proxy_config))
+            
+            start = time.monotonic()
+            response = session.get(
+                self.bandwidth_url,
+                headers={'User-Agent': self.USER_AGENT},
+                stream=True,
+                timeout=timeout
+            )
+            
+            if response.status_code != 200:
+                response.close()
+                self._log("WARNING", f"Bandwidth payload returned {response.status_code}")
+                return False, stats
+            
+            samples = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=16384):
+                received += len(chunk)
+                elapsed = time.monotonic() - start
+                samples.append((elapsed, received))
+                if received >= self.BANDWIDTH_MAX_BYTES or elapsed > timeout:
+                    break
+            response.close()
+            
+            stats = self._summarize_transfer(samples)
+            passed = stats["kb_per_s"] >= self.BANDWIDTH_MIN_KB_PER_S and stats["stalls"] == 0
+            
+            level = "SUCCESS" if passed else "WARNING"
+            self._log(level, f"Bandwidth: {stats['kb_per_s']} KB/s sustained, "
+                             f"ramp-up {stats['rampup_s']}s, {stats['stalls']} stalls "
+                             f"({stats['bytes']} bytes)")
+            return passed, stats
+            
+        except Exception as e:
+            self._log("ERROR", f"Bandwidth test failed: {e}")
+            return False, stats
+
+    def _run_bandwidth_stage(self, proxy_config: dict, results: dict):
+        """Run the optional bandwidth stage and store its figures in results"""
+        if not self.bandwidth_url:
+            return
+        
+        self._log("INFO", "Measuring sustained bandwidth through proxy...")
+        passed, stats = self._run_stage("bandwidth", self.test_bandwidth, proxy_config)
+        results["bandwidth"] = passed
+        results["bandwidth_kb_per_s"] = stats["kb_per_s"]
+        results["bandwidth_rampup_s"] = stats["rampup_s"]
+        results["bandwidth_stalls"] = stats["stalls"]
+        results["bandwidth_bytes"] = stats["bytes"]
+
+    def _bandwidth_penalty(self, results: dict) -> int:
+        """Points deducted from any tester's score for a slow or stalling proxy"""
+        if "bandwidth" not in results:
+            return 0
+        if not results["bandwidth_bytes"]:
+            return 15
+        
+        penalty = 0
+        rate = results["bandwidth_kb_per_s"]
+        if rate < self.BANDWIDTH_MIN_KB_PER_S / 4:
+            penalty += 10
+        elif rate < self.BANDWIDTH_MIN_KB_PER_S:
+            penalty += 5
+        penalty += min(5, results["bandwidth_stalls"])
+        return penalty
+
+    def test_full_growtopia_compatibility(self, proxy_url: str, location: Optional[str] = None) -> Tuple[bool, dict]:
         """
         Comprehensive Growtopia compatibility test
         Returns (is_compatible, test_results)
@@ -311,45 +844,58 @@ Implementation: Based on Mori Protocol Analysis
         if not proxy_config:
             return False, {"error": "Invalid proxy format"}
         
+        self._begin_test(proxy_url, location)
         self._log("INFO", f"Testing proxy: {proxy_config['host']}:{proxy_config['port']}")
         
-        results = {
-            "socks5_basic": False,
-            "http_website": False,
-            "http_status": "UNKNOWN",
-            "server_data": False,
-            "tcp_game_server": False,
-            "enet_compat": False,
-            "overall_score": 0,
-            "is_growtopia_compatible": False
-        }
+        results = self._standard_results()
         
         # Test 1: Basic SOCKS5 connectivity
         self._log("INFO", "Running SOCKS5 basic connectivity test...")
-        results["socks5_basic"] = self.test_socks5_basic(proxy_config)
+        results["socks5_basic"] = self._run_stage("socks5_basic", self.test_socks5_basic, proxy_config)
         
         if not results["socks5_basic"]:
             self._log("ERROR", "Basic SOCKS5 test failed - proxy unusable")
-            return False, results
+            return self._finish_test("standard", False, results)
         
         # Test 2: HTTP to Growtopia website
         self._log("INFO", "Testing HTTP connection to Growtopia website...")
-        http_success, status_code = self.test_http_to_growtopia(proxy_config)
+        http_success, status_code = self._run_stage("http_website", self.test_http_to_growtopia, proxy_config)
         results["http_website"] = http_success
         results["http_status"] = status_code
         
         # Test 3: Server data endpoint (critical for game)
         self._log("INFO", "Testing Growtopia server data endpoints...")
-        results["server_data"] = self.test_server_data_endpoint(proxy_config)
+        results["server_data"] = self._run_stage("server_data", self.test_server_data_endpoint, proxy_config)
         
         # Test 4: TCP connection to game servers
         self._log("INFO", "Testing TCP connections to game servers...")
-        results["tcp_game_server"] = self.test_tcp_connection_to_game_server(proxy_config)
+        results["tcp_game_server"] = self._run_stage("tcp_game_server", self.test_tcp_connection_to_game_server, proxy_config)
         
         # Test 5: ENet protocol compatibility
         self._log("INFO", "Testing ENet protocol compatibility...")
-        results["enet_compat"] = self.test_enet_compatibility(proxy_config)
+        results["enet_compat"] = self._run_stage("enet_compat", self.test_enet_compatibility, proxy_config)
         
+        # Test 6: Sustained bandwidth (optional)
+        self._run_bandwidth_stage(proxy_config, results)
+        
+        compatible = self.score_standard(results)
+        return self._finish_test("standard", compatible, results)
+
+    def _standard_results(self) -> dict:
+        """Results dict of test_full_growtopia_compatibility before any stage runs"""
+        return {
+            "socks5_basic": False,
+            "http_website": False,
+            "http_status": "UNKNOWN",
+            "server_data": False,
+            "tcp_game_server": False,
+            "enet_compat": False,
+            "overall_score": 0,
+            "is_growtopia_compatible": False
+        }
+
+    def score_standard(self, results: dict) -> bool:
+        """Fill in overall_score and the verdict from the stage outcomes in results"""
         # Calculate overall compatibility score
         score = 0
         if results["socks5_basic"]: score += 20
@@ -357,6 +903,7 @@ Implementation: Based on Mori Protocol Analysis
         if results["server_data"]: score += 30
         if results["tcp_game_server"]: score += 20
         if results["enet_compat"]: score += 5
+        score = max(0, score - self._bandwidth_penalty(results))
         
         results["overall_score"] = score
         
@@ -373,7 +920,7 @@ Implementation: Based on Mori Protocol Analysis
             results["is_growtopia_compatible"] = False
             self._log("WARNING", "Proxy blocked by Growtopia (403 Forbidden)")
         
-        return results["is_growtopia_compatible"], results
+        return results["is_growtopia_compatible"]
 
     def rotate_ip(self) -> bool:
         """Rotate IP by destroying and creating new IPBurger addon"""
@@ -383,33 +930,41 @@ Implementation: Based on Mori Protocol Analysis
             
             # Destroy current addon
             self._log("INFO", "Destroying current IPBurger addon...")
+            phase_start = time.monotonic()
             destroy_result = subprocess.run(
                 ["heroku", "addons:destroy", "ipburger", "--app", self.app_name, "--confirm", self.app_name],
                 capture_output=True, text=True, timeout=60
             )
+            self._record_rotation_phase("destroy", phase_start)
             
             if destroy_result.returncode != 0:
                 self._log("WARNING", f"Warning during destroy: {destroy_result.stderr}")
             
             # Wait for destroy to complete
             self._log("INFO", "Waiting for destroy to complete...")
+            phase_start = time.monotonic()
             time.sleep(8)
+            self._record_rotation_phase("destroy_wait", phase_start)
             
             # Create new addon
             self._log("INFO", f"Creating new IPBurger addon in {location}...")
+            phase_start = time.monotonic()
             create_result = subprocess.run(
                 ["heroku", "addons:create", "ipburger", "--app", self.app_name, f"--location={location}"],
                 capture_output=True, text=True, timeout=90
             )
+            self._record_rotation_phase("create", phase_start)
             
             if create_result.returncode != 0:
                 self._log("ERROR", f"Error creating addon: {create_result.stderr}")
                 self._log("INFO", "Waiting longer before retry...")
+                self._record_rotation(location, False)
                 time.sleep(15)
                 return False
             
             # Wait for credentials to be ready
             self._log("INFO", "Waiting for new proxy credentials...")
+            phase_start = time.monotonic()
             max_wait = 30
             wait_time = 0
             
@@ -417,14 +972,17 @@ Implementation: Based on Mori Protocol Analysis
                 time.sleep(2)
                 wait_time += 2
                 cred = self.get_credential()
-                print(".", end="", flush=True)
+                self.events.emit("rotation_poll", waited=wait_time)
                 
                 if cred:
-                    print()  # New line
+                    self._record_rotation_phase("credential_wait", phase_start)
+                    self.current_location = location
+                    self._record_rotation(location, True)
                     self._log("SUCCESS", f"New proxy ready: {cred}")
                     return True
             
-            print()  # New line
+            self._record_rotation_phase("credential_wait", phase_start)
+            self._record_rotation(location, False)
             self._log("ERROR", "Timeout waiting for credentials")
             return False
             
@@ -432,8 +990,54 @@ Implementation: Based on Mori Protocol Analysis
             self._log("ERROR", f"IP rotation failed: {e}")
             return False
 
-    def save_working_proxy(self, proxy_url: str, test_results: dict):
-        """Save working proxy to file with detailed results"""
+    def _ipburger_attached(self) -> Optional[bool]:
+        """Whether the app has an IPBurger addon (None when Heroku can't be asked)"""
+        try:
+            result = subprocess.run(
+                ["heroku", "addons", "--app", self.app_name, "--json"],
+                capture_output=True, text=True, timeout=30
+            )
+            if result.returncode != 0:
+                return None
+            addons = json.loads(result.stdout or "[]")
+        except (OSError, subprocess.SubprocessError, ValueError):
+            return None
+        return any((addon.get("addon_service") or {}).get("name") == "ipburger" for addon in addons)
+
+    def _resume_rotation(self, journal):
+        """Finish a rotation a killed run left half done: wait for the new addon, or create one"""
+        attached = self._ipburger_attached()
+        if attached is None:
+            self._log("WARNING", "Could not list the app's addons; continuing with the current credential")
+            return
+        if attached:
+            # Created (or never destroyed); its credential may still be provisioning
+            for _ in range(15):
+                if self.get_credential():
+                    self._log("INFO", "IPBurger addon is attached; continuing with its proxy")
+                    journal.update_state(rotation="done")
+                    return
+                time.sleep(2)
+            self._log("WARNING", "IPBurger addon has no credential yet; rotating again")
+        else:
+            self._log("INFO", "IPBurger addon was destroyed before the restart; creating a new one")
+        with self._profiled("rotate_ip"):
+            rotated = self.rotate_ip()
+        journal.update_state(rotation="done" if rotated else "failed", location=self.current_location)
+
+    def _record_rotation_phase(self, phase: str, started: float):
+        seconds = time.monotonic() - started
+        if self.metrics is not None:
+            self.metrics.record_rotation_phase(phase, seconds)
+        self.events.emit("rotation_phase", phase=phase, seconds=seconds)
+
+    def _record_rotation(self, location: str, success: bool):
+        if self.metrics is not None:
+            self.metrics.record_rotation(location, success)
+        self.events.emit("rotation", location=location, success=success)
+
+    def save_working_proxy(self, proxy_url: str, test_results: dict, score: Optional[int] = None):
+        """Save working proxy to file with its score (by default whichever tester's score the results carry)"""
         try:
             proxy_config = self.parse_proxy_url(proxy_url)
             if proxy_config:
@@ -442,7 +1046,8 @@ Implementation: Based on Mori Protocol Analysis
                 formatted_proxy = proxy_url
             
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            score = test_results.get("overall_score", 0)
+            if score is None:
+                score = next((test_results[key] for key in SCORE_FIELDS if key in test_results), 0)
             
             entry = f"{timestamp} - {formatted_proxy} (Score: {score}/100)\n"
             
@@ -454,9 +1059,54 @@ Implementation: Based on Mori Protocol Analysis
         except Exception as e:
             self._log("ERROR", f"Failed to save working proxy: {e}")
 
-    def check_prerequisites(self) -> bool:
-        """Check if required tools are available"""
+    def _prerequisites_key(self) -> Optional[str]:
+        """
+        Cheap fingerprint of the installed tools: Heroku CLI binary, Python
+        and package versions. Changes whenever any of them is upgraded.
+        """
+        from importlib import metadata
+        
+        heroku = shutil.which("heroku")
+        if not heroku:
+            return None
+        
+        stat = os.stat(os.path.realpath(heroku))
+        parts = [os.path.realpath(heroku), str(stat.st_size), str(int(stat.st_mtime)), sys.executable, sys.version]
+        for package in ("requests", "PySocks", "urllib3"):
+            try:
+                parts.append(f"{package}=={metadata.version(package)}")
+            except metadata.PackageNotFoundError:
+                parts.append(f"{package}==missing")
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def _load_cached_prerequisites(self, key: str) -> bool:
+        try:
+            with open(PREREQ_CACHE_FILE, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            return cached.get("key") == key and cached.get("ok") is True
+        except (OSError, ValueError):
+            return False
+
+    def _store_cached_prerequisites(self, key: str, heroku_version: str):
         try:
+            os.makedirs(os.path.dirname(PREREQ_CACHE_FILE), exist_ok=True)
+            with open(PREREQ_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "ok": True, "heroku": heroku_version,
+                           "checked": datetime.now().isoformat(timespec="seconds")}, f)
+        except OSError as e:
+            self._log("DEBUG", f"Could not cache prerequisite check: {e}")
+
+    def check_prerequisites(self, use_cache: bool = True) -> bool:
+        """Check if required tools are available (cached per tool versions)"""
+        try:
+            key = self._prerequisites_key()
+            if key is None:
+                self._log("ERROR", "Heroku CLI not found")
+                return False
+            if use_cache and self._load_cached_prerequisites(key):
+                self._log("SUCCESS", "Prerequisites OK (cached)")
+                return True
+            
             # Check Heroku CLI
             result = subprocess.run(["heroku", "--version"], capture_output=True, text=True, timeout=10)
             if result.returncode == 0:
@@ -491,65 +1141,107 @@ Implementation: Based on Mori Protocol Analysis
                     self._log("ERROR", "Failed to install required packages")
                     self._log("INFO", "Please run: pip install requests PySocks requests[socks]")
                     return False
+                # Freshly installed packages change the fingerprint
+                key = self._prerequisites_key()
             
+            self._store_cached_prerequisites(key, result.stdout.strip())
             return True
             
         except Exception as e:
             self._log("ERROR", f"Prerequisites check failed: {e}")
             return False
 
-    def run_test_cycle(self, max_attempts: int = 10) -> bool:
+    def run_test_cycle(self, max_attempts: int = 10, resume: bool = False) -> bool:
         """Run the main test cycle to find working proxy"""
+        from gt_journal import ProgressJournal
+        
         self._log("INFO", "Starting Growtopia proxy test cycle")
         
-        if not self.check_prerequisites():
+        with self._profiled("check_prerequisites"):
+            prerequisites_ok = self.check_prerequisites()
+        if not prerequisites_ok:
             self._log("ERROR", "Prerequisites not met")
             return False
         
-        attempt = 1
+        # Attempts and rotations are journaled so a killed cycle can resume
+        journal = ProgressJournal(self.cycle_journal_file, resume=resume)
+        try:
+            success = self._run_attempts(max_attempts, journal)
+        except BaseException:
+            journal.close()
+            self._log("WARNING", f"Progress saved to {journal.path}; rerun with --resume to continue")
+            raise
+        journal.close(remove=True)
+        return success
+    
+    def _run_attempts(self, max_attempts: int, journal) -> bool:
+        attempt = journal.state.get("attempt", 1)
+        if journal.state:
+            self._log("INFO", f"Resuming at attempt #{attempt}: {journal.summary()}")
+            if journal.state.get("rotation") == "in_progress":
+                self._log("WARNING", "Previous run stopped mid-rotation; checking addon state")
+                self._resume_rotation(journal)
         
         while attempt <= max_attempts:
             self._log("INFO", f"=== Attempt #{attempt}/{max_attempts} ===")
+            journal.update_state(attempt=attempt)
             
             # Get current proxy
-            proxy = self.get_credential()
+            with self._profiled("get_credential"):
+                proxy = self.get_credential()
             
             if not proxy:
                 self._log("ERROR", "No proxy credential found. Creating new addon...")
-                if not self.rotate_ip():
+                journal.update_state(rotation="in_progress")
+                with self._profiled("rotate_ip"):
+                    rotated = self.rotate_ip()
+                journal.update_state(rotation="done" if rotated else "failed", location=self.current_location)
+                if not rotated:
                     self._log("ERROR", "Failed to create new proxy. Exiting...")
                     return False
                 continue
             
             self._log("INFO", f"Current proxy: {proxy}")
             
-            # Test proxy comprehensively
-            is_compatible, results = self.test_full_growtopia_compatibility(proxy)
-            
-            # Display detailed results
-            self._log("INFO", "=== Test Results ===")
-            self._log("INFO", f"SOCKS5 Basic: {'✓' if results['socks5_basic'] else '✗'}")
-            self._log("INFO", f"HTTP Website: {'✓' if results['http_website'] else '✗'} ({results['http_status']})")
-            self._log("INFO", f"Server Data: {'✓' if results['server_data'] else '✗'}")
-            self._log("INFO", f"TCP Game Server: {'✓' if results['tcp_game_server'] else '✗'}")
-            self._log("INFO", f"ENet Compatible: {'✓' if results['enet_compat'] else '✗'}")
-            self._log("INFO", f"Overall Score: {results['overall_score']}/100")
-            
-            if is_compatible:
-                self._log("SUCCESS", "🎉 PROXY IS GROWTOPIA COMPATIBLE! 🎉")
-                self._log("SUCCESS", f"Working proxy: {proxy}")
-                self.save_working_proxy(proxy, results)
-                self._log("SUCCESS", "Ready for Growtopia gaming!")
-                return True
+            if journal.is_done(proxy) and not journal.done[proxy][0]:
+                # Tested before the restart and failed; don't pay for the test twice
+                self._log("INFO", f"Already tested before restart (Score: {journal.done[proxy][1]}/100)")
             else:
-                if results['http_status'] == '403':
-                    self._log("ERROR", "❌ Proxy blocked by Growtopia (403 Forbidden)")
+                # Test proxy comprehensively
+                journal.started(proxy)
+                is_compatible, results = self.test_full_growtopia_compatibility(proxy)
+                journal.finished(proxy, is_compatible, results['overall_score'])
+                
+                # Display detailed results
+                self._log("INFO", "=== Test Results ===")
+                self._log("INFO", f"SOCKS5 Basic: {'✓' if results['socks5_basic'] else '✗'}")
+                self._log("INFO", f"HTTP Website: {'✓' if results['http_website'] else '✗'} ({results['http_status']})")
+                self._log("INFO", f"Server Data: {'✓' if results['server_data'] else '✗'}")
+                self._log("INFO", f"TCP Game Server: {'✓' if results['tcp_game_server'] else '✗'}")
+                self._log("INFO", f"ENet Compatible: {'✓' if results['enet_compat'] else '✗'}")
+                if "bandwidth" in results:
+                    self._log("INFO", f"Bandwidth: {'✓' if results['bandwidth'] else '✗'} ({results['bandwidth_kb_per_s']} KB/s, {results['bandwidth_stalls']} stalls)")
+                self._log("INFO", f"Overall Score: {results['overall_score']}/100")
+                
+                if is_compatible:
+                    self._log("SUCCESS", "🎉 PROXY IS GROWTOPIA COMPATIBLE! 🎉")
+                    self._log("SUCCESS", f"Working proxy: {proxy}")
+                    self.save_working_proxy(proxy, results)
+                    self._log("SUCCESS", "Ready for Growtopia gaming!")
+                    return True
                 else:
-                    self._log("ERROR", f"❌ Proxy not compatible (Score: {results['overall_score']}/100)")
+                    if results['http_status'] == '403':
+                        self._log("ERROR", "❌ Proxy blocked by Growtopia (403 Forbidden)")
+                    else:
+                        self._log("ERROR", f"❌ Proxy not compatible (Score: {results['overall_score']}/100)")
             
             # Rotate IP for next attempt
             if attempt < max_attempts:
-                if not self.rotate_ip():
+                journal.update_state(rotation="in_progress")
+                with self._profiled("rotate_ip"):
+                    rotated = self.rotate_ip()
+                journal.update_state(rotation="done" if rotated else "failed", location=self.current_location)
+                if not rotated:
                     self._log("ERROR", "Failed to rotate IP. Waiting before retry...")
                     time.sleep(10)
             
@@ -559,7 +1251,6 @@ Implementation: Based on Mori Protocol Analysis
         self._log("WARNING", "Consider trying again later or checking Heroku setup")
         return False
 
-
 def main():
     import argparse
     
@@ -567,11 +1258,45 @@ def main():
     parser.add_argument("--app", default="ipburger-demo-joy", help="Heroku app name")
     parser.add_argument("--max-attempts", type=int, default=10, help="Maximum attempts")
     parser.add_argument("--test-proxy", help="Test specific proxy URL")
+    parser.add_argument("--bandwidth-url", help="Payload URL for the optional bandwidth test")
+    parser.add_argument("--low-bytes", action="store_true",
+                        help="Read only the status of pages whose body is unused (metered bandwidth)")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage time breakdown at exit")
+    parser.add_argument("--profile-out", help="Also write a cProfile dump (.prof) or collapsed stacks (.folded)")
+    parser.add_argument("--fast", action="store_true", help="Skip the banner (for cron jobs and scripts)")
+    parser.add_argument("--no-dns-cache", action="store_true", help="Resolve every hostname afresh")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted test cycle")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text",
+                        help="jsonl: one JSON record per tested proxy on stdout (text goes to stderr)")
     
     args = parser.parse_args()
     
-    tester = GrowtopiaProxyTester(args.app)
+    tester = GrowtopiaProxyTester(args.app, show_banner=not args.fast and args.format == "text")
+    if args.format == "jsonl":
+        tester.enable_jsonl_output()
+        # Records own stdout; the usual text still shows on the terminal
+        sys.stdout = sys.stderr
+    tester.enable_console_output()
+    tester.bandwidth_url = args.bandwidth_url
+    tester.enable_byte_counters()
+    tester.low_bytes = args.low_bytes
+    if not args.no_dns_cache:
+        tester.enable_dns_cache()
+    if args.metrics_port:
+        tester.enable_metrics(args.metrics_port)
+    if args.profile or args.profile_out:
+        tester.enable_profiling(args.profile_out)
     
+    try:
+        run_cli(tester, args)
+    finally:
+        tester.finish_profiling()
+        if tester.jsonl_output is not None:
+            tester.jsonl_output.close()
+
+
+def run_cli(tester: GrowtopiaProxyTester, args):
     if args.test_proxy:
         # Test specific proxy
         is_compatible, results = tester.test_full_growtopia_compatibility(args.test_proxy)
@@ -582,6 +1307,12 @@ def main():
         print(f"Proxy: {args.test_proxy}")
         print(f"Compatible: {'YES' if is_compatible else 'NO'}")
         print(f"Score: {results['overall_score']}/100")
+        if "bandwidth" in results:
+            print(f"Bandwidth: {results['bandwidth_kb_per_s']} KB/s sustained, "
+                  f"ramp-up {results['bandwidth_rampup_s']}s, {results['bandwidth_stalls']} stalls")
+        if "bytes_sent" in results:
+            from gt_bytes import describe
+            print(f"Traffic: {describe(results)}")
         print(f"{'='*50}")
         
         if is_compatible:
@@ -591,7 +1322,7 @@ def main():
             sys.exit(1)
     else:
         # Run full test cycle
-        success = tester.run_test_cycle(args.max_attempts)
+        success = tester.run_test_cycle(args.max_attempts, resume=args.resume)
         sys.exit(0 if success else 1)
 
 
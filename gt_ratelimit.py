@@ -0,0 +1,190 @@
+"""
+Per-target rate limiting for Growtopia endpoints
+
+Concurrent tests would otherwise hit growtopiagame.com, the server_data.php
+hosts and the checktoken endpoint in bursts, which is how proxies earn the
+403s test_http_to_growtopia reports (and every block wastes a rotation).
+RateLimiter keeps a token bucket per configured domain (subdomains share
+it, e.g. login.growtopiagame.com counts against growtopiagame.com) and,
+optionally, one per (domain, egress) pair so no single exit IP bursts.
+
+Buckets work by reservation: a request takes the next free slot and
+sleeps until it comes up, so waiting requests are served in order and
+sustained throughput stays at the configured rate. A request whose slot
+would come after its proxy's deadline is refused up front (RateLimited)
+without taking a token, so it never delays the requests behind it.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+# domain -> (requests per second, burst)
+DEFAULT_RATES: Dict[str, Tuple[float, int]] = {
+    "growtopiagame.com": (2.0, 5),
+    "growtopia1.com": (2.0, 5),
+    "growtopia2.com": (2.0, 5),
+}
+
+
+class RateLimited(Exception):
+    """No request slot for the target before the proxy's deadline"""
+
+
+class TokenBucket:
+    """Token bucket whose balance may go negative to queue reservations"""
+
+    def __init__(self, rate: float, burst: int, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def delay(self, now: float) -> float:
+        """Seconds until the next unreserved token"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def idle(self) -> bool:
+        return self.tokens >= self.burst
+
+
+def parse_rate(text: str) -> Tuple[float, int]:
+    """'RATE' or 'RATE/BURST' (requests per second) -> (rate, burst)"""
+    rate, _, burst = text.partition("/")
+    rate = float(rate)
+    if rate <= 0:
+        raise ValueError(f"rate must be positive: {text}")
+    return rate, int(burst) if burst else max(1, int(rate))
+
+
+def parse_rate_rule(text: str) -> Tuple[str, Tuple[float, int]]:
+    """'DOMAIN=RATE[/BURST]' -> (domain, (rate, burst))"""
+    domain, _, rate = text.partition("=")
+    if not domain or not rate:
+        raise ValueError(f"expected DOMAIN=RATE[/BURST]: {text}")
+    return domain.lower(), parse_rate(rate)
+
+
+class RateLimiter:
+    """Shared token buckets keyed by target domain and, optionally, egress"""
+
+    MAX_EGRESS_BUCKETS = 10000
+
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, int]]] = None,
+                 egress_rate: Optional[Tuple[float, int]] = None,
+                 max_wait: float = 30.0, metrics=None):
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+        self.egress_rate = egress_rate
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.requests = Counter()
+        self.waited = Counter()
+        self.wait_seconds = Counter()
+        self.refused = Counter()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._egress_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def rule_for(self, host: Optional[str]) -> Optional[str]:
+        """The configured domain covering host, or None when it isn't limited"""
+        if not host:
+            return None
+        host = host.lower().rstrip(".")
+        while True:
+            if host in self.rates:
+                return host
+            if "." not in host:
+                return None
+            host = host.split(".", 1)[1]
+
+    def _buckets_for(self, rule: str, egress: Optional[str], now: float) -> list:
+        bucket = self._buckets.get(rule)
+        if bucket is None:
+            bucket = self._buckets[rule] = TokenBucket(*self.rates[rule], now)
+        buckets = [bucket]
+        if self.egress_rate is not None and egress:
+            key = (rule, egress)
+            bucket = self._egress_buckets.get(key)
+            if bucket is None:
+                if len(self._egress_buckets) >= self.MAX_EGRESS_BUCKETS:
+                    self._prune(now)
+                bucket = self._egress_buckets[key] = TokenBucket(*self.egress_rate, now)
+            buckets.append(bucket)
+        return buckets
+
+    def _prune(self, now: float):
+        # Full buckets carry no state worth keeping
+        for key, bucket in list(self._egress_buckets.items()):
+            bucket.delay(now)
+            if bucket.idle():
+                del self._egress_buckets[key]
+
+    def wait(self, host: Optional[str], egress: Optional[str] = None, deadline: Optional[float] = None) -> float:
+        """
+        Block until a request to host may go; returns the seconds waited.
+        deadline is a time.monotonic() value (default: max_wait from now).
+        Raises RateLimited, without reserving, when the slot comes too late.
+        """
+        rule = self.rule_for(host)
+        if rule is None:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            limit = now + self.max_wait if deadline is None else deadline
+            buckets = self._buckets_for(rule, egress, now)
+            delay = max(bucket.delay(now) for bucket in buckets)
+            if now + delay > limit:
+                self.refused[rule] += 1
+                if self.metrics is not None:
+                    self.metrics.record_rate_limit(rule, None)
+                raise RateLimited(f"{rule}: next request slot in {delay:.1f}s is past the deadline")
+            for bucket in buckets:
+                bucket.take()
+            self.requests[rule] += 1
+            if delay > 0:
+                self.waited[rule] += 1
+                self.wait_seconds[rule] += delay
+
+        if self.metrics is not None:
+            self.metrics.record_rate_limit(rule, delay)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def throttle_session(self, session, egress: Optional[str] = None, deadline: Optional[float] = None):
+        """Route every request a requests.Session sends (redirects included) through wait()"""
+        send = session.send
+
+        def throttled_send(request, **kwargs):
+            self.wait(urlsplit(request.url).hostname, egress, deadline)
+            return send(request, **kwargs)
+
+        session.send = throttled_send
+        return session
+
+    def scaled(self, share: float) -> "RateLimiter":
+        """A limiter with rates and bursts multiplied by share (for one of N processes)"""
+        def scale(rate: Tuple[float, int]) -> Tuple[float, int]:
+            return rate[0] * share, max(1, round(rate[1] * share))
+
+        return RateLimiter({rule: scale(rate) for rule, rate in self.rates.items()},
+                           scale(self.egress_rate) if self.egress_rate else None, self.max_wait)
+
+    def summary(self) -> str:
+        """One line per limited domain that saw traffic"""
+        lines = []
+        for rule in sorted(set(self.requests) | set(self.refused)):
+            rate, burst = self.rates[rule]
+            waited = self.waited[rule]
+            average = self.wait_seconds[rule] / waited if waited else 0.0
+            lines.append(f"{rule} ({rate:g}/s, burst {burst}): {self.requests[rule]} requests, "
+                         f"{waited} waited (avg {average:.2f}s), {self.refused[rule]} refused")
+        return "\n".join(lines)
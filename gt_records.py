@@ -0,0 +1,177 @@
+"""
+Compact result storage for large scans
+
+A results dict costs several hundred bytes per proxy (more with the
+realistic tester's score_breakdown). ResultTable keeps the same data
+as struct-of-arrays instead:
+
+- stage outcomes        two bitmasks per row (which keys are present, which are True)
+- score and tester      one signed byte each
+- latencies and rates   float32 columns; counters int32 columns
+- status strings        indexes into a shared intern table
+- anything else         (score_breakdown, further score keys, future keys) interned as JSON
+- key order             interned, so to_dict() rebuilds the exact dict
+- URLs                  utf-8 bytes in one buffer plus offsets
+
+Rows turn back into the usual dict only on output (to_dict / rows()).
+"""
+
+import json
+import math
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+BOOL_FIELDS = (
+    "socks5_basic", "http_website", "server_data", "server_data_fetch", "tcp_game_server",
+    "enet_compat", "enet_handshake", "login_sequence", "login_token_valid", "game_server_reachable",
+    "bandwidth", "udp_probe", "is_growtopia_compatible", "overall_compatible",
+)
+SCORE_FIELDS = ("overall_score", "advanced_score", "realistic_score")
+SCORE_KEYS = {
+    "standard": "overall_score",
+    "advanced": "advanced_score",
+    "realistic": "realistic_score",
+}
+FLOAT_FIELDS = (
+    "dns_ms", "dns_saved_ms", "connect_ms", "bandwidth_kb_per_s", "bandwidth_rampup_s", "udp_loss_pct",
+    "udp_rtt_p50_ms", "udp_rtt_p90_ms", "udp_rtt_p99_ms", "udp_jitter_ms",
+)
+INT_FIELDS = (
+    "dns_lookups", "dns_cache_hits", "bandwidth_stalls", "bandwidth_bytes", "udp_reordered",
+    "bytes_sent", "bytes_received",
+)
+STRING_FIELDS = ("http_status", "compatibility_level", "compatibility_reason", "tcp_timeout_note")
+
+# Presence bits: bools first, then the numeric and string columns
+_FIELD_BITS = {name: bit for bit, name in enumerate(BOOL_FIELDS + FLOAT_FIELDS + INT_FIELDS + STRING_FIELDS)}
+_VERDICT_BIT = 31  # the (compatible, results) return value, kept in the bool mask
+_INT_NONE = -(2 ** 31)
+
+
+class InternTable:
+    """Value <-> small integer index; index 0 is reserved for 'absent'"""
+
+    def __init__(self):
+        self.values: List = [None]
+        self.index: Dict = {}
+
+    def intern(self, value) -> int:
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.values)
+            self.values.append(value)
+        return position
+
+
+class ResultTable:
+    """Append-only table of (url, compatible, results) rows"""
+
+    def __init__(self):
+        self._url_bytes = bytearray()
+        self._url_ends = array("Q")
+        self._present = array("Q")
+        self._bools = array("I")
+        self._score_field = array("B")
+        self._score = array("b")
+        self._floats = {name: array("f") for name in FLOAT_FIELDS}
+        self._ints = {name: array("i") for name in INT_FIELDS}
+        self._strings = {name: array("H") for name in STRING_FIELDS}
+        self._extras = array("I")
+        self._layout = array("H")
+        self._string_pool = InternTable()
+        self._extras_pool = InternTable()
+        self._layout_pool = InternTable()
+
+    def __len__(self) -> int:
+        return len(self._url_ends)
+
+    def append(self, url: str, compatible: bool, results: dict) -> int:
+        """Store one result; returns its row number"""
+        present = 0
+        bools = 1 << _VERDICT_BIT if compatible else 0
+        score_field = score = 0
+        extras = {}
+
+        for key, value in results.items():
+            bit = _FIELD_BITS.get(key)
+            if bit is not None:
+                present |= 1 << bit
+                if key in BOOL_FIELDS and value:
+                    bools |= 1 << bit
+            elif key in SCORE_FIELDS and not score_field:
+                score_field = SCORE_FIELDS.index(key) + 1
+                score = value
+            else:
+                # Any further score key keeps its own value in the extras
+                extras[key] = value
+
+        for name, column in self._floats.items():
+            value = results.get(name)
+            column.append(math.nan if value is None else value)
+        for name, column in self._ints.items():
+            value = results.get(name)
+            column.append(_INT_NONE if value is None else value)
+        for name, column in self._strings.items():
+            value = results.get(name)
+            column.append(0 if value is None else self._string_pool.intern(value))
+
+        self._url_bytes += url.encode()
+        self._url_ends.append(len(self._url_bytes))
+        self._present.append(present)
+        self._bools.append(bools)
+        self._score_field.append(score_field)
+        self._score.append(max(-128, min(127, score)))
+        self._extras.append(self._extras_pool.intern(json.dumps(extras, sort_keys=True)) if extras else 0)
+        self._layout.append(self._layout_pool.intern(tuple(results)))
+        return len(self) - 1
+
+    def url(self, row: int) -> str:
+        start = self._url_ends[row - 1] if row else 0
+        return self._url_bytes[start:self._url_ends[row]].decode()
+
+    def compatible(self, row: int) -> bool:
+        return bool(self._bools[row] >> _VERDICT_BIT & 1)
+
+    def score(self, row: int) -> int:
+        return self._score[row]
+
+    def to_dict(self, row: int) -> dict:
+        """The row as the results dict the tester originally returned"""
+        present, bools = self._present[row], self._bools[row]
+        extras_index = self._extras[row]
+        extras = json.loads(self._extras_pool.values[extras_index]) if extras_index else {}
+        score_field = self._score_field[row]
+        score_key = SCORE_FIELDS[score_field - 1] if score_field else None
+        results = {}
+        for key in self._layout_pool.values[self._layout[row]]:
+            bit = _FIELD_BITS.get(key)
+            if bit is None:
+                results[key] = self._score[row] if key == score_key else extras[key]
+            elif not present >> bit & 1:
+                continue
+            elif key in self._floats:
+                value = self._floats[key][row]
+                results[key] = None if math.isnan(value) else round(value, 3)
+            elif key in self._ints:
+                value = self._ints[key][row]
+                results[key] = None if value == _INT_NONE else value
+            elif key in self._strings:
+                results[key] = self._string_pool.values[self._strings[key][row]]
+            else:
+                results[key] = bool(bools >> bit & 1)
+        return results
+
+    def rows(self, compatible_only: bool = False) -> Iterator[Tuple[str, bool, dict]]:
+        """(url, compatible, results dict) per row, built lazily"""
+        for row in range(len(self)):
+            if compatible_only and not self.compatible(row):
+                continue
+            yield self.url(row), self.compatible(row), self.to_dict(row)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (intern tables excluded)"""
+        columns = [self._url_ends, self._present, self._bools, self._score_field, self._score,
+                   self._extras, self._layout, *self._floats.values(), *self._ints.values(),
+                   *self._strings.values()]
+        return len(self._url_bytes) + sum(column.itemsize * len(column) for column in columns)
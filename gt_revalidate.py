@@ -0,0 +1,117 @@
+"""
+Incremental re-validation for saved proxy pools
+
+Keeps a small per-proxy state file (last tested, last verdict and
+score, and a bit history of recent verdicts) and uses it to decide
+which proxies are due for another test:
+
+- new      never tested                          due now
+- flaky    verdict flipped recently              every FLAKY_INTERVAL
+- working  passing steadily                      every WORKING_INTERVAL
+- failing  failing steadily                      backs off, doubling per
+                                                 failure up to MAX_INTERVAL
+
+Due proxies are tested in that order (most overdue first within a
+class) until a proxy or time budget runs out, so routine runs cost
+what changed rather than what the pool holds.
+"""
+
+import heapq
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+STATE_FILE = "proxy_state.json"
+
+CLASS_RANK = {"new": 0, "flaky": 1, "working": 2, "failing": 3}
+
+
+class RevalidationPlanner:
+    """Per-proxy verdict history and the re-test schedule derived from it"""
+
+    HISTORY_BITS = 16
+    FLAKY_WINDOW = 8
+    WORKING_INTERVAL = 2 * 3600
+    FLAKY_INTERVAL = 20 * 60
+    FAILING_INTERVAL = 30 * 60
+    MAX_INTERVAL = 24 * 3600
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._dirty = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def save(self):
+        """Atomically rewrite the state file"""
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, separators=(",", ":"))
+        os.replace(temporary, self.path)
+        self._dirty = 0
+
+    def classify(self, entry: Optional[dict]) -> str:
+        if not entry:
+            return "new"
+        window = min(entry["runs"], self.FLAKY_WINDOW)
+        recent = entry["history"] & ((1 << window) - 1)
+        # Adjacent verdicts that differ; two or more flips in the window is flaky
+        flips = bin((recent ^ (recent >> 1)) & ((1 << max(window - 1, 0)) - 1)).count("1")
+        if flips >= 2:
+            return "flaky"
+        return "working" if entry["ok"] else "failing"
+
+    def interval(self, entry: Optional[dict], kind: str) -> float:
+        if kind == "new":
+            return 0.0
+        if kind == "flaky":
+            return self.FLAKY_INTERVAL
+        if kind == "working":
+            return self.WORKING_INTERVAL
+        return min(self.MAX_INTERVAL, self.FAILING_INTERVAL * 2 ** (entry["fails"] - 1))
+
+    def plan(self, urls: Iterable[str], now: Optional[float] = None,
+             limit: Optional[int] = None) -> Tuple[List[Tuple[str, str]], Dict[str, int]]:
+        """
+        Due proxies as (url, class) in test order, plus how many proxies of
+        each class were due. With a limit only the top entries are kept
+        (a bounded heap), so planning stays cheap for large pools.
+        """
+        now = time.time() if now is None else now
+        due = []
+        counts = dict.fromkeys(CLASS_RANK, 0)
+        for url in dict.fromkeys(urls):
+            entry = self.entries.get(url)
+            kind = self.classify(entry)
+            due_at = entry["last"] + self.interval(entry, kind) if entry else 0.0
+            if due_at <= now:
+                counts[kind] += 1
+                due.append((CLASS_RANK[kind], due_at, url, kind))
+
+        ordered = heapq.nsmallest(limit, due) if limit is not None else sorted(due)
+        return [(url, kind) for _, _, url, kind in ordered], counts
+
+    def record(self, url: str, ok: bool, score: int, when: Optional[float] = None):
+        entry = self.entries.get(url) or {"runs": 0, "history": 0, "fails": 0}
+        entry["last"] = time.time() if when is None else when
+        entry["ok"] = ok
+        entry["score"] = score
+        entry["runs"] += 1
+        entry["history"] = ((entry["history"] << 1) | int(ok)) & ((1 << self.HISTORY_BITS) - 1)
+        entry["fails"] = 0 if ok else entry["fails"] + 1
+        self.entries[url] = entry
+        self._dirty += 1
+        if self._dirty >= 25:
+            self.save()
+
+    def describe(self, url: str) -> str:
+        """Short 'last verdict, age' note for progress output"""
+        entry = self.entries.get(url)
+        if not entry:
+            return "never tested"
+        age = (time.time() - entry["last"]) / 60
+        age_text = f"{age:.0f}m" if age < 120 else f"{age / 60:.0f}h"
+        return f"last {'✅' if entry['ok'] else '❌'} {age_text} ago, {entry['fails']} failures in a row"
@@ -0,0 +1,245 @@
+"""
+Stage timeouts learned from observed latencies
+
+The stage timeouts (15 s SOCKS, 20 s HTTP and server data, 15 s per TCP
+server, 15 s login sequence) are sized for the slowest proxy that still
+works, so every dead proxy costs the full wait. StageTimeouts keeps the
+recent latencies of successful stages per stage and proxy location,
+persisted across runs, and sets each stage's timeout to a high percentile
+of them times a margin, between MIN_TIMEOUT and the original value. A
+stage's latency is its longest timed request or connect, since that is
+what the timeout bounds: not the other URLs or servers it tried, nor time
+queued behind the rate limiter.
+
+False negatives are measured rather than assumed: a small share of tests
+(audit_rate) runs with the original timeouts, and a stage that succeeds
+there slower than its tuned timeout counts as a proxy the tuned timeout
+would have failed. A stage whose audited miss share exceeds
+max_false_negative goes back to its original timeout until it recovers.
+"""
+
+import json
+import os
+import random
+import threading
+from collections import Counter, deque
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent saves from shard processes aren't serialized
+    fcntl = None
+
+# Stages whose timeout can be tuned, with the fixed timeouts they replace
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "socks5_basic": 15.0,
+    "http_website": 20.0,
+    "server_data": 20.0,
+    "tcp_game_server": 15.0,
+    "login_sequence": 15.0,
+}
+
+TIMEOUTS_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "cproxy", "stage_latency.json"
+)
+
+
+class StageTimeouts:
+    """Per-stage (and per-location) latency quantiles and the timeouts derived from them"""
+
+    MAX_SAMPLES = 512           # recent successes kept per stage and location
+    MIN_SAMPLES = 30            # fewer than this and the stage keeps its default
+    MIN_TIMEOUT = 2.0
+    MIN_AUDITS = 20             # audited successes needed before the miss share counts
+    AUDIT_DECAY_AT = 400        # audit counts are halved past this so old runs fade
+    AUTOSAVE_EVERY = 500
+
+    def __init__(self, percentile: float = 99.0, margin: float = 1.5, audit_rate: float = 0.05,
+                 max_false_negative: float = 0.02, path: Optional[str] = TIMEOUTS_FILE):
+        self.percentile = percentile
+        self.margin = margin
+        self.audit_rate = audit_rate
+        self.max_false_negative = max_false_negative
+        self.path = path
+        self._samples: Dict[str, deque] = {}
+        self._new: Dict[str, list] = {}
+        self._audits: Dict[str, list] = {}      # stage -> [audited successes, misses]
+        self._cache: Dict[str, Optional[float]] = {}
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        # This session's figures, for reports
+        self.audited = Counter()
+        self.missed = Counter()
+        self.cut = Counter()
+        self.saved_seconds = Counter()
+        if path:
+            self.load()
+
+    @staticmethod
+    def _key(stage: str, location: Optional[str]) -> str:
+        return f"{stage}@{location or '*'}"
+
+    def _series(self, key: str) -> deque:
+        series = self._samples.get(key)
+        if series is None:
+            series = self._samples[key] = deque(maxlen=self.MAX_SAMPLES)
+        return series
+
+    # -- persistence -----------------------------------------------------
+
+    def load(self):
+        """(Re)read the persisted samples, e.g. after shard processes saved theirs"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            # The file plus whatever this process hasn't saved yet
+            self._samples = {}
+            for key, values in state.get("samples", {}).items():
+                self._series(key).extend(float(v) for v in values)
+            for key, values in self._new.items():
+                self._series(key).extend(values)
+            for stage, counts in state.get("audits", {}).items():
+                self._audits[stage] = [int(counts[0]), int(counts[1])]
+            self._cache.clear()
+
+    def save(self):
+        """Merge this process's new samples into the file (other processes may share it)"""
+        if not self.path:
+            return
+        with self._lock:
+            new, self._new = self._new, {}
+            audits = {stage: list(counts) for stage, counts in self._audits.items()}
+            self._unsaved = 0
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            lock = open(f"{self.path}.lock", "a")
+        except OSError:
+            return
+        try:
+            if fcntl is not None:
+                # Shard processes save into the same file: one read-merge-replace at a time
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self._merge_into_file(new, audits)
+        finally:
+            lock.close()
+
+    def _merge_into_file(self, new: Dict[str, list], audits: Dict[str, list]):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+
+        samples = state.get("samples", {})
+        for key, values in new.items():
+            samples[key] = (samples.get(key, []) + [round(v, 4) for v in values])[-self.MAX_SAMPLES:]
+        stored = state.get("audits", {})
+        for stage, (audited, missed) in audits.items():
+            # Our counts started from the file's; keep whichever side has seen more
+            if stage not in stored or audited >= stored[stage][0]:
+                stored[stage] = [audited, missed]
+
+        try:
+            temp = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "samples": samples, "audits": stored}, f)
+            os.replace(temp, self.path)
+        except OSError:
+            pass
+
+    # -- timeouts --------------------------------------------------------
+
+    def _quantile(self, key: str) -> Optional[float]:
+        series = self._samples.get(key)
+        if series is None or len(series) < self.MIN_SAMPLES:
+            return None
+        ordered = sorted(series)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))
+        return ordered[index]
+
+    def _compute(self, stage: str, location: Optional[str]) -> Optional[float]:
+        audited, missed = self._audits.get(stage, (0, 0))
+        if audited >= self.MIN_AUDITS and missed / audited > self.max_false_negative:
+            return None
+        quantile = self._quantile(self._key(stage, location))
+        if quantile is None:
+            quantile = self._quantile(self._key(stage, None))
+        if quantile is None:
+            return None
+        return round(min(DEFAULT_TIMEOUTS[stage], max(self.MIN_TIMEOUT, quantile * self.margin)), 2)
+
+    def timeout_for(self, stage: str, location: Optional[str] = None) -> Optional[float]:
+        """Tuned timeout in seconds, or None when the stage should keep its default"""
+        if stage not in DEFAULT_TIMEOUTS:
+            return None
+        key = self._key(stage, location)
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = self._compute(stage, location)
+            return self._cache[key]
+
+    def audit(self) -> bool:
+        """Whether the next test should run with the default timeouts"""
+        return random.random() < self.audit_rate
+
+    def observe(self, stage: str, location: Optional[str], seconds: float, passed: bool,
+                tuned: Optional[float], audited: bool):
+        """
+        Record one stage run. tuned is the timeout the stage would have had
+        (None when untuned); audited runs used the default instead.
+        """
+        if stage not in DEFAULT_TIMEOUTS:
+            return
+        with self._lock:
+            if passed:
+                for key in {self._key(stage, location), self._key(stage, None)}:
+                    self._series(key).append(seconds)
+                    self._new.setdefault(key, []).append(seconds)
+                    self._cache.pop(key, None)
+                if audited and tuned is not None:
+                    counts = self._audits.setdefault(stage, [0, 0])
+                    counts[0] += 1
+                    self.audited[stage] += 1
+                    if seconds > tuned:
+                        counts[1] += 1
+                        self.missed[stage] += 1
+                    if counts[0] >= self.AUDIT_DECAY_AT:
+                        counts[0] //= 2
+                        counts[1] //= 2
+                    self._cache = {key: value for key, value in self._cache.items()
+                                   if not key.startswith(stage + "@")}
+            elif tuned is not None and not audited and seconds >= tuned * 0.9:
+                # Waited out the tuned timeout instead of the default one
+                self.cut[stage] += 1
+                self.saved_seconds[stage] += DEFAULT_TIMEOUTS[stage] - tuned
+            self._unsaved += 1
+            autosave = self._unsaved >= self.AUTOSAVE_EVERY
+        if autosave:
+            self.save()
+
+    # -- reporting -------------------------------------------------------
+
+    def session_stats(self) -> dict:
+        return {"audited": dict(self.audited), "missed": dict(self.missed),
+                "cut": dict(self.cut), "saved_seconds": dict(self.saved_seconds)}
+
+    def merge_session(self, stats: dict):
+        """Add another process's session_stats()"""
+        for name in ("audited", "missed", "cut", "saved_seconds"):
+            getattr(self, name).update(stats.get(name, {}))
+
+    def summary(self) -> str:
+        """One line per tunable stage"""
+        lines = []
+        for stage, default in DEFAULT_TIMEOUTS.items():
+            tuned = self.timeout_for(stage)
+            samples = len(self._samples.get(self._key(stage, None), ()))
+            current = f"{tuned:g}s" if tuned is not None else f"{default:g}s (default)"
+            audited, missed = self.audited[stage], self.missed[stage]
+            misses = f"{missed}/{audited} audited missed ({100.0 * missed / audited:.1f}%)" if audited else "no audits"
+            lines.append(f"{stage}: {current}, {samples} samples, {misses}, "
+                         f"{self.cut[stage]} cut short (~{self.saved_seconds[stage]:.0f}s saved)")
+        return "\n".join(lines)
@@ -0,0 +1,112 @@
+"""
+Follow a growing proxy list and hand out only newly appended lines
+
+Uses Linux inotify (through ctypes, no extra dependency) on the file's
+directory so appends, rewrites and replace-by-rename are all noticed
+within milliseconds. Falls back to polling os.stat() where inotify
+isn't available. Only bytes past the last read offset are read; a
+partial last line waits until its newline arrives, and a truncated or
+replaced file is read again from the start.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+from typing import Iterator
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+
+def _inotify_libc():
+    if not hasattr(os, "uname") or os.uname().sysname != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class FileFollower:
+    """tail -F for proxy lists: yields complete new lines as they are appended"""
+
+    def __init__(self, path: str, from_start: bool = False, poll_interval: float = 0.5):
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self._inode = None
+        self._offset = 0
+        self._partial = b""
+        self._inotify_fd = None
+        self.backend = "polling"
+
+        if os.path.exists(self.path):
+            stat = os.stat(self.path)
+            self._inode = stat.st_ino
+            self._offset = 0 if from_start else stat.st_size
+
+        libc = _inotify_libc()
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+                if libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), mask) >= 0:
+                    self._inotify_fd = fd
+                    self.backend = "inotify"
+                else:
+                    os.close(fd)
+
+    def close(self):
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def _wait(self, timeout: float):
+        """Block until the directory sees a write/rename, or until timeout"""
+        if self._inotify_fd is None:
+            time.sleep(timeout)
+            return
+        ready, _, _ = select.select([self._inotify_fd], [], [], timeout)
+        if ready:
+            # Drain the events; read_new() stats the file, which is cheaper than parsing names
+            try:
+                while os.read(self._inotify_fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def read_new(self) -> list:
+        """Complete lines appended since the last call (decoded, unstripped)"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # Replaced or truncated: start over on the new contents
+            self._inode = stat.st_ino
+            self._offset = 0
+            self._partial = b""
+        if stat.st_size == self._offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(stat.st_size - self._offset)
+        self._offset += len(chunk)
+        *lines, self._partial = (self._partial + chunk).split(b"\n")
+        return [line.decode("utf-8-sig", errors="replace") for line in lines]
+
+    def lines(self, idle_check: float = 5.0) -> Iterator[str]:
+        """Yield new lines forever; re-checks every idle_check seconds as a safety net"""
+        timeout = self.poll_interval if self._inotify_fd is None else idle_check
+        while True:
+            yield from self.read_new()
+            self._wait(timeout)
+
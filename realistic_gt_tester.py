@@ -8,8 +8,15 @@ This version correctly interprets TCP timeouts and focuses on
 what actually matters for Growtopia gameplay.
 """
 
+import math
+import socket
+import struct
+import sys
+import time
+
+from gt_bytes import describe as describe_traffic
 from gt_proxy_tester import GrowtopiaProxyTester
-from typing import Tuple, Dict, Any
+from typing import Optional, Tuple, Dict, Any
 
 
 class RealisticGrowtopiaProxyTester(GrowtopiaProxyTester):
@@ -18,7 +25,161 @@ class RealisticGrowtopiaProxyTester(GrowtopiaProxyTester):
     Based on deeper understanding of Growtopia's actual needs
     """
     
-    def test_realistic_growtopia_compatibility(self, proxy_url: str) -> Tuple[bool, dict]:
+    def __init__(self, app_name: str = "ipburger-demo-joy", show_banner: bool = False):
+        super().__init__(app_name, show_banner)
+        
+        # Optional UDP probe stage (disabled until a "host:port" echo target is set)
+        self.udp_probe_target = None
+        self.UDP_PROBE_COUNT = 50
+        self.UDP_PROBE_INTERVAL = 0.02
+        self.UDP_PROBE_WAIT = 2.0
+        self.ENET_PROTOCOL_COMMAND_PING = 5
+    
+    def create_enet_ping_packet(self, sequence: int) -> bytes:
+        """
+        ENet PING command carrying our sequence number
+        [peer_id: 2] [sent_time: 2] [command: 1] [channel: 1] [reliable_seq: 2]
+        """
+        peer_id = 0xFFFF | 0x4000  # ENET_PROTOCOL_MAXIMUM_PEER_ID with sent-time flag
+        sent_time = int(time.monotonic() * 1000) & 0xFFFF
+        command = self.ENET_PROTOCOL_COMMAND_PING | 0x80  # acknowledge flag
+        return struct.pack('>HHBBH', peer_id & 0xFFFF, sent_time, command, 0xFF, sequence & 0xFFFF)
+
+    def _summarize_udp_probe(self, sent: Dict[int, float], arrivals: list) -> dict:
+        """Loss, RTT percentiles, jitter and reordering from (sequence, recv_time) arrivals"""
+        stats = {
+            "sent": len(sent),
+            "received": 0,
+            "loss_pct": 100.0,
+            "rtt_p50_ms": None,
+            "rtt_p90_ms": None,
+            "rtt_p99_ms": None,
+            "jitter_ms": None,
+            "reordered": 0,
+            "duplicates": 0
+        }
+        
+        seen = set()
+        rtts = []
+        highest = -1
+        for sequence, received_at in arrivals:
+            if sequence not in sent:
+                continue
+            if sequence in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(sequence)
+            if sequence < highest:
+                stats["reordered"] += 1
+            highest = max(highest, sequence)
+            rtts.append((received_at - sent[sequence]) * 1000)
+        
+        stats["received"] = len(seen)
+        if not sent or not rtts:
+            return stats
+        
+        stats["loss_pct"] = round(100.0 * (len(sent) - len(seen)) / len(sent), 1)
+        
+        ordered = sorted(rtts)
+        for name, q in (("rtt_p50_ms", 0.50), ("rtt_p90_ms", 0.90), ("rtt_p99_ms", 0.99)):
+            index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+            stats[name] = round(ordered[index], 1)
+        
+        # Mean RTT variation between consecutive replies (RFC 3550 style)
+        if len(rtts) > 1:
+            deltas = [abs(b - a) for a, b in zip(rtts, rtts[1:])]
+            stats["jitter_ms"] = round(sum(deltas) / len(deltas), 1)
+        else:
+            stats["jitter_ms"] = 0.0
+        
+        return stats
+
+    def test_udp_probe(self, proxy_config: dict, target: str) -> Tuple[bool, dict]:
+        """
+        Send a paced burst of sequenced ENet PING packets through the proxy's
+        UDP relay to an echo target and measure what gameplay would feel like
+        """
+        sent = {}
+        arrivals = []
+        
+        try:
+            import socks
+            
+            host, port = target.rsplit(':', 1)
+            port = int(port)
+            
+            sock = socks.socksocket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.set_proxy(
+                socks.SOCKS5,
+                self._proxy_address(proxy_config),
+                proxy_config['port'],
+                username=proxy_config['username'],
+                password=proxy_config['password'],
+                rdns=self._remote_dns("udp_probe", proxy_config)
+            )
+            
+            def drain(wait: float):
+                sock.settimeout(wait)
+                try:
+                    while True:
+                        data, _ = sock.recvfrom(1024)
+                        received_at = time.monotonic()
+                        if len(data) >= 8:
+                            arrivals.append((struct.unpack('>H', data[6:8])[0], received_at))
+                        sock.settimeout(0.0005)
+                except (socket.timeout, BlockingIOError):
+                    pass
+            
+            self._log("DEBUG", f"Sending {self.UDP_PROBE_COUNT} ENet pings to {target}")
+            next_send = time.monotonic()
+            for sequence in range(self.UDP_PROBE_COUNT):
+                sent[sequence] = time.monotonic()
+                sock.sendto(self.create_enet_ping_packet(sequence), (host, port))
+                next_send += self.UDP_PROBE_INTERVAL
+                drain(max(0.0005, next_send - time.monotonic()))
+            
+            deadline = time.monotonic() + self.UDP_PROBE_WAIT
+            while len({seq for seq, _ in arrivals}) < len(sent) and time.monotonic() < deadline:
+                drain(min(0.1, max(0.0005, deadline - time.monotonic())))
+            sock.close()
+            
+        except ImportError:
+            self._log("WARNING", "PySocks not available for UDP probe")
+            return False, self._summarize_udp_probe({}, [])
+        except Exception as e:
+            self._log("DEBUG", f"UDP probe failed: {e}")
+        
+        stats = self._summarize_udp_probe(sent, arrivals)
+        passed = stats["received"] > 0 and stats["loss_pct"] <= 1.0
+        
+        level = "SUCCESS" if passed else "WARNING"
+        self._log(level, f"UDP probe: {stats['loss_pct']}% loss, p50 {stats['rtt_p50_ms']}ms, "
+                         f"p99 {stats['rtt_p99_ms']}ms, jitter {stats['jitter_ms']}ms, "
+                         f"{stats['reordered']} reordered")
+        return passed, stats
+
+    def _udp_quality_penalty(self, stats: dict) -> Tuple[int, str]:
+        """Points deducted for lossy or jittery UDP relays, plus a short summary"""
+        if not stats["received"]:
+            return 15, "no UDP replies"
+        
+        penalty = 0
+        if stats["loss_pct"] > 5:
+            penalty += 10
+        elif stats["loss_pct"] > 1:
+            penalty += 5
+        if stats["jitter_ms"] > 30:
+            penalty += 5
+        if stats["rtt_p90_ms"] > 250:
+            penalty += 5
+        if stats["reordered"]:
+            penalty += 2
+        
+        summary = (f"{stats['loss_pct']}% loss, p50 {stats['rtt_p50_ms']}ms, "
+                   f"jitter {stats['jitter_ms']}ms")
+        return min(penalty, 15), summary
+    
+    def test_realistic_growtopia_compatibility(self, proxy_url: str, location: Optional[str] = None) -> Tuple[bool, dict]:
         """
         Realistic compatibility test based on what actually matters
         for Growtopia gameplay, not theoretical protocol tests
@@ -27,51 +188,41 @@ class RealisticGrowtopiaProxyTester(GrowtopiaProxyTester):
         if not proxy_config:
             return False, {"error": "Invalid proxy format"}
         
+        self._begin_test(proxy_url, location)
         self._log("INFO", f"Testing REALISTIC Growtopia compatibility: {proxy_config['host']}:{proxy_config['port']}")
         
-        results = {
-            "socks5_basic": False,
-            "http_website": False,
-            "http_status": "UNKNOWN",
-            "server_data": False,
-            "tcp_game_server": False,
-            "enet_compat": False,
-            "realistic_score": 0,
-            "is_growtopia_compatible": False,
-            "compatibility_reason": "",
-            "tcp_timeout_note": "TCP timeout is NORMAL - Growtopia uses UDP/ENet"
-        }
+        results = self._realistic_results()
         
         # Test 1: Basic SOCKS5 connectivity
         self._log("INFO", "Running SOCKS5 basic connectivity test...")
-        results["socks5_basic"] = self.test_socks5_basic(proxy_config)
+        results["socks5_basic"] = self._run_stage("socks5_basic", self.test_socks5_basic, proxy_config)
         
         if not results["socks5_basic"]:
             results["compatibility_reason"] = "SOCKS5 proxy not working"
-            return False, results
+            return self._finish_test("realistic", False, results)
         
         # Test 2: HTTP website access
         self._log("INFO", "Testing HTTP connection to Growtopia website...")
-        http_success, status_code = self.test_http_to_growtopia(proxy_config)
+        http_success, status_code = self._run_stage("http_website", self.test_http_to_growtopia, proxy_config)
         results["http_website"] = http_success
         results["http_status"] = status_code
         
         # Check for blocking
         if status_code == "403":
             results["compatibility_reason"] = "IP blocked by Growtopia (403 Forbidden)"
-            return False, results
+            return self._finish_test("realistic", False, results)
         
         # Test 3: Server data endpoint (MOST CRITICAL)
         self._log("INFO", "Testing Growtopia server data endpoints...")
-        results["server_data"] = self.test_server_data_endpoint(proxy_config)
+        results["server_data"] = self._run_stage("server_data", self.test_server_data_endpoint, proxy_config)
         
         if not results["server_data"]:
             results["compatibility_reason"] = "Cannot access game server discovery endpoints"
-            return False, results
+            return self._finish_test("realistic", False, results)
         
         # Test 4: TCP game server (but interpret timeout correctly)
         self._log("INFO", "Testing TCP connections to game servers (timeout expected)...")
-        tcp_result = self.test_tcp_connection_to_game_server(proxy_config)
+        tcp_result = self._run_stage("tcp_game_server", self.test_tcp_connection_to_game_server, proxy_config)
         results["tcp_game_server"] = tcp_result
         
         if tcp_result:
@@ -81,8 +232,45 @@ class RealisticGrowtopiaProxyTester(GrowtopiaProxyTester):
         
         # Test 5: ENet compatibility
         self._log("INFO", "Testing basic ENet protocol compatibility...")
-        results["enet_compat"] = self.test_enet_compatibility(proxy_config)
-        
+        results["enet_compat"] = self._run_stage("enet_compat", self.test_enet_compatibility, proxy_config)
+        
+        # Test 6: Sustained bandwidth (optional)
+        self._run_bandwidth_stage(proxy_config, results)
+        
+        # Test 7: UDP loss/jitter probe through the relay (optional)
+        udp_stats = None
+        if self.udp_probe_target:
+            self._log("INFO", "Probing UDP relay quality (loss, RTT, jitter)...")
+            results["udp_probe"], udp_stats = self._run_stage(
+                "udp_probe", self.test_udp_probe, proxy_config, self.udp_probe_target
+            )
+            results["udp_loss_pct"] = udp_stats["loss_pct"]
+            results["udp_rtt_p50_ms"] = udp_stats["rtt_p50_ms"]
+            results["udp_rtt_p90_ms"] = udp_stats["rtt_p90_ms"]
+            results["udp_rtt_p99_ms"] = udp_stats["rtt_p99_ms"]
+            results["udp_jitter_ms"] = udp_stats["jitter_ms"]
+            results["udp_reordered"] = udp_stats["reordered"]
+        
+        compatible = self.score_realistic(results, udp_stats)
+        return self._finish_test("realistic", compatible, results)
+
+    def _realistic_results(self) -> dict:
+        """Results dict of test_realistic_growtopia_compatibility before any stage runs"""
+        return {
+            "socks5_basic": False,
+            "http_website": False,
+            "http_status": "UNKNOWN",
+            "server_data": False,
+            "tcp_game_server": False,
+            "enet_compat": False,
+            "realistic_score": 0,
+            "is_growtopia_compatible": False,
+            "compatibility_reason": "",
+            "tcp_timeout_note": "TCP timeout is NORMAL - Growtopia uses UDP/ENet"
+        }
+
+    def score_realistic(self, results: dict, udp_stats: Optional[dict] = None) -> bool:
+        """Fill in realistic_score, score_breakdown, the reason and the verdict from the stage outcomes"""
         # Realistic scoring system
         score = 0
         score_breakdown = {}
@@ -125,6 +313,25 @@ class RealisticGrowtopiaProxyTester(GrowtopiaProxyTester):
         else:
             score_breakdown["ENet Compatible"] = "0/5 - Minor issue"
         
+        # Bandwidth (Optional) - deducts up to 15 points from slow proxies
+        if "bandwidth" in results:
+            penalty = self._bandwidth_penalty(results)
+            rate = f"{results['bandwidth_kb_per_s']} KB/s, {results['bandwidth_stalls']} stalls"
+            if penalty:
+                score = max(0, score - penalty)
+                score_breakdown["Bandwidth"] = f"-{penalty} - {rate}"
+            else:
+                score_breakdown["Bandwidth"] = f"OK - {rate}"
+        
+        # UDP Quality (Optional) - deducts up to 15 points for loss and jitter
+        if udp_stats is not None:
+            penalty, summary = self._udp_quality_penalty(udp_stats)
+            if penalty:
+                score = max(0, score - penalty)
+                score_breakdown["UDP Quality"] = f"-{penalty} - {summary}"
+            else:
+                score_breakdown["UDP Quality"] = f"OK - {summary}"
+        
         results["realistic_score"] = score
         results["score_breakdown"] = score_breakdown
         
@@ -155,7 +362,7 @@ class RealisticGrowtopiaProxyTester(GrowtopiaProxyTester):
             else:
                 results["compatibility_reason"] = "Unknown compatibility issue"
         
-        return results["is_growtopia_compatible"], results
+        return results["is_growtopia_compatible"]
 
     def display_detailed_results(self, results: dict, proxy_url: str):
         """Display comprehensive test results with explanations"""
@@ -176,7 +383,7 @@ class RealisticGrowtopiaProxyTester(GrowtopiaProxyTester):
         
         if 'score_breakdown' in results:
             for test_name, result in results['score_breakdown'].items():
-                status = "✅" if result.startswith(("25/25", "20/20", "40/40", "10/10", "5/5")) else "❌" if result.startswith("0/") else "⚠️"
+                status = "✅" if result.startswith(("25/25", "20/20", "40/40", "10/10", "5/5", "OK")) else "❌" if result.startswith("0/") else "⚠️"
                 print(f"  {status} {test_name:<20}: {result}")
         else:
             print("  ❌ Score breakdown not available (test incomplete)")
@@ -216,6 +423,26 @@ class RealisticGrowtopiaProxyTester(GrowtopiaProxyTester):
         else:
             print("  ⚠️  ENET: Minor compatibility issues detected")
         
+        # Bandwidth Analysis
+        if "bandwidth" in results:
+            if results["bandwidth"]:
+                print(f"  ✅ BANDWIDTH: {results['bandwidth_kb_per_s']} KB/s sustained - world downloads OK")
+            else:
+                print(f"  ⚠️  BANDWIDTH: {results['bandwidth_kb_per_s']} KB/s, {results['bandwidth_stalls']} stalls - throttled proxy")
+        
+        # Metered traffic this test cost
+        if "bytes_sent" in results:
+            print(f"  ℹ️  TRAFFIC: {describe_traffic(results)}")
+        
+        # UDP Quality Analysis
+        if "udp_probe" in results:
+            if results["udp_probe"]:
+                print(f"  ✅ UDP: {results['udp_loss_pct']}% loss, jitter {results['udp_jitter_ms']}ms - smooth gameplay")
+            elif results["udp_rtt_p50_ms"] is None:
+                print("  ❌ UDP: No replies through the relay - ENet traffic will not flow")
+            else:
+                print(f"  ⚠️  UDP: {results['udp_loss_pct']}% loss, p99 {results['udp_rtt_p99_ms']}ms - expect lag and rubber-banding")
+        
         print(f"\n🎯 GROWTOPIA GAMING VERDICT:")
         print(f"{'─'*70}")
         
@@ -251,11 +478,46 @@ def main():
     
     parser = argparse.ArgumentParser(description="Realistic Growtopia Proxy Tester v1.0")
     parser.add_argument("--test-proxy", required=True, help="Test specific proxy URL")
+    parser.add_argument("--bandwidth-url", help="Payload URL for the optional bandwidth test")
+    parser.add_argument("--low-bytes", action="store_true",
+                        help="Read only the status of pages whose body is unused (metered bandwidth)")
+    parser.add_argument("--udp-probe", metavar="HOST:PORT", help="UDP echo target for the loss/jitter probe")
+    
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--profile", action="store_true", help="Print a per-stage time breakdown at exit")
+    parser.add_argument("--profile-out", help="Also write a cProfile dump (.prof) or collapsed stacks (.folded)")
+    parser.add_argument("--no-dns-cache", action="store_true", help="Resolve every hostname afresh")
+    parser.add_argument("--format", choices=["text", "jsonl"], default="text",
+                        help="jsonl: one JSON record per tested proxy on stdout (text goes to stderr)")
     
     args = parser.parse_args()
     
-    tester = RealisticGrowtopiaProxyTester()
+    tester = RealisticGrowtopiaProxyTester(show_banner=args.format == "text")
+    if args.format == "jsonl":
+        tester.enable_jsonl_output()
+        # Records own stdout; the usual text still shows on the terminal
+        sys.stdout = sys.stderr
+    tester.enable_console_output()
+    tester.bandwidth_url = args.bandwidth_url
+    tester.enable_byte_counters()
+    tester.low_bytes = args.low_bytes
+    tester.udp_probe_target = args.udp_probe
+    if not args.no_dns_cache:
+        tester.enable_dns_cache()
+    if args.metrics_port:
+        tester.enable_metrics(args.metrics_port)
+    if args.profile or args.profile_out:
+        tester.enable_profiling(args.profile_out)
     
+    try:
+        return run_cli(tester, args)
+    finally:
+        tester.finish_profiling()
+        if tester.jsonl_output is not None:
+            tester.jsonl_output.close()
+
+
+def run_cli(tester: RealisticGrowtopiaProxyTester, args) -> int:
     # Test with realistic expectations
     is_compatible, results = tester.test_realistic_growtopia_compatibility(args.test_proxy)
     
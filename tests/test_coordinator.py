@@ -0,0 +1,113 @@
+"""
+Scan coordinator with several worker processes sharing one SQLite file.
+Tests are replaced by a stand-in, so no network is needed.
+
+    python -m unittest discover tests
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gt_coordinator import ScanCoordinator, ScanWorker
+
+
+def _fake_test(url):
+    time.sleep(0.005)
+    return True, {"overall_score": int(url.rsplit(":", 1)[1]) % 100}
+
+
+def _run_worker(path, worker_id, done):
+    coordinator = ScanCoordinator(path)
+    worker = ScanWorker(coordinator, "standard", worker_id, batch=5, lease_seconds=1.0)
+    worker.test = _fake_test
+    done.put((worker_id, worker.run()))
+    coordinator.close()
+
+
+def _lease_and_stall(path, leased, resume, done):
+    """A worker that stops renewing, then posts results after losing its leases"""
+    coordinator = ScanCoordinator(path)
+    urls = coordinator.lease("stalled", batch=5, lease_seconds=0.5)
+    leased.put(urls)
+    resume.wait(60)
+    done.put([coordinator.complete("stalled", url, "standard", True, {"overall_score": 999}) for url in urls])
+    coordinator.close()
+
+
+class ScanCoordinatorTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        self.coordinator = ScanCoordinator(self.path)
+        self.urls = [f"socks5://10.0.0.{n % 250}:{1000 + n}" for n in range(60)]
+        self.coordinator.add(self.urls)
+
+    def tearDown(self):
+        self.coordinator.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_expired_lease_is_reclaimed(self):
+        first = self.coordinator.lease("a", batch=3, lease_seconds=0.2)
+        second = self.coordinator.lease("b", batch=3, lease_seconds=60)
+        self.assertFalse(set(first) & set(second))
+        time.sleep(0.3)
+        # Only the expired batch comes back; b still holds its leases
+        reclaimed = self.coordinator.lease("c", batch=len(self.urls), lease_seconds=60)
+        self.assertTrue(set(first) <= set(reclaimed))
+        self.assertFalse(set(second) & set(reclaimed))
+        self.assertEqual(self.coordinator.renew("a", first), 0)
+
+    def test_stale_completion_is_dropped(self):
+        [url] = self.coordinator.lease("a", batch=1, lease_seconds=0.2)
+        time.sleep(0.3)
+        self.assertIn(url, self.coordinator.lease("b", batch=len(self.urls), lease_seconds=60))
+        self.assertFalse(self.coordinator.complete("a", url, "standard", True, {"overall_score": 10}))
+        self.assertTrue(self.coordinator.complete("b", url, "standard", True, {"overall_score": 20}))
+        self.assertFalse(self.coordinator.complete("a", url, "standard", True, {"overall_score": 30}))
+        self.assertEqual(self.coordinator.compatible_results(), [(url, "standard", {"overall_score": 20})])
+
+    def test_workers_score_each_url_once(self):
+        context = multiprocessing.get_context("spawn")
+        leased, resume, done = context.Queue(), context.Event(), context.Queue()
+        stalled = context.Process(target=_lease_and_stall, args=(self.path, leased, resume, done))
+        stalled.start()
+        stalled_urls = leased.get(timeout=60)
+
+        workers = [context.Process(target=_run_worker, args=(self.path, f"w{n}", done)) for n in range(4)]
+        for process in workers:
+            process.start()
+        tested = dict(done.get(timeout=120) for _ in workers)
+        for process in workers:
+            process.join(60)
+
+        # The stalled worker comes back after its proxies were re-tested elsewhere
+        resume.set()
+        self.assertEqual(done.get(timeout=60), [False] * len(stalled_urls))
+        stalled.join(60)
+
+        self.assertEqual(sum(tested.values()), len(self.urls))
+        self.assertEqual(self.coordinator.stats()["done"], len(self.urls))
+        db = sqlite3.connect(self.path)
+        try:
+            rows = db.execute("SELECT url, worker, score FROM results").fetchall()
+            attempts = dict(db.execute("SELECT url, attempts FROM proxies").fetchall())
+        finally:
+            db.close()
+        self.assertEqual(sorted(url for url, _, _ in rows), sorted(self.urls))
+        self.assertNotIn("stalled", {worker for _, worker, _ in rows})
+        self.assertNotIn(999, {score for _, _, score in rows})
+        for url in stalled_urls:
+            self.assertEqual(attempts[url], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
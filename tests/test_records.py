@@ -0,0 +1,38 @@
+"""
+ResultTable rows round-trip to the results dict they were built from.
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gt_records import ResultTable
+
+
+class ResultTableTest(unittest.TestCase):
+    def test_round_trip(self):
+        results = {"socks5_basic": True, "http_website": False, "dns_ms": 1.5, "bandwidth_stalls": 2,
+                   "overall_score": 55, "score_breakdown": {"login": 20}}
+        table = ResultTable()
+        row = table.append("socks5://u:p@10.0.0.1:1080", True, results)
+        self.assertEqual(table.to_dict(row), results)
+        self.assertEqual(list(table.to_dict(row)), list(results))
+        self.assertEqual(table.score(row), 55)
+
+    def test_keeps_every_score_key(self):
+        results = {"realistic_score": 72, "socks5_basic": True, "overall_score": 55, "advanced_score": 40}
+        table = ResultTable()
+        table.append("socks5://10.0.0.1:1080", False, {"overall_score": 9})
+        row = table.append("socks5://10.0.0.2:1080", True, results)
+        self.assertEqual(table.to_dict(row), results)
+        # The first score key is the row's score
+        self.assertEqual(table.score(row), 72)
+        self.assertEqual(table.to_dict(0), {"overall_score": 9})
+
+
+if __name__ == "__main__":
+    unittest.main()